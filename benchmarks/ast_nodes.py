@@ -0,0 +1,47 @@
+"""
+Memory held by the AST and time of every phase on a large generated
+program (about 50k lines by default).
+
+    python benchmarks/ast_nodes.py [lines]
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.setrecursionlimit(100000)
+
+from src.compiler import Compiler
+from src.profiling import count_ast_nodes
+from generate import generate
+
+def main(lines: int = 50000):
+    # wide_functions emits two lines per function
+    source = generate('wide_functions', lines // 2)
+    compiler = Compiler()
+
+    start = time.perf_counter()
+    ast = compiler.parse(source, [])
+    parse_time = time.perf_counter() - start
+
+    del ast
+    tracemalloc.start()
+    ast = compiler.parse(source, [])
+    ast_memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = count_ast_nodes(ast)
+    del ast
+
+    start = time.perf_counter()
+    compiler.compile(source)
+    compile_time = time.perf_counter() - start
+
+    print(f'{source.count(chr(10))} lines, {nodes} nodes')
+    print(f'AST memory: {ast_memory / 2**20:.2f} MiB ({ast_memory / nodes:.1f} bytes per node)')
+    print(f'parse: {parse_time:.2f} s, whole compilation: {compile_time:.2f} s')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
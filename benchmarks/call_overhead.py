@@ -0,0 +1,90 @@
+"""
+Instructions spent on calls in recursive programs: for every recursive
+function, the instructions and loads/stores of one invocation's body,
+counting the register save helpers of lib/code.s at their full length.
+
+    python benchmarks/call_overhead.py
+"""
+import re
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.setrecursionlimit(100000)
+
+from src.compiler import Compiler
+
+PROGRAMS = {
+    'fib': (ROOT / 'examples' / 'fib.hulk').read_text(),
+    'tribonacci': '''
+function trib(n: Number): Number {
+    if (n < 3) return 1;
+    return trib(n - 1) + trib(n - 2) + trib(n - 3);
+}
+print(numberToString(trib(15)));
+''',
+    'ackermann': '''
+function ack(m: Number, n: Number): Number {
+    if (m == 0) return n + 1;
+    if (n == 0) return ack(m - 1, 1);
+    return ack(m - 1, ack(m, n - 1));
+}
+print(numberToString(ack(2, 3)));
+''',
+}
+
+MEMORY = re.compile(r'(lw|sw|lwc1|swc1)\s')
+
+def helper_lengths() -> dict[str, tuple[int, int]]:
+    """(instructions, loads and stores) of the push_all and pop_all helpers"""
+    lines = (ROOT / 'lib' / 'code.s').read_text().splitlines()
+    lengths = {}
+
+    for helper in ('push_all', 'pop_all'):
+        start = lines.index(f'{helper}:') + 1
+        end = next(i for i in range(start, len(lines)) if lines[i].strip() == 'jr      $ra') + 1
+        body = [l.strip() for l in lines[start:end] if l.strip()]
+        lengths[helper] = (len(body), sum(bool(MEMORY.match(l)) for l in body))
+
+    return lengths
+
+
+def measure(code: list[str], helpers: dict) -> tuple[int, int]:
+    instructions = memory = 0
+
+    for line in code:
+        if line.endswith(':') or line == 'nop':
+            continue
+
+        instructions += 1
+        memory += bool(MEMORY.match(line))
+
+        target = line[4:] if line.startswith('jal ') else None
+        if target in helpers:
+            instructions += helpers[target][0]
+            memory += helpers[target][1]
+
+    return instructions, memory
+
+
+def main():
+    helpers = helper_lengths()
+
+    print(f'{"program":>12} {"function":>20} {"calls":>6} {"instructions":>13} {"loads/stores":>13}')
+    for name, source in PROGRAMS.items():
+        result = Compiler().compile(source)
+        if not result.success:
+            raise Exception(f'{name} does not compile: {result.errors}')
+
+        for function, code in result.codegen.code.items():
+            calls = code.count(f'jal {function}')
+            if not calls:
+                continue
+
+            instructions, memory = measure(code, helpers)
+            print(f'{name:>12} {function:>20} {calls:>6} {instructions:>13} {memory:>13}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Compile time and memory of synthetic programs (see generate.py) at
+growing sizes, end to end and per phase.
+
+    python benchmarks/compile_throughput.py [--shapes ...] [--sizes ...]
+    python benchmarks/compile_throughput.py --compare old.json new.json
+
+Results are saved as benchmarks/results/<commit>.json so two commits can
+be compared.
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+from statistics import median
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.setrecursionlimit(100000)
+
+from src.compiler import Compiler
+from generate import SHAPES, generate
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def measure(shape: str, size: int, repeat: int) -> dict:
+    source = generate(shape, size)
+    compiler = Compiler()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = compiler.compile(source)
+        times.append(time.perf_counter() - start)
+
+        if not result.success:
+            raise Exception(f'{shape} of size {size} does not compile: {result.errors}')
+
+    # Tracing allocations slows everything down, so the phases come from a separate run
+    profile = Compiler(profile=True).compile(source).profile.to_dict()
+
+    return {
+        'shape': shape,
+        'size': size,
+        'lines': source.count('\n'),
+        'time': median(times),
+        'peak_memory': profile['peak_memory'],
+        'phases': {p['name']: p for p in profile['phases']},
+    }
+
+
+def run(shapes: list[str], sizes: list[int], repeat: int) -> dict:
+    results = []
+
+    for shape in shapes:
+        for size in sizes:
+            result = measure(shape, size, repeat)
+            results.append(result)
+
+            phases = ' '.join(f'{name}={p["wall_time"] * 1000:.1f}' for name, p in result['phases'].items())
+            print(f'{shape:>15} {size:>6} {result["time"] * 1000:10.2f} ms {result["peak_memory"] / 1024:10.1f} KiB   {phases}')
+
+    return {
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(old_file: str, new_file: str) -> None:
+    old = json.loads(Path(old_file).read_text())
+    new = json.loads(Path(new_file).read_text())
+
+    old_results = {(r['shape'], r['size']): r for r in old['results']}
+
+    print(f'{"shape":>15} {"size":>6} {old["commit"]:>12} {new["commit"]:>12} {"speedup":>8}')
+    for r in new['results']:
+        key = (r['shape'], r['size'])
+        if key not in old_results:
+            continue
+
+        before = old_results[key]['time']
+        print(f'{r["shape"]:>15} {r["size"]:>6} {before * 1000:10.2f}ms {r["time"] * 1000:10.2f}ms {before / r["time"]:7.2f}x')
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='HULK compile throughput benchmark')
+    arg_parser.add_argument('--shapes', nargs='+', default=list(SHAPES), choices=list(SHAPES))
+    arg_parser.add_argument('--sizes', nargs='+', type=int, default=[10, 50, 100, 200, 400])
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--output', default=None, help='defaults to benchmarks/results/<commit>.json')
+    arg_parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    args = arg_parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args.shapes, args.sizes, args.repeat)
+
+    output = Path(args.output or Path(__file__).parent / 'results' / f'{report["commit"]}.json')
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f'Results saved to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Synthetic HULK programs of scalable size, one generator per shape of
+program that stresses a different part of the compiler.
+
+    python benchmarks/generate.py <shape> <size>
+"""
+import sys
+
+def nested_let(size: int) -> str:
+    lines = ['let v0: Number = 0 in']
+    for i in range(1, size):
+        lines.append(f'{" " * i}let v{i}: Number = v{i - 1} + 1 in')
+    lines.append(f'{" " * size}print(numberToString(v{size - 1}));')
+    return '\n'.join(lines) + '\n'
+
+
+def elif_chain(size: int) -> str:
+    lines = ['let x: Number = 5 in', 'if (x == 0) print("0");']
+    for i in range(1, size):
+        lines.append(f'elif (x == {i}) print("{i}");')
+    lines.append('else print("other");')
+    return '\n'.join(lines) + '\n'
+
+
+def type_hierarchy(size: int) -> str:
+    lines = [
+        'type T0(id: Number) {',
+        '    id: Number = id;',
+        '    function get(): Number => self.id;',
+        '}',
+    ]
+    for i in range(1, size):
+        lines.extend([
+            f'type T{i}(id: Number) inherits T{i - 1} {{',
+            f'    value{i}: Number = {i};',
+            f'    function get{i}(): Number => self.id + self.value{i};',
+            '}',
+        ])
+    lines.append(f'let t: T{size - 1} = new T{size - 1}(1) in print(numberToString(t.get()));')
+    return '\n'.join(lines) + '\n'
+
+
+def wide_functions(size: int) -> str:
+    lines = []
+    for i in range(size):
+        lines.append(f'function f{i}(x: Number): Number => x + {i};')
+    lines.append('let total: Number = 0 in {')
+    for i in range(size):
+        lines.append(f'    total := total + f{i}(total);')
+    lines.append('    print(numberToString(total));')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def concat_chain(size: int) -> str:
+    pieces = ' @ '.join(f'"s{i}"' for i in range(size))
+    return f'let s: String = {pieces} in print(s);\n'
+
+
+SHAPES = {
+    'nested_let': nested_let,
+    'elif_chain': elif_chain,
+    'type_hierarchy': type_hierarchy,
+    'wide_functions': wide_functions,
+    'concat_chain': concat_chain,
+}
+
+
+def generate(shape: str, size: int) -> str:
+    return SHAPES[shape](size)
+
+
+if __name__ == '__main__':
+    print(generate(sys.argv[1], int(sys.argv[2])), end='')
@@ -0,0 +1,86 @@
+"""
+Heap used by loops that allocate on every iteration and keep almost
+nothing: strings, objects and arrays. With the collector in lib/code.s the
+heap stops growing once the garbage is collected, whatever the number of
+iterations. Executed instructions and bytes taken with sbrk, measured with
+src/simulator.py.
+
+    python benchmarks/heap.py [--iterations N]
+"""
+import sys
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.compiler import Compiler
+from src.simulator import simulate
+
+
+def string_loop(size: int) -> str:
+    return f'''let last: String = "", i: Number = 0 in {{
+    while (i < {size}) {{
+        last := "item " @ numberToString(i) @@ "of" @@ numberToString({size});
+        i := i + 1;
+    }}
+    print(last);
+}}
+'''
+
+
+def object_loop(size: int) -> str:
+    return f'''type Point(x: Number, y: Number) {{
+    x: Number = x;
+    y: Number = y;
+}}
+let total: Number = 0, i: Number = 0 in {{
+    while (i < {size}) {{
+        let p: Point = new Point(i, 2) in total := total + p.x * p.y;
+        i := i + 1;
+    }}
+    print(numberToString(total));
+}}
+'''
+
+
+def array_loop(size: int) -> str:
+    return f'''let total: Number = 0, i: Number = 0 in {{
+    while (i < {size}) {{
+        let a: Array_Number = [i, i + 1, i + 2, i + 3, i + 4, i + 5, i + 6, i + 7] in total := total + a[7];
+        i := i + 1;
+    }}
+    print(numberToString(total));
+}}
+'''
+
+
+LOOPS = {
+    'strings': string_loop,
+    'objects': object_loop,
+    'arrays': array_loop,
+}
+
+
+def measure(source: str):
+    result = Compiler().compile(source)
+    if not result.success:
+        raise Exception(f'does not compile: {result.errors}')
+
+    return simulate(result.assemble())
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Heap used by allocating loops')
+    arg_parser.add_argument('--iterations', type=int, default=5000, help='iterations of the longer loops')
+    args = arg_parser.parse_args()
+
+    print(f'{"loop":>12} {"iterations":>11} {"instructions":>13} {"heap":>8}')
+    for name, loop in LOOPS.items():
+        for iterations in (args.iterations // 10, args.iterations):
+            run = measure(loop(iterations))
+            print(f'{name:>12} {iterations:>11} {run.stats.instructions:>13} {run.stats.heap_bytes:>8}')
+
+
+if __name__ == '__main__':
+    main()
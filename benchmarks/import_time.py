@@ -0,0 +1,43 @@
+"""
+Measures the time of `import src.parser` in a fresh interpreter with the
+LALR table cache disabled, cold (empty cache) and warm (tables on disk).
+
+    python benchmarks/import_time.py [runs]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+from statistics import median
+
+ROOT = Path(__file__).parent.parent
+
+def time_import(cache_dir: str) -> float:
+    env = dict(os.environ, HULK_TABLE_CACHE=cache_dir)
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import src.parser'], cwd=ROOT, env=env, check=True)
+    return time.perf_counter() - start
+
+
+def main(runs: int = 10):
+    no_cache, cold, warm = [], [], []
+
+    for _ in range(runs):
+        cache_dir = tempfile.mkdtemp(prefix='hulk-tables-')
+        try:
+            no_cache.append(time_import(''))
+            cold.append(time_import(cache_dir))
+            warm.append(time_import(cache_dir))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    for name, times in (('no cache', no_cache), ('cold', cold), ('warm', warm)):
+        print(f'{name:>10}: {median(times) * 1000:8.2f} ms (median of {runs})')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
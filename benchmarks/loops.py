@@ -0,0 +1,70 @@
+"""
+Nested loops summing an array, compiled at every `-O` level and run with
+src/simulator.py: instructions executed, loads and stores.
+
+    python benchmarks/loops.py [--size N] [--rounds R]
+"""
+import sys
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.compiler import Compiler
+from src.optimizer import OPTIMIZATION_LEVELS
+from src.simulator import simulate
+
+
+def nested_sum(size: int, rounds: int) -> str:
+    elements = ', '.join(str(i) for i in range(size))
+    return f'''
+function total(a: Array_Number, n: Number, rounds: Number): Number {{
+    let sum: Number = 0, r: Number = 0 in {{
+        while (r < rounds) {{
+            let j: Number = 0 in
+            while (j < n) {{
+                sum := sum + a[j] * r;
+                j := j + 1;
+            }}
+            r := r + 1;
+        }}
+        return sum;
+    }}
+}}
+let a: Array_Number = [{elements}], i: Number = 0 in {{
+    while (i < {size}) {{
+        a[i] := a[i] + a[0];
+        i := i + 1;
+    }}
+    print(numberToString(total(a, {size}, {rounds})));
+}}
+'''
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Executed instructions of nested array loops at every level')
+    arg_parser.add_argument('--size', type=int, default=100, help='elements in the array')
+    arg_parser.add_argument('--rounds', type=int, default=20, help='iterations of the outer loop')
+    args = arg_parser.parse_args()
+
+    source = nested_sum(args.size, args.rounds)
+    outputs = set()
+
+    print(f'{"level":>6} {"executed":>10} {"loads":>9} {"stores":>9}')
+
+    for level in OPTIMIZATION_LEVELS:
+        result = Compiler(optimization=level).compile(source)
+        if not result.success:
+            raise Exception(f'does not compile: {result.errors}')
+
+        run = simulate(result.assemble(), max_instructions=10**9)
+        outputs.add(run.output)
+        print(f'{f"-O{level}":>6} {run.stats.instructions:>10} {run.stats.loads:>9} {run.stats.stores:>9}')
+
+    if len(outputs) != 1:
+        raise Exception('every level prints differently')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+What every `-O` level does to the examples, and to the generated programs
+of benchmarks/generate.py with `--size`: TAC instructions, MIPS
+instructions emitted and instructions executed by src/simulator.py, with
+a check that every level prints the same.
+
+    python benchmarks/optimization.py [--size N]
+"""
+import sys
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.setrecursionlimit(100000)
+
+from generate import SHAPES
+from src.compiler import Compiler
+from src.optimizer import OPTIMIZATION_LEVELS
+from src.simulator import simulate
+
+
+def measure(source: str, level: int) -> tuple[int, int, int, str]:
+    result = Compiler(optimization=level).compile(source)
+    if not result.success:
+        raise Exception(f'does not compile: {result.errors}')
+
+    run = simulate(result.assemble())
+    tac = sum(len(code) for code in result.tac.code.values())
+    mips = sum(len(code) for code in result.codegen.code.values())
+
+    return tac, mips, run.stats.instructions, run.output
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Effect of every optimization level')
+    arg_parser.add_argument('--size', type=int, default=None, help='also measure the generated programs of this size')
+    args = arg_parser.parse_args()
+
+    programs = {filename.stem: filename.read_text() for filename in sorted((ROOT / 'examples').iterdir())}
+    if args.size:
+        programs.update({shape: generate(args.size) for shape, generate in SHAPES.items()})
+
+    header = ''.join(f' | {"tac":>6} {"mips":>6} {"executed":>10}' for _ in OPTIMIZATION_LEVELS)
+    print(f'{"":>18}' + ''.join(f' | {f"-O{level}":^25}' for level in OPTIMIZATION_LEVELS))
+    print(f'{"program":>18}{header}')
+
+    for name, source in programs.items():
+        runs = [measure(source, level) for level in OPTIMIZATION_LEVELS]
+
+        if len({output for *_, output in runs}) != 1:
+            raise Exception(f'{name} prints differently at each level')
+
+        print(f'{name:>18}' + ''.join(f' | {tac:>6} {mips:>6} {executed:>10}' for tac, mips, executed, _ in runs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+What the compiled examples do at run time: executed instructions, loads and
+stores, and heap and stack used, measured with src/simulator.py.
+
+    python benchmarks/runtime.py [--json FILE]
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.compiler import Compiler
+from src.simulator import simulate
+
+
+def measure(source: str):
+    result = Compiler().compile(source)
+    if not result.success:
+        raise Exception(f'does not compile: {result.errors}')
+
+    return simulate(result.codegen.assemble()).stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--json', default=None, help='also write every report to this file')
+    args = arg_parser.parse_args()
+
+    reports = {}
+    print(f'{"program":>18} {"instructions":>13} {"loads":>9} {"stores":>9} {"heap":>8} {"stack":>6}')
+
+    for filename in sorted((ROOT / 'examples').iterdir()):
+        stats = measure(filename.read_text())
+        reports[filename.stem] = stats.to_dict()
+        print(f'{filename.stem:>18} {stats.instructions:>13} {stats.loads:>9} {stats.stores:>9} '
+              f'{stats.heap_bytes:>8} {stats.stack_bytes:>6}')
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(reports, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Symbol table scope handling: entering nested scopes, hopping into types
+and resolving names, on tables with hundreds of variables and types, plus
+the semantic and tac phases of generated programs that stress them.
+
+    python benchmarks/scopes.py [size ...]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.setrecursionlimit(100000)
+
+from src.compiler import Compiler
+from src.symbols import SymbolTable, TYPES
+from generate import generate
+
+def build_table(size: int) -> SymbolTable:
+    table = SymbolTable()
+
+    for i in range(size):
+        table.define_var(f'v{i}', TYPES['number'])
+        table.define_type(f'T{i}', [], [], [])
+    return table
+
+
+def nested_scopes(table: SymbolTable, size: int) -> float:
+    start = time.perf_counter()
+
+    scope = table
+    for i in range(size):
+        scope = scope.make_child()
+        scope.define_var(f'local{i}', TYPES['number'])
+        scope.get_type(f'v{i}')
+        scope.get_type(f'local{i // 2}')
+
+    return time.perf_counter() - start
+
+
+def type_hops(table: SymbolTable, size: int) -> float:
+    start = time.perf_counter()
+
+    for i in range(size):
+        inner = table.make_child_inside_type(f'T{i}')
+        inner.make_child_inside_type(f'T{size - i - 1}')
+
+    return time.perf_counter() - start
+
+
+def main(sizes: list[int]):
+    for size in sizes:
+        table = build_table(size)
+
+        print(f'{size:>6} symbols: {size} nested scopes {nested_scopes(table, size) * 1000:8.2f} ms, '
+              f'{2 * size} type hops {type_hops(table, size) * 1000:8.2f} ms')
+
+        for shape in ('nested_let', 'type_hierarchy'):
+            profile = Compiler(profile=True).compile(generate(shape, size)).profile.to_dict()
+            phases = {p['name']: p['wall_time'] for p in profile['phases']}
+            print(f'{"":>14} {shape:>15}: semantic {phases["semantic"] * 1000:8.2f} ms, tac {phases["tac"] * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main([int(s) for s in sys.argv[1:]] or [100, 200, 400])
@@ -0,0 +1,54 @@
+"""
+Concatenation at run time: a chain of `--pieces` literals, which compiles
+to a single call, against the same string built by a loop, one
+concatenation per iteration. Executed instructions and heap used,
+measured with src/simulator.py.
+
+    python benchmarks/strings.py [--pieces N]
+"""
+import sys
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.setrecursionlimit(100000)
+
+from generate import concat_chain
+from src.compiler import Compiler
+from src.simulator import simulate
+
+
+def concat_loop(size: int) -> str:
+    return f'''let s: String = "", i: Number = 0 in {{
+    while (i < {size}) {{
+        s := s @ "s" @ numberToString(i);
+        i := i + 1;
+    }}
+    print(s);
+}}
+'''
+
+
+def measure(source: str):
+    result = Compiler().compile(source)
+    if not result.success:
+        raise Exception(f'does not compile: {result.errors}')
+
+    return simulate(result.assemble())
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Cost of string concatenation')
+    arg_parser.add_argument('--pieces', type=int, default=100, help='pieces of the concatenated strings')
+    args = arg_parser.parse_args()
+
+    print(f'{"program":>12} {"pieces":>7} {"instructions":>13} {"heap":>8}')
+    for name, shape in (('chain', concat_chain), ('loop', concat_loop)):
+        for pieces in (10, args.pieces):
+            run = measure(shape(pieces))
+            print(f'{name:>12} {pieces:>7} {run.stats.instructions:>13} {run.stats.heap_bytes:>8}')
+
+
+if __name__ == '__main__':
+    main()
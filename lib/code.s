@@ -120,18 +120,19 @@ numberToString:
     cvt.w.s $f12, $f12
     mfc1 $t0, $f12
 
-    li $a0, 12
-	li $v0, 9
-	syscall
+	addi $sp, $sp, -4
+	sw $ra, 0($sp)
+
+    # the length word and 12 characters
+    li $a0, 16
+    jal heap_alloc
+    addiu $v0, $v0, 4
 
     move $a0, $v0
     la $a1, format
     move $a2, $t0
 
 	move $t0, $v0
-
-	addi $sp, $sp, -4
-	sw $ra, 0($sp)
 	
 	jal push_all
     jal sprintf
@@ -142,85 +143,551 @@ numberToString:
 
 
     move $v0, $t0
+
+    # Store the length right before the characters
+    move $t1, $v0
+    numberToString_length:
+        lb $t2, 0($t1)
+        beqz $t2, numberToString_end
+        addiu $t1, $t1, 1
+        j numberToString_length
+    numberToString_end:
+        subu $t1, $t1, $v0
+        sw $t1, -4($v0)
     jr $ra
 
 .text
 .globl concat_strings
 
+# A string points to its first character, it ends with a null and the word
+# right before it holds its length, so nothing has to be scanned.
+#
+# Concatenates all the pieces of a chain: the number of pieces is at 0($sp)
+# and the pieces above it, the first one the deepest.
 concat_strings:
-    # Load arguments from the stack
-    lw $a0, 8($sp)  # Load the first string address
-    lw $a1, 4($sp)  # Load the second string address
-    lw $a2, 0($sp)  # Load the boolean value
-
-    # Calculate the length of the first string
-    move $t1, $a0  # Save the first string address to $t1
-    concat_strings_loop1:
-        lb $t2, 0($t1)  # Load a byte from the first string
-        beqz $t2, concat_strings_end_loop1  # If byte is zero, go to concat_strings_end_loop1
-        addiu $t1, $t1, 1  # Increment the first string address
-        j concat_strings_loop1
-    concat_strings_end_loop1:
-        subu $t1, $t1, $a0  # Calculate the length of the first string
-
-    # Calculate the length of the second string
-	move $s2, $t2
-    move $t2, $a1  # Save the second string address to $t2
-    concat_strings_loop2:
-        lb $t3, 0($t2)  # Load a byte from the second string
-        beqz $t3, concat_strings_end_loop2  # If byte is zero, go to concat_strings_end_loop2
-        addiu $t2, $t2, 1  # Increment the second string address
-        j concat_strings_loop2
-    concat_strings_end_loop2:
-        subu $t2, $t2, $a1  # Calculate the length of the second string
-
-    # Calculate the total length
-    addu $a3, $t1, $t2  # Add the lengths of the two strings
-    addiu $a3, $a3, 2  # Add one for the null terminator
-    bnez $a2, concat_strings_add_space  # If boolean is non-zero, go to concat_strings_add_space
-    j concat_strings_alloc
-    concat_strings_add_space:
-        addiu $a3, $a3, 1  # Add one for the space
-
-    # Allocate memory for the buffer
-    concat_strings_alloc:
-		move $s0, $a0
-		move $a0, $a3
-        li $v0, 9  # syscall number for sbrk
+    lw $t0, 0($sp)  # Number of pieces
+    sll $t1, $t0, 2
+    addu $t1, $t1, $sp  # Address of the first piece, the last one is at 4($sp)
+
+    # Add up the lengths of the pieces
+    move $t2, $t1
+    li $t3, 0
+    concat_strings_measure:
+        lw $t4, 0($t2)
+        lw $t4, -4($t4)
+        addu $t3, $t3, $t4
+        addiu $t2, $t2, -4
+        bne $t2, $sp, concat_strings_measure
+
+    # Allocate the length word plus the characters and the null rounded up to a word
+    addiu $a0, $t3, 8
+    li $t5, -4
+    and $a0, $a0, $t5
+    addi $sp, $sp, -4
+    sw $ra, 0($sp)
+    jal heap_alloc
+    lw $ra, 0($sp)
+    addi $sp, $sp, 4
+    sw $t3, 0($v0)
+    addiu $v0, $v0, 4  # The result points to its first character
+    move $t5, $v0  # Where the next piece goes
+
+    concat_strings_piece:
+        lw $a1, 0($t1)
+        lw $t6, -4($a1)
+        addu $t7, $t5, $t6  # Where the piece ends
+        beq $t5, $t7, concat_strings_next
+        andi $t8, $t5, 3
+        bnez $t8, concat_strings_copy_bytes
+
+    # Every string starts on a word, a piece going on a word is copied a word at a time.
+    # The bytes of its last word past its end are overwritten by what comes next.
+    concat_strings_copy_words:
+        lw $t8, 0($a1)
+        sw $t8, 0($t5)
+        addiu $a1, $a1, 4
+        addiu $t5, $t5, 4
+        sltu $t8, $t5, $t7
+        bnez $t8, concat_strings_copy_words
+        move $t5, $t7
+        j concat_strings_next
+
+    concat_strings_copy_bytes:
+        lb $t8, 0($a1)
+        sb $t8, 0($t5)
+        addiu $a1, $a1, 1
+        addiu $t5, $t5, 1
+        bne $t5, $t7, concat_strings_copy_bytes
+
+    concat_strings_next:
+        addiu $t1, $t1, -4
+        bne $t1, $sp, concat_strings_piece
+
+    # Null-terminate the buffer
+    sb $zero, 0($t5)
+
+    # Return
+    jr $ra
+
+
+#______________________________________________________________________________________________
+
+# The heap. heap_alloc returns $a0 bytes set to zero, the contents of a block
+# starting on 8 bytes whose first word holds its size: bit 0 of it marks the
+# block alive during a collection and bit 1 marks it free. __block_starts__
+# has a bit for every 8 bytes of the heap, set where a block starts.
+#
+# Free blocks of up to 128 bytes are kept in a list for their size, larger
+# ones in a last list, with the next free block in their second word. The
+# rest is allocated bumping a cursor through a region, a large free block or
+# the bytes sbrk adds at the end of the heap.
+#
+# The heap is collected before growing past its threshold. Nothing tells
+# which words are pointers, so any word on the stack or in a register holding
+# the address of the contents of a block, or of the characters of a string,
+# keeps the block alive along with everything its words point to. Blocks
+# never move, the dead ones are swept into the free lists.
+#
+# __block_starts__ covers 8 MiB of heap, a program that needs more prints
+# "Out of memory" and exits.
+#
+# The generated code calls heap_alloc between any two instructions, it keeps
+# every register but $v0 and $ra.
+heap_alloc:
+    addiu $sp, $sp, -24
+    sw $t0, 4($sp)
+    sw $t1, 8($sp)
+    sw $t2, 12($sp)
+    sw $t3, 16($sp)
+    sw $t4, 20($sp)
+
+    la $t1, __heap__
+
+    # The size word and the contents rounded up to 8 bytes
+    addiu $t0, $a0, 11
+    li $t2, -8
+    and $t0, $t0, $t2
+
+heap_alloc_lists:
+    # A free block of the same size, its list is at 24 + (size / 8 - 1) * 4
+    sltiu $t2, $t0, 129
+    beqz $t2, heap_alloc_bump
+    srl $t2, $t0, 1
+    addu $t2, $t2, $t1
+    lw $v0, 20($t2)
+    beqz $v0, heap_alloc_bump
+    lw $t3, 4($v0)
+    sw $t3, 20($t2)
+    j heap_alloc_found
+
+heap_alloc_bump:
+    # Else the next bytes of the region
+    lw $v0, 12($t1)
+    addu $t2, $v0, $t0
+    lw $t3, 16($t1)
+    sltu $t3, $t3, $t2
+    bnez $t3, heap_alloc_refill
+    sw $t2, 12($t1)
+
+    # A new block starts
+    lw $t2, 4($t1)
+    subu $t2, $v0, $t2
+    srl $t2, $t2, 3
+    andi $t3, $t2, 7
+    li $t4, 1
+    sllv $t3, $t4, $t3
+    srl $t2, $t2, 3
+    la $t4, __block_starts__
+    addu $t2, $t2, $t4
+    lbu $t4, 0($t2)
+    or $t4, $t4, $t3
+    sb $t4, 0($t2)
+
+heap_alloc_found:
+    sw $t0, 0($v0)
+
+    # Clear the contents, a reused block still holds what it had
+    addu $t2, $v0, $t0
+    addiu $v0, $v0, 4
+    move $t3, $v0
+    heap_alloc_clear:
+        sw $zero, 0($t3)
+        addiu $t3, $t3, 4
+        bne $t3, $t2, heap_alloc_clear
+
+    lw $t0, 4($sp)
+    lw $t1, 8($sp)
+    lw $t2, 12($sp)
+    lw $t3, 16($sp)
+    lw $t4, 20($sp)
+    addiu $sp, $sp, 24
+    jr $ra
+
+heap_alloc_refill:
+    sw $ra, 0($sp)
+    jal heap_refill
+    lw $ra, 0($sp)
+    j heap_alloc_lists
+
+# Makes room for a block of $t0 bytes, in the region or in its free list.
+# These take $t1 at __heap__ and keep it.
+heap_refill:
+    addiu $sp, $sp, -20
+    sw $ra, 0($sp)
+    sw $a0, 4($sp)
+    sw $a1, 8($sp)
+    sw $a2, 12($sp)
+    sw $t5, 16($sp)
+    li $t5, 0  # Whether the heap was collected already
+
+    lw $t2, 4($t1)
+    bnez $t2, heap_refill_search
+
+    # The first allocation, the heap starts at the break rounded up to 8 bytes
+    li $a0, 4
+    li $v0, 9
+    syscall
+    addiu $t2, $v0, 4
+    andi $t3, $t2, 4
+    beqz $t3, heap_refill_start
+    li $v0, 9
+    syscall
+    addiu $t2, $t2, 4
+    heap_refill_start:
+        sw $t2, 4($t1)
+        sw $t2, 8($t1)
+        sw $t2, 12($t1)
+        sw $t2, 16($t1)
+
+heap_refill_search:
+    # The first large enough block of the large list becomes the region
+    addiu $t2, $t1, 88
+    heap_refill_next:
+        lw $a0, 0($t2)
+        beqz $a0, heap_refill_collect
+        lw $t3, 0($a0)
+        li $t4, -8
+        and $t3, $t3, $t4
+        sltu $t4, $t3, $t0
+        beqz $t4, heap_refill_take
+        addiu $t2, $a0, 4
+        j heap_refill_next
+
+    heap_refill_take:
+        lw $t4, 4($a0)
+        sw $t4, 0($t2)
+        jal heap_release
+        lw $t3, 0($a0)
+        li $t4, -8
+        and $t3, $t3, $t4
+        addu $t3, $a0, $t3
+        sw $a0, 12($t1)
+        sw $t3, 16($t1)
+
+        # The region isn't a block
+        move $t2, $a0
+        jal heap_block_bit
+        lbu $t4, 0($t2)
+        nor $t3, $t3, $zero
+        and $t4, $t4, $t3
+        sb $t4, 0($t2)
+        j heap_refill_end
+
+heap_refill_collect:
+    # Collect, once, rather than growing the heap past the threshold
+    bnez $t5, heap_refill_grow
+    lw $t2, 8($t1)
+    lw $t3, 4($t1)
+    subu $t2, $t2, $t3
+    addu $t2, $t2, $t0
+    lw $t3, 20($t1)
+    sltu $t3, $t3, $t2
+    beqz $t3, heap_refill_grow
+    li $t5, 1
+    jal heap_collect
+
+    # A free block of the same size will do
+    sltiu $t2, $t0, 129
+    beqz $t2, heap_refill_search
+    srl $t2, $t0, 1
+    addu $t2, $t2, $t1
+    lw $t2, 20($t2)
+    beqz $t2, heap_refill_search
+    j heap_refill_end
+
+heap_refill_grow:
+    # The region grows if it ends at the break, else a new one starts there
+    lw $t2, 8($t1)
+    lw $t3, 16($t1)
+    beq $t2, $t3, heap_refill_sbrk
+    jal heap_release
+    lw $t2, 8($t1)
+    sw $t2, 12($t1)
+    sw $t2, 16($t1)
+
+    heap_refill_sbrk:
+        # __block_starts__ covers 8 MiB
+        lw $t3, 12($t1)
+        addu $t3, $t3, $t0
+        lw $t4, 4($t1)
+        subu $t4, $t3, $t4
+        li $t2, 8388608
+        sltu $t2, $t2, $t4
+        bnez $t2, heap_out_of_memory
+
+        # Grow by what is missing rounded up to 4 KiB
+        lw $t2, 8($t1)
+        subu $a0, $t3, $t2
+        addiu $a0, $a0, 4095
+        li $t4, -4096
+        and $a0, $a0, $t4
+        li $v0, 9
         syscall
-        move $t1, $v0  # Save the buffer address to $t1
-		move $a0, $s0
-
-    # Copy the first string to the buffer
-    concat_strings_loop3:
-        lb $t2, 0($a0)  # Load a byte from the first string
-        beqz $t2, concat_strings_check_space  # If byte is zero, go to concat_strings_check_space
-        sb $t2, 0($t1)  # Store the byte to the buffer
-        addiu $a0, $a0, 1  # Increment the first string address
-        addiu $t1, $t1, 1  # Increment the buffer address
-        j concat_strings_loop3
-
-    # Check if a space is needed
-    concat_strings_check_space:
-        beqz $a2, concat_strings_loop4  # If boolean is zero, go to concat_strings_loop4
-        li $t2, 32  # ASCII for space
-        sb $t2, 0($t1)  # Store the space to the buffer
-        addiu $t1, $t1, 1  # Increment the buffer address
-
-    # Copy the second string to the buffer
-    concat_strings_loop4:
-        lb $t2, 0($a1)  # Load a byte from the second string
-        beqz $t2, concat_strings_end  # If byte is zero, go to concat_strings_end
-        sb $t2, 0($t1)  # Store the byte to the buffer
-        addiu $a1, $a1, 1  # Increment the second string address
-        addiu $t1, $t1, 1  # Increment the buffer address
-        j concat_strings_loop4
-
-    concat_strings_end:
-        # Null-terminate the buffer
-        sb $zero, 0($t1)
-
-        # Return
+        addu $t2, $t2, $a0
+        sw $t2, 8($t1)
+        sw $t2, 16($t1)
+
+heap_refill_end:
+    lw $ra, 0($sp)
+    lw $a0, 4($sp)
+    lw $a1, 8($sp)
+    lw $a2, 12($sp)
+    lw $t5, 16($sp)
+    addiu $sp, $sp, 20
+    jr $ra
+
+heap_out_of_memory:
+    la $a0, __out_of_memory__
+    li $v0, 4
+    syscall
+    li $v0, 10
+    syscall
+
+# What is left of the region goes to the free lists, a block like any other
+heap_release:
+    lw $a1, 12($t1)
+    lw $a2, 16($t1)
+    sw $a2, 12($t1)
+    subu $a2, $a2, $a1
+    beqz $a2, heap_release_end
+    addiu $sp, $sp, -4
+    sw $ra, 0($sp)
+    move $t2, $a1
+    jal heap_block_bit
+    lbu $t4, 0($t2)
+    or $t4, $t4, $t3
+    sb $t4, 0($t2)
+    jal heap_free
+    lw $ra, 0($sp)
+    addiu $sp, $sp, 4
+    heap_release_end:
+        jr $ra
+
+# The byte of __block_starts__ for the block at $t2 in $t2 and its bit in $t3
+heap_block_bit:
+    la $t4, __heap__
+    lw $t4, 4($t4)
+    subu $t2, $t2, $t4
+    srl $t2, $t2, 3
+    andi $t3, $t2, 7
+    li $t4, 1
+    sllv $t3, $t4, $t3
+    srl $t2, $t2, 3
+    la $t4, __block_starts__
+    addu $t2, $t2, $t4
+    jr $ra
+
+# Puts the block at $a1 of $a2 bytes in its free list
+heap_free:
+    ori $t3, $a2, 2
+    sw $t3, 0($a1)
+    la $t3, __heap__
+    sltiu $t4, $a2, 129
+    beqz $t4, heap_free_large
+    srl $t4, $a2, 1
+    addu $t3, $t3, $t4
+    addiu $t3, $t3, 20
+    j heap_free_push
+    heap_free_large:
+        addiu $t3, $t3, 88
+    heap_free_push:
+        lw $t4, 0($t3)
+        sw $t4, 4($a1)
+        sw $a1, 0($t3)
+    jr $ra
+
+heap_collect:
+    # The registers heap_alloc and heap_refill didn't save, what they point to is alive too
+    addiu $sp, $sp, -64
+    sw $ra, 0($sp)
+    sw $v1, 4($sp)
+    sw $a3, 8($sp)
+    sw $t6, 12($sp)
+    sw $t7, 16($sp)
+    sw $t8, 20($sp)
+    sw $t9, 24($sp)
+    sw $s0, 28($sp)
+    sw $s1, 32($sp)
+    sw $s2, 36($sp)
+    sw $s3, 40($sp)
+    sw $s4, 44($sp)
+    sw $s5, 48($sp)
+    sw $s6, 52($sp)
+    sw $s7, 56($sp)
+
+    # Every byte of the heap is in a block now
+    jal heap_release
+
+    move $s0, $t1
+    lw $s1, 4($s0)  # Where the heap starts
+    lw $s2, 8($s0)  # Where it ends
+    la $s3, __block_starts__
+    move $s4, $sp  # The marked blocks still to scan are pushed below
+
+    # Mark what the stack points to, from here to the bottom saved by main
+    move $t6, $sp
+    lw $t7, 0($s0)
+    heap_collect_roots:
+        lw $a0, 0($t6)
+        jal heap_mark
+        addiu $t6, $t6, 4
+        sltu $t8, $t7, $t6
+        beqz $t8, heap_collect_roots
+
+    # And what the marked blocks point to
+    heap_collect_trace:
+        beq $sp, $s4, heap_collect_sweep
+        lw $t6, 0($sp)
+        addiu $sp, $sp, 4
+        lw $t7, 0($t6)
+        li $t8, -8
+        and $t7, $t7, $t8
+        addu $t7, $t6, $t7
+        addiu $t6, $t6, 4
+        heap_collect_words:
+            lw $a0, 0($t6)
+            jal heap_mark
+            addiu $t6, $t6, 4
+            bne $t6, $t7, heap_collect_words
+        j heap_collect_trace
+
+heap_collect_sweep:
+    # Every block not marked goes back to the emptied free lists, the
+    # neighbouring ones as one block
+    addiu $t6, $s0, 24
+    addiu $t7, $s0, 92
+    heap_collect_empty:
+        sw $zero, 0($t6)
+        addiu $t6, $t6, 4
+        bne $t6, $t7, heap_collect_empty
+
+    move $t6, $s1
+    li $t7, 0  # The first of the dead blocks right before $t6, 0 if it's alive
+    li $s5, 0  # The bytes alive
+    heap_collect_block:
+        beq $t6, $s2, heap_collect_end
+        lw $t8, 0($t6)
+        li $t9, -8
+        and $t9, $t8, $t9
+        andi $t8, $t8, 1
+        beqz $t8, heap_collect_dead
+
+        sw $t9, 0($t6)
+        addu $s5, $s5, $t9
+        beqz $t7, heap_collect_next
+        move $a1, $t7
+        subu $a2, $t6, $t7
+        jal heap_free
+        li $t7, 0
+        j heap_collect_next
+
+    heap_collect_dead:
+        bnez $t7, heap_collect_merge
+        move $t7, $t6
+        j heap_collect_next
+
+    heap_collect_merge:
+        subu $t2, $t6, $s1
+        srl $t2, $t2, 3
+        andi $t3, $t2, 7
+        li $t4, 1
+        sllv $t3, $t4, $t3
+        srl $t2, $t2, 3
+        addu $t2, $t2, $s3
+        lbu $t4, 0($t2)
+        nor $t3, $t3, $zero
+        and $t4, $t4, $t3
+        sb $t4, 0($t2)
+
+    heap_collect_next:
+        addu $t6, $t6, $t9
+        j heap_collect_block
+
+heap_collect_end:
+    beqz $t7, heap_collect_threshold
+    move $a1, $t7
+    subu $a2, $s2, $t7
+    jal heap_free
+
+heap_collect_threshold:
+    # The next collection when the heap doubles what is alive, 64 KiB at least
+    sll $s5, $s5, 1
+    li $t8, 65536
+    sltu $t9, $s5, $t8
+    beqz $t9, heap_collect_restore
+    move $s5, $t8
+heap_collect_restore:
+    sw $s5, 20($s0)
+
+    lw $ra, 0($sp)
+    lw $v1, 4($sp)
+    lw $a3, 8($sp)
+    lw $t6, 12($sp)
+    lw $t7, 16($sp)
+    lw $t8, 20($sp)
+    lw $t9, 24($sp)
+    lw $s0, 28($sp)
+    lw $s1, 32($sp)
+    lw $s2, 36($sp)
+    lw $s3, 40($sp)
+    lw $s4, 44($sp)
+    lw $s5, 48($sp)
+    lw $s6, 52($sp)
+    lw $s7, 56($sp)
+    addiu $sp, $sp, 64
+    jr $ra
+
+# Marks the block whose contents, or characters, $a0 points to and pushes
+# it to be scanned, if it's a block not marked yet
+heap_mark:
+    andi $t8, $a0, 3
+    bnez $t8, heap_mark_end
+    andi $t8, $a0, 4
+    addiu $a0, $a0, -8
+    beqz $t8, heap_mark_block
+    addiu $a0, $a0, 4
+    heap_mark_block:
+        sltu $t8, $a0, $s1
+        bnez $t8, heap_mark_end
+        sltu $t8, $a0, $s2
+        beqz $t8, heap_mark_end
+        subu $t8, $a0, $s1
+        srl $t8, $t8, 3
+        andi $t9, $t8, 7
+        srl $t8, $t8, 3
+        addu $t8, $t8, $s3
+        lbu $t8, 0($t8)
+        srlv $t8, $t8, $t9
+        andi $t8, $t8, 1
+        beqz $t8, heap_mark_end
+        lw $t8, 0($a0)
+        andi $t9, $t8, 3
+        bnez $t9, heap_mark_end
+        ori $t8, $t8, 1
+        sw $t8, 0($a0)
+        addiu $sp, $sp, -4
+        sw $a0, 0($sp)
+    heap_mark_end:
         jr $ra
 
 
@@ -1,7 +1,20 @@
 .data
         __myspace__:       .space     200
+        # strings have their length in the word before them
+                           .word      4
         __true__:          .asciiz    "true"
+                           .word      5
         __false__:         .asciiz    "false"
+                           .word      9
         __undefined__:     .asciiz    "undefined"
+                           .word      1
         __newline__:       .asciiz    "\n" 
-        format: .asciiz "%d"
\ No newline at end of file
+        format: .asciiz "%d"
+
+        # heap_alloc: the bottom of the stack, where the heap starts and ends, the cursor
+        # and the end of the region, the size to collect at and 17 free lists
+        __heap__:          .word      0, 0, 0, 0, 0, 65536
+                           .space     68
+        # a bit for every 8 bytes of the heap, set where a block starts
+        __block_starts__:  .space     131072
+        __out_of_memory__: .asciiz    "Out of memory\n"
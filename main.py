@@ -1,39 +1,48 @@
-from src.parser import parser, ERRORS
-from src.semantic_checker import SemanticChecker
-from src.tac_generator import TacGenerator
-from src.codegen import MIPSCodeManager
-from src.utils import remove_comments, scape_characters
-
-def compile(input_code: str, out_file: str = 'a'):
-    input_code = remove_comments(input_code)
-    input_code = scape_characters(input_code)
-    
-    ast = parser.parse(input_code)
-    
-    if ERRORS or not ast:
-        if ENVIRONMENT_IS_MAIN:
-            for err in ERRORS:
-                print(err)
-        return False
+import os
+import sys
+import argparse
+
+from src.compiler import Compiler
+from src.batch import collect_files, compile_batch
+from src.profiling import write_report
+from src.output_cache import CachedOutput, default_cache
+from src.optimizer import OPTIMIZATION_LEVELS, DEFAULT_OPTIMIZATION_LEVEL
+
+def compile(input_code: str, out_file: str = 'a', profile: str = None, optimization: int = DEFAULT_OPTIMIZATION_LEVEL, use_cache: bool = False):
+    # a profile needs the phases to run
+    cache = default_cache() if use_cache and profile is None else None
+    output = cache.get(input_code, optimization) if cache else None
+    cached = output is not None
+
+    if output is None:
+        result = Compiler(profile is not None, optimization).compile(input_code)
+
+        if profile is not None:
+            write_report(result.profile.to_dict(), profile)
+
+        if ENVIRONMENT_IS_DEBUG and result.success:
+            print(result.tac)
+            print(result.codegen)
+
+        output = CachedOutput(result.assemble(), result.errors)
+        if cache:
+            cache.put(input_code, optimization, output)
 
-    semantic_checker = SemanticChecker()
+    # like the batch, keep a report on stdout apart from the status lines
+    status = sys.stderr if profile == '-' else sys.stdout
 
-    if not semantic_checker.check(ast):
+    if not output.success:
         if ENVIRONMENT_IS_MAIN:
-            for error in semantic_checker.errors:
-                print(error)
+            for error in output.errors:
+                print(error, file=status)
         return False
 
-    tac_generator = TacGenerator(semantic_checker.symbols)
-    tac_generator.generate(ast)
-    if ENVIRONMENT_IS_DEBUG: print(tac_generator)
+    if ENVIRONMENT_IS_MAIN:
+        os.makedirs('out', exist_ok=True)
+        with open(f'out/{out_file}.s', 'w') as out:
+            out.write(output.assembly)
 
-    codegen = MIPSCodeManager(semantic_checker.symbols)
-    codegen.generate_mips(tac_generator.code)
-    if ENVIRONMENT_IS_DEBUG:  print(codegen)
-    if ENVIRONMENT_IS_MAIN: codegen.store_code(f'out/{out_file}.s')
-
-    if ENVIRONMENT_IS_MAIN: print("Compiled Succesfully!")
+    if ENVIRONMENT_IS_MAIN: print("Compiled Succesfully!" + (" (cached)" if cached else ""), file=status)
 
     return True
 
@@ -43,8 +52,44 @@ ENVIRONMENT_IS_MAIN = False
 
 if __name__ == '__main__':
     ENVIRONMENT_IS_MAIN = True
+
+    arg_parser = argparse.ArgumentParser(description='HULK to MIPS compiler')
+    arg_parser.add_argument('inputs', nargs='*', help='HULK files or directories to compile in parallel')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (all cores by default)')
+    arg_parser.add_argument('-o', '--out', default='out', help='output directory for the .s files')
+    arg_parser.add_argument('--profile', action='store_true',
+                            help='report the time and memory of every phase as JSON')
+    arg_parser.add_argument('--profile-out', default='-', metavar='FILE',
+                            help='where --profile writes its report (stdout by default)')
+    arg_parser.add_argument('-O', dest='optimization', type=int, choices=OPTIMIZATION_LEVELS, default=DEFAULT_OPTIMIZATION_LEVEL,
+                            help=f'optimization level (-O{DEFAULT_OPTIMIZATION_LEVEL} by default)')
+    arg_parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                            help='compile even the sources whose output is cached from a previous run')
+    args = arg_parser.parse_args()
+
+    # never overwrite a source with the report
+    if args.profile_out != '-' and (args.profile_out.endswith('.hulk') or
+                                    any(os.path.abspath(args.profile_out) == os.path.abspath(i) for i in args.inputs)):
+        arg_parser.error(f'--profile-out {args.profile_out} would overwrite a source')
+
+    if args.inputs:
+        try:
+            items = collect_files(args.inputs, args.out)
+        except ValueError as e:
+            arg_parser.error(str(e))
+
+        # a report on stdout has to stay parseable, the status lines go to stderr then
+        report = (lambda line: print(line, file=sys.stderr)) if args.profile and args.profile_out == '-' else print
+
+        results = compile_batch(items, args.jobs, report, profile=args.profile, optimization=args.optimization, use_cache=args.use_cache)
+
+        if args.profile:
+            write_report([{'file': r.item.source, **r.profile} for r in results if r.profile], args.profile_out)
+
+        sys.exit(0 if all(r.success for r in results) else 1)
+
     filename = 'examples/fib.hulk'
     
     with open(filename, 'r') as file:
         input_code = file.read()
-        compile(input_code, filename.split('/')[1][:-5])
\ No newline at end of file
+        compile(input_code, filename.split('/')[1][:-5], args.profile_out if args.profile else None, args.optimization, args.use_cache)
\ No newline at end of file
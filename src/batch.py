@@ -0,0 +1,152 @@
+import os
+import time
+import traceback
+from os import path
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.output_cache import CachedOutput, default_cache
+
+class BatchItem:
+    def __init__(self, source: str, target: str) -> None:
+        self.source = source
+        self.target = target
+
+
+class BatchResult:
+    def __init__(self, item: BatchItem, success: bool, errors: list[str], lines: int, elapsed: float, profile: dict = None, cached: bool = False) -> None:
+        self.item = item
+        self.success = success
+        self.errors = errors
+        self.lines = lines
+        self.elapsed = elapsed
+        self.profile = profile
+        # whether the output came from the cache of src/output_cache.py
+        self.cached = cached
+
+    def __str__(self) -> str:
+        status = 'OK' if self.success else 'FAILED'
+        cached = ', cached' if self.cached else ''
+        return f'{status:>6} {self.item.source} ({self.elapsed * 1000:.1f} ms{cached})'
+
+
+def collect_files(inputs: list[str], out_dir: str = 'out') -> list[BatchItem]:
+    """
+    Expands the given files and directories into `.hulk` sources, a file
+    inside a directory keeps its relative path inside `out_dir`. A file
+    given on its own goes right in `out_dir`, or under its absolute path
+    if another file given on its own has the same name. Raises ValueError
+    if two sources would still compile to the same target.
+    """
+    files = [Path(_input) for _input in inputs if not Path(_input).is_dir()]
+    names = Counter(source.name for source in files)
+
+    items = []
+    targets = {}
+
+    for _input in inputs:
+        _input = Path(_input)
+
+        if _input.is_dir():
+            sources = [(source, source.relative_to(_input)) for source in sorted(_input.rglob('*.hulk'))]
+        elif names[_input.name] > 1:
+            absolute = Path(path.abspath(_input))
+            sources = [(_input, absolute.relative_to(absolute.anchor))]
+        else:
+            sources = [(_input, Path(_input.name))]
+
+        for source, relative in sources:
+            target = str(Path(out_dir) / relative.with_suffix('.s'))
+
+            if target in targets:
+                # the same file given twice compiles once
+                if path.abspath(targets[target]) == path.abspath(source):
+                    continue
+                raise ValueError(f'{targets[target]} and {source} would both compile to {target}')
+
+            targets[target] = source
+            items.append(BatchItem(str(source), target))
+
+    return items
+
+
+def init_worker():
+    # Loads the parser tables once per worker instead of once per file
+    import src.compiler
+
+
+def write_output(item: BatchItem, assembly: str) -> None:
+    os.makedirs(path.dirname(item.target) or '.', exist_ok=True)
+    with open(item.target, 'w') as out:
+        out.write(assembly)
+
+
+def compile_item(item: BatchItem, profile: bool = False, optimization: int = None, use_cache: bool = False) -> BatchResult:
+    from src.compiler import Compiler
+    from src.optimizer import DEFAULT_OPTIMIZATION_LEVEL
+
+    start = time.perf_counter()
+
+    # a source that can't be read fails alone, not the whole batch
+    try:
+        with open(item.source, 'r') as file:
+            input_code = file.read()
+    except (OSError, UnicodeDecodeError) as e:
+        return BatchResult(item, False, [f'Cannot read {item.source}: {e}'], 0, time.perf_counter() - start)
+
+    lines = input_code.count('\n') + 1
+    optimization = DEFAULT_OPTIMIZATION_LEVEL if optimization is None else optimization
+
+    # a profile needs the phases to run
+    cache = default_cache() if use_cache and not profile else None
+    output = cache.get(input_code, optimization) if cache else None
+
+    if output is not None:
+        if output.success:
+            write_output(item, output.assembly)
+        return BatchResult(item, output.success, output.errors, lines, time.perf_counter() - start, cached=True)
+
+    try:
+        result = Compiler(profile, optimization).compile(input_code)
+    except Exception:
+        return BatchResult(item, False, [traceback.format_exc()], lines, time.perf_counter() - start)
+
+    assembly = result.assemble()
+    if result.success:
+        write_output(item, assembly)
+    if cache:
+        cache.put(input_code, optimization, CachedOutput(assembly, result.errors))
+
+    profile = result.profile.to_dict() if result.profile else None
+
+    return BatchResult(item, result.success, result.errors, lines, time.perf_counter() - start, profile)
+
+
+def compile_batch(items: list[BatchItem], workers: int = None, report=print, profile: bool = False, optimization: int = None, use_cache: bool = False) -> list[BatchResult]:
+    results = []
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(workers, initializer=init_worker) as executor:
+        futures = [executor.submit(compile_item, item, profile, optimization, use_cache) for item in items]
+
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+
+            if report:
+                report(str(result))
+                for error in result.errors:
+                    report(f'\t{error}')
+
+    elapsed = time.perf_counter() - start
+
+    if report:
+        lines = sum(r.lines for r in results)
+        failed = sum(not r.success for r in results)
+        cached = sum(r.cached for r in results)
+
+        report(f'{len(results)} files ({failed} failed, {cached} cached, {len(results) - cached} compiled), {lines} lines in {elapsed:.2f} s: '
+               f'{len(results) / elapsed:.1f} files/s, {lines / elapsed:.1f} lines/s')
+
+    return results
@@ -0,0 +1,62 @@
+"""
+Fusion of comparisons with the conditional jumps that test them.
+
+The TacGenerator turns every condition of an `if`, `elif` or `while` into
+a boolean and a jump on it:
+
+    binop t < a b
+    jump_nz t if_0
+    jump end_if_0
+    label if_0
+
+When the boolean is only read by that jump, the comparison becomes the
+jump, with the opposite sense if it skips a `jump` to the label after it:
+
+    jump_if_not < a b end_if_0
+    label if_0
+
+Codegen emits a compare and a branch for `jump_if` and `jump_if_not`, and
+no 0 or 1 is computed. The opposite sense is its own instruction instead
+of the inverse comparison, which isn't the same for a NaN.
+
+It runs on the refined TAC, so both operands are floats or both are ints.
+"""
+from src.register_allocation import OPERANDS, NO_OPERANDS, is_temp
+from src.number_refinement import COMPARISONS, is_float_temp, is_integer_temp
+
+
+def comparable(a, b) -> bool:
+    """Whether codegen has a compare for the operands, bools aren't compared as numbers"""
+    return (is_float_temp(a) and is_float_temp(b)) or (is_integer_temp(a) and is_integer_temp(b))
+
+
+def fuse_function(code: list) -> list:
+    uses = {}
+    for tac_code in code:
+        for j in OPERANDS.get(tac_code[0], NO_OPERANDS)[1]:
+            if is_temp(tac_code[j]):
+                uses[tac_code[j]] = uses.get(tac_code[j], 0) + 1
+
+    result = []
+    i = 0
+    while i < len(code):
+        match code[i:i + 4]:
+            case [('binop', t, op, a, b), ('jump_nz', c, then), ('jump', other), ('label', label), *_] \
+                    if c == t and label == then and op in COMPARISONS and uses[t] == 1 and comparable(a, b):
+                result.extend((('jump_if_not', op, a, b, other), code[i + 3]))
+                i += 4
+            case [('binop', t, op, a, b), ('jump_nz', c, label), *_] \
+                    if c == t and op in COMPARISONS and uses[t] == 1 and comparable(a, b):
+                result.append(('jump_if', op, a, b, label))
+                i += 2
+            case _:
+                result.append(code[i])
+                i += 1
+
+    return result
+
+
+def fuse_branches(tac: dict) -> None:
+    """Fuses the comparisons of every function with their jumps, in place"""
+    for function in tac:
+        tac[function] = fuse_function(tac[function])
@@ -1,10 +1,28 @@
 import os
+import re
 from os import path
-from uuid import uuid1
 from queue import LifoQueue as stack
 from typing import Literal
 
 from src.semantic_checker import SymbolTable, TYPES
+from src.register_allocation import allocate, operands, is_float, is_temp
+from src.number_refinement import is_integer_temp
+
+LIB_DIR = path.join(path.dirname(__file__), '..', 'lib')
+
+# comparison -> branch taken when it holds between two ints
+INTEGER_BRANCHES = {'==': 'beq', '!=': 'bne', '<': 'blt', '<=': 'ble', '>': 'bgt', '>=': 'bge'}
+NEGATED_COMPARISONS = {'==': '!=', '!=': '==', '<': '>=', '<=': '>', '>': '<=', '>=': '<'}
+
+# comparison -> (float compare setting the flag, whether it takes the operands swapped)
+FLOAT_COMPARES = {
+    '==': ('c.eq.s', False),
+    '!=': ('c.eq.s', False),
+    '<': ('c.lt.s', False),
+    '<=': ('c.le.s', False),
+    '>': ('c.lt.s', True),
+    '>=': ('c.le.s', True),
+}
 
 class MIPSCodeManager:
     def __init__(self, symbol_table) -> None:
@@ -16,6 +34,10 @@ class MIPSCodeManager:
         self.sp_value = 0
         self.current_params_size = 0
         self.all_params_size = stack()
+        self.saved_registers = stack()
+
+        # TAC instruction name -> generate_<name> method
+        self.generators = {name[9:]: getattr(self, name) for name in dir(self) if name.startswith('generate_')}
     
     def __str__(self) -> str:
         _code = []
@@ -27,14 +49,17 @@ class MIPSCodeManager:
         
         return '\n'.join(_code)
     
-    def store_code(self, filename: str):
-        data_code = open('lib/data.s').read()
-        prep_code = open('lib/code.s').read()
+    def assemble(self) -> str:
+        data_code = open(path.join(LIB_DIR, 'data.s')).read()
+        prep_code = open(path.join(LIB_DIR, 'code.s')).read()
 
         data_code += '\n'
         data_code += '\n'.join([f'\t\t{name}:\t\t   {type}    {value}' for name, type, value in self.data_section])
 
-        code = f'{data_code}\n\n.text\n{str(self)}\n\n{prep_code}'
+        return f'{data_code}\n\n.text\n{str(self)}\n\n{prep_code}'
+
+    def store_code(self, filename: str):
+        code = self.assemble()
 
         if not path.exists(path.dirname(filename)):
             os.mkdir(path.dirname(filename))
@@ -46,11 +71,17 @@ class MIPSCodeManager:
         for function in tac:
             self.reset_registers()
             self.current_function = function
+            self.allocation = allocate(tac[function])
+            self.caller_saves = iter(self.allocation.caller_saves)
+
             if function == 'main':
+                # the collector in lib/code.s scans the stack down from here
                 self.code[function] = [
                     'addi $sp, $sp, -4',
                     'sw $ra, 0($sp)',
-                    'move $fp, $sp'
+                    'move $fp, $sp',
+                    'la $t0, __heap__',
+                    'sw $sp, 0($t0)'
                 ]
             else:
                 # This is for reseting the current frame
@@ -62,6 +93,11 @@ class MIPSCodeManager:
                     'move $fp, $sp'
                 ]
 
+            # spilled temporaries live right below $fp
+            if self.allocation.frame_size:
+                self.code[function].append(f'addi $sp, $sp, {-self.allocation.frame_size}')
+                self.sp_value = self.allocation.frame_size
+
             for line in tac[function]:
                 self.add_line_to_code(line)
             
@@ -71,26 +107,11 @@ class MIPSCodeManager:
                 ])
 
     def reset_registers(self) -> None:
-        # $t0, $s0 and $f12 registers are for special uses like float conversions and memory addressing
-        self.normal_registers = {
-			'$t1' : None, '$t2' : None, '$t3' : None, '$t4' : None, '$t5' : None, 
-			'$t6' : None, '$t7' : None, '$t8' : None, '$t9' : None, '$s1' : None, 
-			'$s2' : None, '$s3' : None, '$s4' : None     
-        }
-
-        self.float_registers = {
-            '$f13' : None, '$f14' : None, '$f15' : None, '$f15' : None, 
-            '$f16' : None, '$f17' : None, '$f18' : None,
-        }
-
-        self.normal_registers_descriptors = {}
-        self.float_registers_descriptors = {}
-
-        self.free_normal_registers = [e for e in self.normal_registers.keys()]
-        self.free_float_registers = [e for e in self.float_registers.keys()]
-
-        self.busy_normal_registers = []
-        self.busy_float_registers = []
+        self.allocation = None
+        # spilled temporaries of the current instruction -> scratch register holding them
+        self.scratch_registers = {}
+        # labels made up by codegen in the current function
+        self.label_count = 0
 
         self.current_function = ''
         # self.symbol_table = SymbolTable()
@@ -98,9 +119,16 @@ class MIPSCodeManager:
     
     def add_line_to_code(self, tac_code) -> bool:
         code = self.code[self.current_function]
-        
+        defs, uses = operands(tac_code)
+        self.scratch_registers = self.allocation.scratch_registers(uses + defs)
+
         try:
-            method = self.__getattribute__(f'generate_{tac_code[0]}')
+            for temp in uses:
+                if temp in self.scratch_registers:
+                    inst = 'lwc1' if is_float(temp) else 'lw'
+                    code.append(f'{inst} {self.scratch_registers[temp]}, {self.allocation.spill_address(temp)}')
+
+            method = self.generators[tac_code[0]]
             result = method(tac_code)
 
             assert result != None
@@ -110,33 +138,24 @@ class MIPSCodeManager:
             elif type(result) is tuple:
                 for line in result:
                     code.append(line)
+
+            for temp in defs:
+                if temp in self.scratch_registers:
+                    inst = 'swc1' if is_float(temp) else 'sw'
+                    code.append(f'{inst} {self.scratch_registers[temp]}, {self.allocation.spill_address(temp)}')
         except:
             raise
 
-    def get_register(self, temp: str) -> str:
-        is_float = temp.startswith('f')
+    def new_label(self) -> str:
+        # no other label starts with '_', and the counter has no '_' to mix it up with a longer function name
+        self.label_count += 1
+        return f'_{self.current_function}_{self.label_count}'
 
-        regs = self.normal_registers if not is_float else self.float_registers
-        regs_desc = self.normal_registers_descriptors if not is_float else self.float_registers_descriptors
-        busy_regs = self.busy_normal_registers if not is_float else self.busy_float_registers
-        free_regs = self.free_normal_registers if not is_float else self.free_float_registers
-
-        if temp in regs.values():
-            reg = regs_desc[temp]
-        
-        else:
-            if free_regs:
-                reg = free_regs.pop(0)
-                regs_desc[temp] = reg
-                regs[reg] = temp
-                busy_regs.append(reg)
-            else:
-                reg = busy_regs.pop(0)
-                regs_desc[temp] = reg
-                regs[reg] = temp
-                busy_regs.append(reg)
+    def get_register(self, temp: str) -> str:
+        if temp in self.scratch_registers:
+            return self.scratch_registers[temp]
 
-        return reg
+        return self.allocation.registers[temp]
     
     def generate_assign(self, tac_code):
         _, t0, value = tac_code
@@ -147,7 +166,8 @@ class MIPSCodeManager:
             symb = self.symbol_table.get_symbol(t0, 'var')
             reg = self.get_register(value)
 
-            inst = 'swc1' if symb.type == TYPES['number'] else 'sw'
+            # Numbers refined to integers are stored as words
+            inst = 'swc1' if is_float(value) else 'sw'
 
             return f'{inst} {reg}, {self.sp_value-symb.alias-symb.type.size}($sp)'
         
@@ -159,6 +179,11 @@ class MIPSCodeManager:
 
             return f'{inst} {reg}, {self.sp_value-symb.alias-symb.type.size}($sp)'
 
+        elif is_temp(value):
+            # copies made by inlining
+            inst = 'mov.s' if is_float(t0) else 'move'
+            return f'{inst} {self.get_register(t0)}, {self.get_register(value)}'
+
         elif type(value) is not str:
             reg = self.get_register(t0)
             if reg.startswith('$f'):
@@ -167,7 +192,9 @@ class MIPSCodeManager:
                 return f'li {reg}, {int(value)}'
 
         elif value.startswith('\"'): # this is a string
-            str_name = f'string_{len(self.data_section) + 1}'
+            str_name = f'string_{len(self.data_section) // 2 + 1}'
+            # the runtime finds the length of a string in the word before it
+            self.data_section.append((f'{str_name}_length', '.word', string_length(value)))
             self.data_section.append((str_name, '.asciiz', value))
 
             if self.symbol_table.is_defined(t0, 'var'):
@@ -186,6 +213,7 @@ class MIPSCodeManager:
         symb = self.symbol_table.get_symbol(name, 'var')
 
         self.symbol_table.variables.pop(name)
+        self.sp_value -= symb.type.size
 
         return f'addi $sp, $sp, {symb.type.size}'
     
@@ -196,7 +224,10 @@ class MIPSCodeManager:
         rg2 = self.get_register(a)
         rg3 = self.get_register(b)
 
-        lbl = random_label()
+        if is_integer_temp(a):
+            return self.integer_binop(op, rg1, rg2, rg3)
+
+        lbl = self.new_label()
 
         match op:
             case '+':
@@ -260,6 +291,37 @@ class MIPSCodeManager:
             case '||':
                 return f'or {rg1}, {rg2}, {rg3}'
         
+    def integer_binop(self, op, rg1, rg2, rg3):
+        match op:
+            case '+':
+                return f'addu {rg1}, {rg2}, {rg3}'
+            case '-':
+                return f'subu {rg1}, {rg2}, {rg3}'
+            case '==':
+                return (
+                    f'xor {rg1}, {rg2}, {rg3}',
+                    f'sltiu {rg1}, {rg1}, 1'
+                )
+            case '!=':
+                return (
+                    f'xor {rg1}, {rg2}, {rg3}',
+                    f'sltu {rg1}, $zero, {rg1}'
+                )
+            case '<=':
+                return (
+                    f'slt {rg1}, {rg3}, {rg2}',
+                    f'xori {rg1}, {rg1}, 1'
+                )
+            case '>=':
+                return (
+                    f'slt {rg1}, {rg2}, {rg3}',
+                    f'xori {rg1}, {rg1}, 1'
+                )
+            case '<':
+                return f'slt {rg1}, {rg2}, {rg3}'
+            case '>':
+                return f'slt {rg1}, {rg3}, {rg2}'
+
     def generate_unary(self, tac_code):
         _, t0, op, t1 = tac_code
 
@@ -267,12 +329,15 @@ class MIPSCodeManager:
         rg1 = self.get_register(t1)
 
         match op:
+            case '-' if is_integer_temp(t1):
+                return f'subu {rg0}, $zero, {rg1}'
             case '-':
                 return f'neg.s {rg0}, {rg1}'
             case '+':
                 return ''
             case '!':
-                return f'not {rg0}, {rg1}'
+                # Bools are 0 or 1, `not` would turn 1 into -2
+                return f'xori {rg0}, {rg1}, 1'
     
     def generate_declare(self, tac_code):
         _, name, size, type = tac_code
@@ -282,12 +347,51 @@ class MIPSCodeManager:
 
         return f'addi $sp, $sp, {-type.size}'
     
+    def generate_int_to_float(self, tac_code):
+        _, f0, t0 = tac_code
+
+        rf0 = self.get_register(f0)
+        rt0 = self.get_register(t0)
+
+        return (
+            f'mtc1 {rt0}, {rf0}',
+            f'cvt.s.w {rf0}, {rf0}'
+        )
+
     def generate_jump_nz(self, tac_code):
         _, t0, label = tac_code
 
         reg = self.get_register(t0)
         return f'bnez {reg}, {label}'
     
+    def generate_jump_if(self, tac_code):
+        return self.compare_and_branch(tac_code, True)
+
+    def generate_jump_if_not(self, tac_code):
+        return self.compare_and_branch(tac_code, False)
+
+    def compare_and_branch(self, tac_code, sense: bool):
+        _, op, a, b, label = tac_code
+
+        rg1 = self.get_register(a)
+        rg2 = self.get_register(b)
+
+        if is_integer_temp(a):
+            if not sense:
+                op = NEGATED_COMPARISONS[op]
+            return f'{INTEGER_BRANCHES[op]} {rg1}, {rg2}, {label}'
+
+        # the float flag holds the comparison, but for != which is the negation of c.eq.s
+        compare, swapped = FLOAT_COMPARES[op]
+        if swapped:
+            rg1, rg2 = rg2, rg1
+        branch = 'bc1t' if sense != (op == '!=') else 'bc1f'
+
+        return (
+            f'{compare} {rg1}, {rg2}',
+            f'{branch} {label}'
+        )
+
     def generate_jump(self, tac_code):
         _, label = tac_code
         return f'j {label}'
@@ -309,8 +413,19 @@ class MIPSCodeManager:
     def generate_function_call_start(self, tac_code):
         self.all_params_size.put(self.current_params_size)
         self.current_params_size = 0
-        self.sp_value += 92
-        return 'jal push_all'
+
+        # only the registers still needed after the call are saved, above its params
+        saved = next(self.caller_saves)
+        self.saved_registers.put(saved)
+
+        if not saved:
+            return ()
+
+        self.sp_value += 4 * len(saved)
+
+        return (f'addi $sp, $sp, {-4 * len(saved)}',) + tuple(
+            f'{"swc1" if reg.startswith("$f") else "sw"} {reg}, {4 * i}($sp)' for i, reg in enumerate(saved)
+        )
     
     def generate_set_param(self, tac_code):
         _, t0, type = tac_code
@@ -332,19 +447,21 @@ class MIPSCodeManager:
 
         reg = self.get_register(t0)
         
-        inst = 'mov.s' if self.symbol_table.get_return_type(func) == TYPES['number'] else 'move'
-        retv = '$f0' if self.symbol_table.get_return_type(func) == TYPES['number'] else '$v0'
+        # methods aren't in the symbol table under their labels, the temp knows the type
+        inst = 'mov.s' if is_float(t0) else 'move'
+        retv = '$f0' if is_float(t0) else '$v0'
 
+        saved = self.saved_registers.get()
         tmp = self.current_params_size
-        self.sp_value -= 92 + tmp
+        self.sp_value -= 4 * len(saved) + tmp
         self.current_params_size = 0
 
-        return (
-            f'jal {func}',
-            f'addi $sp, $sp, {tmp}',
-            'jal pop_all',
-            f'{inst} {reg}, {retv}'
+        restore = tuple(
+            f'{"lwc1" if r.startswith("$f") else "lw"} {r}, {tmp + 4 * i}($sp)' for i, r in enumerate(saved)
         )
+        pop = (f'addi $sp, $sp, {tmp + 4 * len(saved)}',) if tmp or saved else ()
+
+        return (f'jal {func}',) + restore + pop + (f'{inst} {reg}, {retv}',)
     
     def generate_function_call_end(self, tac_code):
         self.current_params_size = self.all_params_size.get()
@@ -357,8 +474,8 @@ class MIPSCodeManager:
             return 'nop'
 
         reg = self.get_register(t0)
-        inst = 'mov.s' if self.symbol_table.get_return_type(self.current_function) == TYPES['number'] else 'move'
-        retv = '$f0' if self.symbol_table.get_return_type(self.current_function) == TYPES['number'] else '$v0'
+        inst = 'mov.s' if is_float(t0) else 'move'
+        retv = '$f0' if is_float(t0) else '$v0'
 
         return (
             f'{inst} {retv}, {reg}',
@@ -376,8 +493,7 @@ class MIPSCodeManager:
 
         return (
             f'li $a0, {size * tp.size}',
-            'li $v0, 9',
-            'syscall',
+            'jal heap_alloc',
             f'move {reg}, $v0'
         )
 
@@ -402,9 +518,12 @@ class MIPSCodeManager:
             arr_reg = self.get_register(name)
             
             if type(index) is int:
+                return f'{inst} {reg}, {index * 4}({arr_reg})'
+            elif is_integer_temp(index):
+                rgi = self.get_register(index)
                 return (
-                    f'move $t0, {arr_reg}',
-                    f'addi $t0, $t0, {index * 4}',
+                    f'sll $t0, {rgi}, 2',
+                    f'add $t0, $t0, {arr_reg}',
                     f'{inst} {reg}, 0($t0)'
                 )
             else:
@@ -424,6 +543,14 @@ class MIPSCodeManager:
                 f'addi $t0, $t0, {index * 4}',
                 f'{inst} {reg}, 0($t0)'
             )
+        elif is_integer_temp(index):
+            rgi = self.get_register(index)
+            return (
+                f'sll $t0, {rgi}, 2',
+                f'lw $s0, {self.sp_value-symb.alias-symb.type.size}($sp)',
+                f'add $t0, $t0, $s0',
+                f'{inst} {reg}, 0($t0)'
+            )
         else:
             rgi = self.get_register(index)
             return (
@@ -441,8 +568,7 @@ class MIPSCodeManager:
         r0 = self.get_register(t0)
 
         return (f'li $a0, {type.size}',
-                'li $v0, 9',
-                'syscall',
+                'jal heap_alloc',
                 f'move {r0}, $v0')
 
     def generate_set(self, tac_code):
@@ -464,6 +590,6 @@ class MIPSCodeManager:
         return f'{inst} {r0}, {addr}({r1})'
 
 
-def random_label():
-    tmp = uuid1().__str__().replace('-', '_')
-    return f'_{tmp}'
\ No newline at end of file
+def string_length(literal: str) -> int:
+    """The characters of a string literal once its escapes are assembled"""
+    return len(re.sub(r'\\.', ' ', literal[1:-1]))
@@ -0,0 +1,101 @@
+from copy import copy
+from functools import partial
+
+from src.lexer import lexer
+from src.parser import parser, syntax_error
+from src.symbols import CompilationContext
+from src.semantic_checker import SemanticChecker
+from src.tac_generator import TacGenerator
+from src.codegen import MIPSCodeManager
+from src.optimizer import optimize, optimize_assembly, DEFAULT_OPTIMIZATION_LEVEL
+from src.utils import remove_comments, scape_characters
+from src.peephole import PeepholeStats
+from src.profiling import CompilationProfile, measure, count_ast_nodes, count_instructions
+
+class CompilationResult:
+    def __init__(self, errors: list[str], tac: TacGenerator = None, codegen: MIPSCodeManager = None, profile: CompilationProfile = None, peephole: PeepholeStats = None) -> None:
+        self.errors = errors
+        self.tac = tac
+        self.codegen = codegen
+        self.profile = profile
+        # rules the peephole pass fired, None at -O0
+        self.peephole = peephole
+
+    @property
+    def success(self) -> bool:
+        return self.codegen is not None
+
+    def assemble(self) -> str:
+        return self.codegen.assemble() if self.success else None
+
+
+class Compiler:
+    """
+    Compiles HULK programs without touching module level state, every call
+    to `compile` runs inside a fresh `CompilationContext` with its own lexer
+    and parser stacks, so it is safe to reuse an instance and to share it
+    between threads.
+
+    With `profile=True` each result carries a `CompilationProfile` of the
+    parse, semantic, tac and codegen phases (memory is traced with the
+    process wide `tracemalloc`, so profile one compilation at a time)
+
+    `optimization` is the `-O` level of `src.optimizer`
+    """
+
+    def __init__(self, profile: bool = False, optimization: int = DEFAULT_OPTIMIZATION_LEVEL) -> None:
+        self.profile = profile
+        self.optimization = optimization
+
+    def compile(self, input_code: str) -> CompilationResult:
+        return CompilationContext().run(self.run_pipeline, input_code)
+
+    def run_pipeline(self, input_code: str) -> CompilationResult:
+        profile = CompilationProfile() if self.profile else None
+        errors = []
+
+        with measure(profile, 'parse') as phase:
+            input_code = remove_comments(input_code)
+            input_code = scape_characters(input_code)
+
+            ast = self.parse(input_code, errors)
+
+        phase.count(count_ast_nodes, ast)
+
+        if errors or not ast:
+            return CompilationResult(errors, profile=profile)
+
+        with measure(profile, 'semantic') as phase:
+            semantic_checker = SemanticChecker()
+            valid = semantic_checker.check(ast)
+
+        phase.count(count_ast_nodes, ast)
+
+        if not valid:
+            return CompilationResult(semantic_checker.errors, profile=profile)
+
+        with measure(profile, 'tac') as phase:
+            tac_generator = TacGenerator(semantic_checker.symbols)
+            tac_generator.generate(ast)
+            optimize(tac_generator.code, self.optimization)
+
+        phase.count(count_instructions, tac_generator.code)
+
+        with measure(profile, 'codegen') as phase:
+            codegen = MIPSCodeManager(semantic_checker.symbols)
+            codegen.generate_mips(tac_generator.code)
+            peephole = optimize_assembly(codegen.code, self.optimization)
+
+        phase.count(count_instructions, codegen.code)
+
+        return CompilationResult([], tac_generator, codegen, profile, peephole)
+
+    def parse(self, input_code: str, errors: list[str]):
+        _lexer = lexer.clone()
+        _lexer.lineno = 1
+
+        # The tables are shared, only the parsing stacks and error handler are per call
+        _parser = copy(parser)
+        _parser.errorfunc = partial(syntax_error, errors=errors)
+
+        return _parser.parse(input_code, lexer=_lexer)
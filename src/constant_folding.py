@@ -0,0 +1,224 @@
+"""
+Constant folding and propagation over TAC.
+
+Literals only reach the code through `assign`, so a temporary with a single
+definition that assigns a Number or Bool literal holds that constant
+everywhere it is used, the same goes for a local variable declared and
+assigned once with a constant. Binops and unary operations whose operands
+are all constants become `assign`s of their value, `jump_nz` on a known
+condition becomes a `jump` or disappears, and the constant `assign`s nobody
+reads any more are dropped.
+
+Numbers are folded in single precision, like the FPU would compute them:
+literals are rounded when they are propagated and operands again before
+every operation. Divisions by zero and results that don't fit a float are
+left for run time.
+"""
+import math
+import struct
+import operator
+
+from src.register_allocation import OPERANDS, NO_OPERANDS, is_temp
+
+ARITHMETIC = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+}
+
+COMPARISONS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+LOGIC = {
+    '&&': lambda a, b: a and b,
+    '||': lambda a, b: a or b,
+}
+
+def single(value: float) -> float:
+    """The value rounded to single precision"""
+    return struct.unpack('<f', struct.pack('<f', value))[0]
+
+def is_constant(value) -> bool:
+    # strings are assigned as their quoted text, only Numbers and Bools fold
+    return value.__class__ in (float, bool)
+
+def constant(literal):
+    """The value the program holds for `literal`, None when a float can't hold it"""
+    if literal.__class__ is not float:
+        return literal
+    try:
+        return single(literal)
+    except OverflowError:
+        return None
+
+
+def fold_binop(op: str, a, b):
+    """The value of `a op b`, None when it can't be computed at compile time"""
+    if a.__class__ is float and b.__class__ is float:
+        a, b = constant(a), constant(b)
+        if a is None or b is None:
+            return None
+
+        if op in COMPARISONS:
+            return COMPARISONS[op](a, b)
+
+        if op in ARITHMETIC and not (op == '/' and b == 0):
+            try:
+                value = single(ARITHMETIC[op](a, b))
+            except OverflowError:
+                return None
+            return value if math.isfinite(value) else None
+
+    elif a.__class__ is bool and b.__class__ is bool and op in LOGIC:
+        return LOGIC[op](a, b)
+
+    return None
+
+def fold_unary(op: str, a):
+    match op, a.__class__:
+        case '-', cls if cls is float:
+            return -a
+        case '+', cls if cls is float:
+            return a
+        case '!', cls if cls is bool:
+            return not a
+    return None
+
+
+def definitions(code: list) -> dict[str, int]:
+    """How many instructions define each temporary"""
+    counts = {}
+    for tac_code in code:
+        for i in OPERANDS.get(tac_code[0], NO_OPERANDS)[0]:
+            counts[tac_code[i]] = counts.get(tac_code[i], 0) + 1
+    return counts
+
+def variable_names(code: list) -> set[str]:
+    """The variables an `assign` of the function writes or reads"""
+    names = set()
+    for tac_code in code:
+        if tac_code[0] == 'assign':
+            for value in tac_code[1:]:
+                if value.__class__ is str and not is_temp(value) and not value.startswith('"'):
+                    names.add(value)
+    return names
+
+def constant_variables(code: list, shared: set[str]) -> set[str]:
+    """
+    The variables declared and assigned exactly once in the function and
+    not seen by any other, those hold a constant if their value is one
+    """
+    declares = {}
+    assigns = {}
+    params = set()
+
+    for tac_code in code:
+        match tac_code:
+            case ('declare', name, _, _):
+                declares[name] = declares.get(name, 0) + 1
+            case ('assign', target, _) if not is_temp(target):
+                assigns[target] = assigns.get(target, 0) + 1
+            case ('get_params', names):
+                params.update(name for name, _ in names)
+
+    return {
+        name for name, count in declares.items()
+        if count == 1 and assigns.get(name) == 1 and name not in params and name not in shared
+    }
+
+
+def fold_function(code: list, shared: set[str] = frozenset()) -> list:
+    defined = definitions(code)
+    variables = constant_variables(code, shared)
+    constants = {}
+
+    def value(operand):
+        return constants.get(operand, operand) if operand.__class__ is str else operand
+
+    folded = []
+
+    for tac_code in code:
+        match tac_code:
+            case ('assign', target, literal) if is_constant(literal) and defined.get(target) == 1:
+                if constant(literal) is not None:
+                    constants[target] = constant(literal)
+
+            case ('assign', target, source) if target in variables and source in constants:
+                # the store stays until every load of the variable is gone
+                constants[target] = constants[source]
+
+            case ('assign', target, source) if is_temp(target) and source in variables and source in constants:
+                if defined.get(target) == 1:
+                    constants[target] = constants[source]
+                tac_code = ('assign', target, constants[source])
+
+            case ('binop', target, op, a, b) if a in constants and b in constants:
+                result = fold_binop(op, constants[a], constants[b])
+                if result is not None:
+                    tac_code = ('assign', target, result)
+                    if defined.get(target) == 1:
+                        constants[target] = result
+
+            case ('unary', target, op, a) if a in constants:
+                result = fold_unary(op, constants[a])
+                if result is not None:
+                    tac_code = ('assign', target, result)
+                    if defined.get(target) == 1:
+                        constants[target] = result
+
+            case ('jump_nz', condition, label) if value(condition).__class__ is bool:
+                if not value(condition):
+                    continue
+                tac_code = ('jump', label)
+
+        folded.append(tac_code)
+
+    return remove_unused_constants(folded, variables)
+
+
+def remove_unused_constants(code: list, variables: set[str]) -> list:
+    """Drops the constant assigns to temporaries and the stores to variables nobody reads"""
+    read = set()
+    for tac_code in code:
+        for i in OPERANDS.get(tac_code[0], NO_OPERANDS)[1]:
+            if tac_code[i].__class__ is str:
+                read.add(tac_code[i])
+
+    dead_stores = {name for name in variables if name not in read}
+
+    def needed(tac_code) -> bool:
+        if tac_code[0] != 'assign':
+            return True
+
+        _, target, source = tac_code
+        if target in dead_stores:
+            return False
+        return not (is_temp(target) and is_constant(source) and target not in read)
+
+    code = [tac_code for tac_code in code if needed(tac_code)]
+
+    # the temporaries those stores read may be constants nobody else reads
+    if dead_stores:
+        return remove_unused_constants(code, set())
+    return code
+
+
+def fold_constants(tac: dict) -> None:
+    """Folds the code of every function in place"""
+    functions = {}
+    for code in tac.values():
+        for name in variable_names(code):
+            functions[name] = functions.get(name, 0) + 1
+
+    # a name the function mentions and some other function does too
+    shared = {name for name, count in functions.items() if count > 1}
+
+    for function in tac:
+        tac[function] = fold_function(tac[function], shared)
@@ -0,0 +1,336 @@
+"""
+Basic blocks and control flow graph of the TAC of one function.
+
+A block starts at the first instruction, at every `label` and after every
+`jump`, `jump_nz` and `return`, and spans the instructions up to the next
+start. Blocks are numbered in code order, so block 0 is the entry and
+falling through goes to the next number.
+
+On top of the blocks the graph computes, when first asked, the dominator
+tree (Cooper, Harvey and Kennedy's iterative algorithm over the reverse
+postorder) and the natural loops of the back edges with their nesting.
+`to_dot` draws it all for Graphviz:
+
+    python -m src.control_flow program.hulk [function] [-O N] > cfg.dot
+"""
+import sys
+import argparse
+from functools import cached_property
+
+BRANCHES = ('jump', 'jump_nz', 'return')
+
+
+class BasicBlock:
+    __slots__ = ('index', 'start', 'end', 'successors', 'predecessors')
+
+    def __init__(self, index: int, start: int, end: int) -> None:
+        self.index = index
+        # the block is code[start:end]
+        self.start = start
+        self.end = end
+        self.successors: list[int] = []
+        self.predecessors: list[int] = []
+
+    def __repr__(self) -> str:
+        return f'B{self.index}[{self.start}:{self.end}] -> {self.successors}'
+
+
+class Loop:
+    """The natural loop of a header, with the blocks of all its back edges"""
+
+    def __init__(self, header: int, blocks: set[int]) -> None:
+        self.header = header
+        self.blocks = blocks
+        self.parent: Loop = None
+        self.children: list[Loop] = []
+
+    @property
+    def depth(self) -> int:
+        return 1 + (self.parent.depth if self.parent else 0)
+
+    def __repr__(self) -> str:
+        return f'Loop(B{self.header}, {sorted(self.blocks)})'
+
+
+class ControlFlowGraph:
+    def __init__(self, code: list) -> None:
+        self.code = code
+        self.blocks: list[BasicBlock] = []
+        # label -> index of the block it starts
+        self.labels: dict[str, int] = {}
+
+        self.split_blocks()
+        self.link_blocks()
+
+    def split_blocks(self) -> None:
+        start = 0
+
+        for i, tac_code in enumerate(self.code):
+            if tac_code[0] == 'label' and i > start:
+                self.add_block(start, i)
+                start = i
+
+            if tac_code[0] == 'label':
+                self.labels[tac_code[1]] = len(self.blocks)
+            elif tac_code[0] in BRANCHES:
+                self.add_block(start, i + 1)
+                start = i + 1
+
+        if start < len(self.code) or not self.blocks:
+            self.add_block(start, len(self.code))
+
+    def add_block(self, start: int, end: int) -> None:
+        self.blocks.append(BasicBlock(len(self.blocks), start, end))
+
+    def link_blocks(self) -> None:
+        for block in self.blocks:
+            last = self.code[block.end - 1] if block.end > block.start else ('nop',)
+
+            if last[0] in ('jump', 'jump_nz'):
+                block.successors.append(self.labels[last[-1]])
+            if last[0] not in ('jump', 'return') and block.index + 1 < len(self.blocks):
+                if block.index + 1 not in block.successors:
+                    block.successors.append(block.index + 1)
+
+            for successor in block.successors:
+                self.blocks[successor].predecessors.append(block.index)
+
+    def instructions(self, block: BasicBlock) -> list:
+        return self.code[block.start:block.end]
+
+    def reachable(self) -> list[bool]:
+        """Whether each block can run, walking the successors from the entry"""
+        seen = [False] * len(self.blocks)
+        seen[0] = True
+        pending = [0]
+
+        while pending:
+            for successor in self.blocks[pending.pop()].successors:
+                if not seen[successor]:
+                    seen[successor] = True
+                    pending.append(successor)
+
+        return seen
+
+    def block_of(self, index: int) -> BasicBlock:
+        """The block holding the instruction at `index`"""
+        low, high = 0, len(self.blocks) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.blocks[middle].start <= index:
+                low = middle
+            else:
+                high = middle - 1
+        return self.blocks[low]
+
+    #region dominators
+    @cached_property
+    def reverse_postorder(self) -> list[int]:
+        """The reachable blocks, every one before its successors but for back edges"""
+        order = []
+        seen = [False] * len(self.blocks)
+        seen[0] = True
+        # explicit stack of (block, next successor to visit), functions can be long
+        pending = [(0, 0)]
+
+        while pending:
+            block, i = pending.pop()
+            successors = self.blocks[block].successors
+
+            if i < len(successors):
+                pending.append((block, i + 1))
+                if not seen[successors[i]]:
+                    seen[successors[i]] = True
+                    pending.append((successors[i], 0))
+            else:
+                order.append(block)
+
+        order.reverse()
+        return order
+
+    @cached_property
+    def immediate_dominators(self) -> list[int]:
+        """The immediate dominator of every block, the entry's is itself and unreachable ones None"""
+        order = self.reverse_postorder
+        position = {block: i for i, block in enumerate(order)}
+        idom = [None] * len(self.blocks)
+        idom[0] = 0
+
+        def intersect(a: int, b: int) -> int:
+            while a != b:
+                while position[a] > position[b]:
+                    a = idom[a]
+                while position[b] > position[a]:
+                    b = idom[b]
+            return a
+
+        changed = True
+        while changed:
+            changed = False
+            for block in order[1:]:
+                processed = [p for p in self.blocks[block].predecessors if idom[p] is not None]
+                new_idom = processed[0]
+                for predecessor in processed[1:]:
+                    new_idom = intersect(predecessor, new_idom)
+
+                if idom[block] != new_idom:
+                    idom[block] = new_idom
+                    changed = True
+
+        return idom
+
+    @cached_property
+    def dominator_tree(self) -> list[list[int]]:
+        """The blocks every block immediately dominates"""
+        children = [[] for _ in self.blocks]
+        for block, idom in enumerate(self.immediate_dominators):
+            if idom is not None and block != 0:
+                children[idom].append(block)
+        return children
+
+    @cached_property
+    def dominance_frontiers(self) -> list[set[int]]:
+        """The join points where the dominance of every block ends, where SSA needs its phis"""
+        idom = self.immediate_dominators
+        frontiers = [set() for _ in self.blocks]
+
+        for block in self.blocks:
+            if idom[block.index] is None:
+                continue
+
+            predecessors = [p for p in block.predecessors if idom[p] is not None]
+            if len(predecessors) < 2:
+                continue
+
+            for runner in predecessors:
+                while runner != idom[block.index]:
+                    frontiers[runner].add(block.index)
+                    runner = idom[runner]
+
+        return frontiers
+
+    @cached_property
+    def dominator_numbering(self) -> tuple[list[int], list[int]]:
+        """Preorder and postorder numbers of the blocks in the dominator tree"""
+        pre = [-1] * len(self.blocks)
+        post = [-1] * len(self.blocks)
+        counter = 0
+        pending = [(0, False)]
+
+        while pending:
+            block, done = pending.pop()
+            if done:
+                post[block] = counter
+            else:
+                pre[block] = counter
+                pending.append((block, True))
+                pending.extend((child, False) for child in self.dominator_tree[block])
+            counter += 1
+
+        return pre, post
+
+    def dominates(self, a: int, b: int) -> bool:
+        """Whether every path from the entry to block `b` goes through block `a`"""
+        pre, post = self.dominator_numbering
+        return pre[b] >= 0 and pre[a] <= pre[b] and post[b] <= post[a]
+    #endregion
+
+    #region loops
+    @cached_property
+    def back_edges(self) -> list[tuple[int, int]]:
+        """The edges (tail, header) whose header dominates their tail"""
+        return [
+            (block.index, successor)
+            for block in self.blocks if self.immediate_dominators[block.index] is not None
+            for successor in block.successors if self.dominates(successor, block.index)
+        ]
+
+    @cached_property
+    def loops(self) -> list[Loop]:
+        """The natural loops, outer loops before the loops they contain"""
+        bodies = {}
+
+        for tail, header in self.back_edges:
+            body = bodies.setdefault(header, {header})
+            pending = [tail]
+            while pending:
+                block = pending.pop()
+                if block not in body and self.immediate_dominators[block] is not None:
+                    body.add(block)
+                    pending.extend(self.blocks[block].predecessors)
+
+        loops = sorted((Loop(header, body) for header, body in bodies.items()), key=lambda l: -len(l.blocks))
+
+        # the innermost loop around a header is the smallest bigger loop holding it
+        innermost = {}
+        for loop in loops:
+            parent = innermost.get(loop.header)
+            if parent is not None:
+                loop.parent = parent
+                parent.children.append(loop)
+            for block in loop.blocks:
+                innermost[block] = loop
+
+        return loops
+
+    @cached_property
+    def loop_depths(self) -> list[int]:
+        """How many loops hold every block"""
+        depths = [0] * len(self.blocks)
+        for loop in self.loops:
+            for block in loop.blocks:
+                depths[block] += 1
+        return depths
+    #endregion
+
+    def to_dot(self, name: str = 'cfg') -> str:
+        """The graph in Graphviz format: back edges dashed, dominator tree dotted"""
+        lines = [f'digraph "{name}" {{', '    node [shape=box, fontname="monospace"];']
+
+        for block in self.blocks:
+            header = f'B{block.index}'
+            if self.loop_depths[block.index]:
+                header += f' (loop depth {self.loop_depths[block.index]})'
+
+            text = [header] + [' '.join(map(str, tac_code)) for tac_code in self.instructions(block)]
+            label = ''.join(escape_dot(line) + '\\l' for line in text)
+            style = '' if self.immediate_dominators[block.index] is not None else ', style=dashed'
+            lines.append(f'    B{block.index} [label="{label}"{style}];')
+
+        back_edges = set(self.back_edges)
+        for block in self.blocks:
+            for successor in block.successors:
+                style = ' [style=dashed]' if (block.index, successor) in back_edges else ''
+                lines.append(f'    B{block.index} -> B{successor}{style};')
+
+        for block, children in enumerate(self.dominator_tree):
+            for child in children:
+                lines.append(f'    B{block} -> B{child} [style=dotted, color=gray, constraint=false];')
+
+        lines.append('}')
+        return '\n'.join(lines)
+
+
+def escape_dot(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('"', '\\"')
+
+
+if __name__ == '__main__':
+    from src.compiler import Compiler
+    from src.optimizer import OPTIMIZATION_LEVELS, DEFAULT_OPTIMIZATION_LEVEL
+
+    arg_parser = argparse.ArgumentParser(description='Control flow graphs of a HULK program in Graphviz format')
+    arg_parser.add_argument('file', help='.hulk file')
+    arg_parser.add_argument('function', nargs='?', default=None, help='only this function (all of them by default)')
+    arg_parser.add_argument('-O', dest='optimization', type=int, choices=OPTIMIZATION_LEVELS, default=DEFAULT_OPTIMIZATION_LEVEL)
+    args = arg_parser.parse_args()
+
+    with open(args.file) as file:
+        result = Compiler(optimization=args.optimization).compile(file.read())
+
+    if not result.success:
+        sys.exit('\n'.join(result.errors))
+
+    for function, code in result.tac.code.items():
+        if args.function in (None, function):
+            print(ControlFlowGraph(code).to_dot(function))
@@ -0,0 +1,141 @@
+"""
+Dead code elimination over TAC.
+
+Repeats until nothing changes:
+
+- blocks the entry can't reach are dropped, so is whatever follows a
+  `return`, `break` or `continue` and the branch of a folded condition
+- a `jump` or `jump_nz` to the label right after it is dropped
+- labels no jump targets are dropped
+- instructions that only compute a temporary nobody reads are dropped
+
+The backend keeps track of the stack while it walks the code, so a
+`declare` and its `clear`, and the `function_call_start` to
+`function_call_end` of a call with its `set_param`s and `call`, go
+together: they are dropped only when all of them are unreachable.
+"""
+from src.control_flow import ControlFlowGraph
+from src.register_allocation import OPERANDS, NO_OPERANDS, operands
+
+# instructions that only compute their result
+PURE = ('assign', 'binop', 'unary', 'get', 'get_index', 'int_to_float')
+
+
+def stack_groups(code: list) -> dict[int, tuple[int, int]]:
+    """
+    The `declare`/`clear` and call instructions -> indices of the first and
+    last instruction of their group, unmatched ones are left out
+    """
+    groups = {}
+    declares = {}
+    calls = []
+
+    for i, tac_code in enumerate(code):
+        match tac_code[0]:
+            case 'declare':
+                declares.setdefault(tac_code[1], []).append(i)
+            case 'clear' if declares.get(tac_code[1]):
+                start = declares[tac_code[1]].pop()
+                groups[start] = groups[i] = (start, i)
+            case 'function_call_start':
+                calls.append([i])
+            case 'set_param' | 'call' if calls:
+                calls[-1].append(i)
+            case 'function_call_end' if calls:
+                members = calls.pop()
+                for j in members + [i]:
+                    groups[j] = (members[0], i)
+
+    return groups
+
+
+def remove_unreachable(code: list) -> list:
+    cfg = ControlFlowGraph(code)
+    reachable = cfg.reachable()
+    if all(reachable):
+        return code
+
+    live = [False] * len(code)
+    for block in cfg.blocks:
+        if reachable[block.index]:
+            live[block.start:block.end] = [True] * (block.end - block.start)
+
+    groups = stack_groups(code)
+
+    return [
+        tac_code for i, tac_code in enumerate(code)
+        if live[i] or (i in groups and (live[groups[i][0]] or live[groups[i][1]]))
+    ]
+
+
+def remove_jumps_to_next(code: list) -> list:
+    result = []
+
+    for i, tac_code in enumerate(code):
+        if tac_code[0] in ('jump', 'jump_nz'):
+            # the labels right after the jump are where it falls through to
+            j = i + 1
+            while j < len(code) and code[j][0] == 'label' and code[j][1] != tac_code[-1]:
+                j += 1
+            if j < len(code) and code[j][0] == 'label':
+                continue
+
+        result.append(tac_code)
+
+    return result
+
+
+def remove_unused_labels(code: list) -> list:
+    targets = {tac_code[-1] for tac_code in code if tac_code[0] in ('jump', 'jump_nz')}
+    return [tac_code for tac_code in code if tac_code[0] != 'label' or tac_code[1] in targets]
+
+
+def remove_unused_temporaries(code: list) -> list:
+    uses = {}
+    defs = {}
+
+    # this runs on every instruction of the program, so no operands() here
+    for i, tac_code in enumerate(code):
+        defined, used = OPERANDS.get(tac_code[0], NO_OPERANDS)
+        for j in used:
+            temp = tac_code[j]
+            if temp.__class__ is str and temp.endswith('#'):
+                uses[temp] = uses.get(temp, 0) + 1
+        for j in defined:
+            if tac_code[0] in PURE and tac_code[j].endswith('#'):
+                defs.setdefault(tac_code[j], []).append(i)
+
+    removed = set()
+    pending = [temp for temp in defs if not uses.get(temp)]
+
+    while pending:
+        for i in defs.get(pending.pop(), ()):
+            if i in removed:
+                continue
+
+            removed.add(i)
+            for temp in operands(code[i])[1]:
+                uses[temp] -= 1
+                if not uses[temp]:
+                    pending.append(temp)
+
+    return [tac_code for i, tac_code in enumerate(code) if i not in removed] if removed else code
+
+
+def eliminate_function(code: list) -> list:
+    while True:
+        size = len(code)
+
+        code = remove_unreachable(code)
+        code = remove_jumps_to_next(code)
+        code = remove_unused_labels(code)
+        code = remove_unused_temporaries(code)
+
+        if len(code) == size:
+            return code
+
+
+def eliminate_dead_code(tac: dict) -> None:
+    """Cleans the code of every function in place"""
+    for function in tac:
+        tac[function] = eliminate_function(tac[function])
@@ -0,0 +1,373 @@
+"""
+Inlining of small non-recursive functions and methods over TAC.
+
+Every call in the TAC names its target, methods included, so a call to a
+function of the program whose body has at most `INLINE_BUDGET`
+instructions and that can't reach itself in the call graph is replaced by
+a copy of that body:
+
+- the `function_call_start`, `set_param`s and `function_call_end` go, the
+  arguments are computed where they were
+- a parameter is read straight from the temporary of its argument
+- temporaries and local variables get a `.N` suffix and labels a `_N`
+  one, N counting the inlined calls of the compilation
+- a `return` assigns the temporary of the call and jumps past the copy
+
+Callees go before their callers, so what gets copied is already inlined
+itself, and a function whose every call was inlined is dropped. A function
+that assigns a parameter, reads a variable that isn't its own or returns
+from inside a `let` stays a call. Codegen keeps track of the stack
+textually, and a return from inside a `let` would skip its `clear`.
+
+    python -m src.inlining program.hulk [--budget N]
+
+prints the call sites inlined and why the other callees weren't.
+"""
+import sys
+import argparse
+
+from src.register_allocation import OPERANDS, NO_OPERANDS, is_temp
+from src.ssa import is_variable
+
+INLINE_BUDGET = 24
+
+# instruction -> position of the label it names
+LABEL_OPERAND = {'label': 1, 'jump': 1, 'jump_nz': 2}
+
+# instruction -> positions of the variables it names
+VARIABLE_OPERANDS = {
+    'assign': (1, 2),
+    'declare': (1,),
+    'clear': (1,),
+    'get_index': (3,),
+    'set_index': (1,),
+}
+
+# where a parameter can be replaced by the temporary of its argument
+PARAMETER_READS = {('assign', 2), ('get_index', 3), ('set_index', 1)}
+
+
+class InlinedCall:
+    __slots__ = ('caller', 'callee', 'size')
+
+    def __init__(self, caller: str, callee: str, size: int) -> None:
+        self.caller = caller
+        self.callee = callee
+        # instructions copied
+        self.size = size
+
+    def __repr__(self) -> str:
+        return f'{self.caller} <- {self.callee} ({self.size} instructions)'
+
+
+class InliningReport:
+    def __init__(self) -> None:
+        self.inlined: list[InlinedCall] = []
+        # callee -> why its calls stayed
+        self.kept: dict[str, str] = {}
+        # functions dropped since nothing calls them any more
+        self.removed: list[str] = []
+
+    def __str__(self) -> str:
+        lines = [f'{len(self.inlined)} call sites inlined']
+        lines.extend(f'    {call}' for call in self.inlined)
+        if self.kept:
+            lines.append('calls kept')
+            lines.extend(f'    {callee}: {reason}' for callee, reason in sorted(self.kept.items()))
+        if self.removed:
+            lines.append(f'functions removed: {", ".join(self.removed)}')
+        return '\n'.join(lines)
+
+
+def callees(code: list) -> list[str]:
+    return [tac_code[2] for tac_code in code if tac_code[0] == 'call']
+
+
+def call_order(tac: dict) -> tuple[list[str], set[str]]:
+    """
+    The functions with every callee before its callers, but for cycles,
+    and the functions on some cycle of the call graph (Tarjan's algorithm)
+    """
+    graph = {function: [c for c in callees(code) if c in tac] for function, code in tac.items()}
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    order = []
+    recursive = set()
+
+    for root in graph:
+        if root in index:
+            continue
+
+        # explicit stack of (function, next callee to visit)
+        pending = [(root, 0)]
+        while pending:
+            function, i = pending.pop()
+            if i == 0:
+                index[function] = low[function] = len(index)
+                stack.append(function)
+                on_stack.add(function)
+
+            if i < len(graph[function]):
+                pending.append((function, i + 1))
+                callee = graph[function][i]
+                if callee not in index:
+                    pending.append((callee, 0))
+                elif callee in on_stack:
+                    low[function] = min(low[function], index[callee])
+                continue
+
+            for callee in graph[function]:
+                if callee in on_stack:
+                    low[function] = min(low[function], low[callee])
+
+            if low[function] == index[function]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == function:
+                        break
+                if len(component) > 1 or function in graph[function]:
+                    recursive.update(component)
+                order.extend(component)
+
+    return order, recursive
+
+
+def call_groups(code: list) -> list[tuple[int, list[int], int]]:
+    """(function_call_start, its own set_params, call) of every call, inner calls first"""
+    groups = []
+    open_calls = []
+
+    for i, tac_code in enumerate(code):
+        match tac_code[0]:
+            case 'function_call_start':
+                open_calls.append((i, []))
+            case 'set_param' if open_calls:
+                open_calls[-1][1].append(i)
+            case 'call' if open_calls:
+                start, params = open_calls.pop()
+                groups.append((start, params, i))
+
+    return groups
+
+
+class Callee:
+    """The body of a function ready to be copied, or why it can't be"""
+
+    def __init__(self, name: str, code: list, budget: int) -> None:
+        self.name = name
+        self.reason = None
+
+        if not code or code[0][0] != 'get_params':
+            self.reason = 'no parameters header'
+            return
+
+        self.params = [param for param, _ in code[0][1]]
+        self.body = code[1:]
+
+        if len(self.body) > budget:
+            self.reason = f'{len(self.body)} instructions, over the budget of {budget}'
+            return
+
+        self.reason = self.check()
+        self.returned = self.single_return()
+
+    def check(self) -> str:
+        params = set(self.params)
+        declared = {tac_code[1] for tac_code in self.body if tac_code[0] == 'declare'}
+        depth = 0
+
+        for tac_code in self.body:
+            op = tac_code[0]
+            if op == 'declare':
+                depth += 1
+            elif op == 'clear':
+                depth -= 1
+            elif op == 'return' and depth:
+                return 'returns from inside a let'
+
+            for i in VARIABLE_OPERANDS.get(op, ()):
+                name = tac_code[i]
+                if not is_variable(name):
+                    continue
+                if name in params and (op, i) not in PARAMETER_READS:
+                    return f'assigns its parameter {name}'
+                if name not in params and name not in declared:
+                    return f'reads {name}, a variable of another scope'
+
+        if params & declared:
+            return 'declares a variable named like a parameter'
+
+        return None
+
+    def single_return(self) -> str:
+        """
+        The temporary of a body ending in its only `return`, computed just for
+        it, which the copies can compute straight into the call's temporary
+        """
+        returns = [tac_code for tac_code in self.body if tac_code[0] == 'return']
+        if len(returns) != 1 or self.body[-1] is not returns[0]:
+            return None
+
+        temp = returns[0][1]
+        definitions = []
+        uses = 0
+        for tac_code in self.body:
+            defined, used = OPERANDS.get(tac_code[0], NO_OPERANDS)
+            definitions.extend(tac_code for i in defined if tac_code[i] == temp)
+            uses += sum(tac_code[i] == temp for i in used)
+
+        # defined once and only read by the return, and not a load of a parameter
+        if uses != 1 or len(definitions) != 1:
+            return None
+        if definitions[0][0] == 'assign' and definitions[0][2] in self.params:
+            return None
+        return temp
+
+
+class Inliner:
+    def __init__(self, tac: dict, budget: int = INLINE_BUDGET) -> None:
+        self.tac = tac
+        self.budget = budget
+        self.count = 0
+        self.report = InliningReport()
+        self.callees: dict[str, Callee] = {}
+
+    def run(self) -> InliningReport:
+        order, recursive = call_order(self.tac)
+
+        for function in order:
+            self.tac[function] = self.inline_calls(function)
+
+            if function in recursive:
+                self.report.kept[function] = 'recursive'
+            else:
+                self.callees[function] = Callee(function, self.tac[function], self.budget)
+
+        called = {callee for code in self.tac.values() for callee in callees(code)}
+        inlined = {call.callee for call in self.report.inlined}
+
+        for function in list(self.tac):
+            if function in inlined and function not in called:
+                del self.tac[function]
+                self.report.removed.append(function)
+
+        return self.report
+
+    def inline_calls(self, function: str) -> list:
+        code = self.tac[function]
+        # index of a call -> the copy replacing it
+        copies = {}
+        # indices of the instructions the copies make useless
+        dropped = set()
+
+        for start, params, call in call_groups(code):
+            callee = self.callees.get(code[call][2])
+            if callee is None:
+                continue
+            if callee.reason is not None:
+                self.report.kept.setdefault(callee.name, callee.reason)
+                continue
+            if len(params) != len(callee.params):
+                continue
+
+            copies[call] = self.copy(callee, [code[j][1] for j in params], code[call][1])
+            dropped.update(params)
+            dropped.add(start)
+            if call + 1 < len(code) and code[call + 1][0] == 'function_call_end':
+                dropped.add(call + 1)
+
+            self.report.inlined.append(InlinedCall(function, callee.name, len(callee.body)))
+
+        if not copies:
+            return code
+
+        result = []
+        for i, tac_code in enumerate(code):
+            if i in copies:
+                result.extend(copies[i])
+            elif i not in dropped:
+                result.append(tac_code)
+
+        return result
+
+    def copy(self, callee: Callee, args: list[str], result: str) -> list:
+        self.count += 1
+        suffix = self.count
+        end_label = f'end_inline_{suffix}'
+
+        params = dict(zip(callee.params, args))
+        # a load of a parameter is its argument, if it goes in the same kind of register
+        loads = {}
+        for tac_code in callee.body:
+            if tac_code[0] == 'assign' and tac_code[2] in params and tac_code[1][0] == params[tac_code[2]][0]:
+                loads[tac_code[1]] = params[tac_code[2]]
+
+        names = {}
+        if callee.returned and callee.returned[0] == result[0]:
+            names[callee.returned] = result
+
+        def rename(j: int, value, op: str):
+            if j == LABEL_OPERAND.get(op):
+                return f'{value}_{suffix}'
+
+            if is_temp(value):
+                if value in loads:
+                    return loads[value]
+            elif j not in VARIABLE_OPERANDS.get(op, ()) or not is_variable(value):
+                return value
+            elif value in params:
+                return params[value]
+
+            if value not in names:
+                names[value] = f'{value[:-1]}.{suffix}#' if is_temp(value) else f'{value}.{suffix}'
+            return names[value]
+
+        copied = []
+        last = len(callee.body) - 1
+
+        for i, tac_code in enumerate(callee.body):
+            op = tac_code[0]
+
+            if op == 'assign' and tac_code[1] in loads:
+                continue
+
+            if op == 'return':
+                if names.get(tac_code[1]) != result:
+                    copied.append(('assign', result, rename(1, tac_code[1], op)))
+                if i != last:
+                    copied.append(('jump', end_label))
+                continue
+
+            copied.append(tuple(rename(j, value, op) if j else op for j, value in enumerate(tac_code)))
+
+        if any(tac_code == ('jump', end_label) for tac_code in copied):
+            copied.append(('label', end_label))
+
+        return copied
+
+
+def inline_functions(tac: dict, budget: int = INLINE_BUDGET) -> InliningReport:
+    """Inlines the small functions of the program in place"""
+    return Inliner(tac, budget).run()
+
+
+if __name__ == '__main__':
+    from src.compiler import Compiler
+
+    arg_parser = argparse.ArgumentParser(description='Call sites a HULK program gets inlined')
+    arg_parser.add_argument('file', help='.hulk file')
+    arg_parser.add_argument('--budget', type=int, default=INLINE_BUDGET, help='instructions a function can have to be inlined')
+    args = arg_parser.parse_args()
+
+    with open(args.file) as file:
+        result = Compiler(optimization=0).compile(file.read())
+
+    if not result.success:
+        sys.exit('\n'.join(result.errors))
+
+    print(inline_functions(result.tac.code, args.budget))
@@ -0,0 +1,238 @@
+"""
+Loop-invariant code motion over TAC.
+
+A `while` loop has its condition at the bottom:
+
+    jump end_while          <- end of the preheader
+    label while             <- the body
+    ...
+    label end_while         <- the condition, header of the loop
+    ...
+    jump_nz t while
+
+every entry into the loop goes through the `jump`, and the computations
+that give the same value in every iteration move right before it. An
+instruction is invariant when the temporaries it uses are defined out of
+the loop or by invariant instructions, and the versions it reads in the
+SSA form of src/ssa.py come from out of the loop: its variables are not
+assigned in the loop and, for a load, no `set`, `set_index` or `call` in
+the loop writes MEMORY. It moves out of every enclosing loop it is
+invariant in too.
+
+Moved code also runs when the loop runs zero times, so only what can't
+fail moves: arithmetic, loads of variables and loads of properties (a HULK
+object is never null). An array element only moves out of the condition,
+which runs whenever the loop is reached. An array variable the loop
+doesn't assign is loaded once before the loop, instead of at every
+`get_index` and `set_index` in it.
+
+As in src/value_numbering.py, nothing moves out of a loop with a call.
+A value kept in a register across a call costs a save and a restore at
+each call.
+"""
+from src.control_flow import ControlFlowGraph, Loop
+from src.ssa import SSAForm, is_variable
+from src.register_allocation import OPERANDS, NO_OPERANDS, is_temp
+
+# instructions that only compute their result
+MOVABLE = ('assign', 'binop', 'unary', 'get', 'get_index', 'int_to_float')
+
+# instruction -> position of the array it indexes
+ARRAY_OPERAND = {'get_index': 3, 'set_index': 1}
+
+
+class LoopInvariants:
+    def __init__(self, code: list) -> None:
+        self.code = code
+        self.cfg = ControlFlowGraph(code)
+
+        # instruction index -> where it moves, the index of a preheader's jump
+        self.moved: dict[int, int] = {}
+        # instruction index -> temporary holding its array
+        self.array_bases: dict[int, str] = {}
+        # preheader's jump -> the array loads going before it
+        self.base_loads: dict[int, list] = {}
+
+    def analyze(self) -> None:
+        code = self.code
+        self.ssa = SSAForm(code, self.cfg)
+
+        # (variable, version) -> block writing it, version 0 comes from the entry
+        self.version_blocks = {}
+        for block in self.cfg.blocks:
+            for variable, phi in self.ssa.phis[block.index].items():
+                self.version_blocks[(variable, phi.version)] = block.index
+            for i in range(block.start, block.end):
+                for variable, version in self.ssa.writes.get(i, {}).items():
+                    self.version_blocks[(variable, version)] = block.index
+
+        self.block_of = [None] * len(code)
+        for block in self.cfg.blocks:
+            self.block_of[block.start:block.end] = [block.index] * (block.end - block.start)
+
+        self.definitions = {}
+        for i, tac_code in enumerate(code):
+            for j in OPERANDS.get(tac_code[0], NO_OPERANDS)[0]:
+                temp = tac_code[j]
+                # temporaries defined twice stay where they are
+                self.definitions[temp] = i if temp not in self.definitions else None
+
+    def preheader(self, loop: Loop) -> int:
+        """The index of the `jump` into the loop, None for loops not entered from a single place"""
+        header = self.cfg.blocks[loop.header]
+        entries = [p for p in header.predecessors if p not in loop.blocks and self.cfg.immediate_dominators[p] is not None]
+        if len(entries) != 1:
+            return None
+
+        block = self.cfg.blocks[entries[0]]
+        last = self.code[block.end - 1] if block.end > block.start else ('nop',)
+        if last[0] != 'jump' or block.successors != [loop.header]:
+            return None
+
+        return block.end - 1
+
+    def eligible(self, loop: Loop) -> tuple[list[int], set[str]]:
+        """The instructions of the loop and the variables declared in it, None if nothing can leave it"""
+        indices = []
+        declared = set()
+
+        for block in sorted(loop.blocks):
+            basic_block = self.cfg.blocks[block]
+            for i in range(basic_block.start, basic_block.end):
+                op = self.code[i][0]
+                if op == 'call':
+                    return None
+                if op == 'declare':
+                    declared.add(self.code[i][1])
+                indices.append(i)
+
+        return indices, declared
+
+    def outside(self, loop: Loop, i: int, declared: set[str]) -> bool:
+        """Whether every variable version instruction `i` reads comes from out of the loop"""
+        for variable, version in self.ssa.reads.get(i, {}).items():
+            if variable in declared:
+                return False
+            if version and self.version_blocks[(variable, version)] in loop.blocks:
+                return False
+        return True
+
+    def invariants(self, loop: Loop, indices: list[int], declared: set[str]) -> set[int]:
+        invariant = set()
+
+        for i in indices:
+            tac_code = self.code[i]
+            op = tac_code[0]
+
+            if op not in MOVABLE or (op == 'assign' and not is_temp(tac_code[1])):
+                continue
+            if op == 'get_index' and self.block_of[i] != loop.header:
+                continue
+            if self.definitions.get(tac_code[1]) is None:
+                continue
+
+            uses = OPERANDS[op][1]
+            if not all(self.defined_outside(tac_code[j], loop, invariant) for j in uses if is_temp(tac_code[j])):
+                continue
+
+            if self.outside(loop, i, declared):
+                invariant.add(i)
+
+        return invariant
+
+    def defined_outside(self, temp: str, loop: Loop, invariant: set[int]) -> bool:
+        i = self.definitions.get(temp)
+        return i is not None and (self.block_of[i] not in loop.blocks or i in invariant)
+
+    def run(self) -> list:
+        if not self.cfg.loops:
+            return self.code
+
+        self.analyze()
+
+        # outer loops first, an instruction moves out of the outermost loop it can
+        for loop in self.cfg.loops:
+            jump = self.preheader(loop)
+            found = self.eligible(loop) if jump is not None else None
+            if found is None:
+                continue
+
+            indices, declared = found
+            for i in self.invariants(loop, indices, declared):
+                self.moved.setdefault(i, jump)
+
+            self.load_arrays(loop, jump, indices, declared)
+
+        if not self.moved and not self.array_bases:
+            return self.code
+
+        return self.rewrite()
+
+    def load_arrays(self, loop: Loop, jump: int, indices: list[int], declared: set[str]) -> None:
+        bases = {}
+
+        for i in indices:
+            tac_code = self.code[i]
+            position = ARRAY_OPERAND.get(tac_code[0])
+            if position is None or i in self.array_bases or not is_variable(tac_code[position]):
+                continue
+
+            array = tac_code[position]
+            version = self.ssa.reads[i][array]
+            if array in declared or (version and self.version_blocks[(array, version)] in loop.blocks):
+                continue
+
+            if array not in bases:
+                bases[array] = f't0_{array}_{jump}#'
+                self.base_loads.setdefault(jump, []).append(('assign', bases[array], array))
+            self.array_bases[i] = bases[array]
+
+    def rewrite(self) -> list:
+        code = self.code
+        hoisted = {}
+        for i in sorted(self.moved):
+            hoisted.setdefault(self.moved[i], []).append(i)
+
+        # equal instructions moved before the same jump compute the same value
+        replaced = {}
+        result = []
+
+        def rename(i: int):
+            tac_code = code[i]
+            uses = OPERANDS.get(tac_code[0], NO_OPERANDS)[1]
+            position = ARRAY_OPERAND.get(tac_code[0])
+
+            if i in self.array_bases or any(tac_code[j] in replaced for j in uses):
+                tac_code = tuple(
+                    self.array_bases[i] if j == position and i in self.array_bases
+                    else replaced.get(v, v) if j in uses else v
+                    for j, v in enumerate(tac_code)
+                )
+            return tac_code
+
+        for i, tac_code in enumerate(code):
+            if i in self.moved:
+                continue
+
+            if i in self.base_loads or i in hoisted:
+                result.extend(self.base_loads.get(i, ()))
+
+                seen = {}
+                for j in hoisted.get(i, ()):
+                    moved = rename(j)
+                    key = (moved[0], moved[1][0]) + moved[2:]
+                    if key in seen:
+                        replaced[moved[1]] = seen[key]
+                    else:
+                        seen[key] = moved[1]
+                        result.append(moved)
+
+            result.append(rename(i))
+
+        return result
+
+
+def hoist_loop_invariants(tac: dict) -> None:
+    """Moves the invariant computations of every loop before it, in place"""
+    for function in tac:
+        tac[function] = LoopInvariants(tac[function]).run()
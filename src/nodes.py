@@ -0,0 +1,40 @@
+class AstNode:
+    """
+    A node is `[kind, *children]` plus the line number, `node[0]` is the
+    kind name every pass dispatches on
+    """
+    __slots__ = ('ast', 'lineno')
+
+    def __init__(self, *args) -> None:
+        self.ast = list(args[:-1])
+        self.lineno = args[-1]
+    
+    def __str__(self) -> str:
+        return f'<{self.ast} at line {self.lineno}>'
+    
+    __repr__ = __str__
+
+    def __getitem__(self, index):
+        return self.ast[index]
+
+    def __setitem__(self, index, value):
+        self.ast[index] = value
+
+    def __iter__(self):
+        return iter(self.ast)
+    
+    def __len__(self):
+        return len(self.ast)
+
+
+NODE_KINDS = ('access', 'annotated_identifier', 'array_access', 'array_declaration_explicit', 
+              'assignment', 'binop', 'bool', 'break_statement', 'compound_instruction', 
+              'conditional', 'continue_statement', 'declaration', 'downcast', 'elif_statement', 
+              'else_statement', 'executable_expression', 'function', 'function_call', 'grouped', 
+              'if_statement', 'initialized_type', 'instance', 'name', 'number', 'return_statement', 
+              'str_concat', 'string', 'type_declaration', 'unary', 'var_inst', 'while_loop')
+
+
+def dispatch_table(obj, prefix: str = '') -> dict:
+    """Maps every node kind to the method of `obj` named `prefix + kind`, if any"""
+    return {kind: getattr(obj, prefix + kind) for kind in NODE_KINDS if hasattr(obj, prefix + kind)}
@@ -0,0 +1,389 @@
+"""
+Integer refinement of HULK Numbers.
+
+Every Number is a single precision float, so loop counters and array
+indices pay for `cvt.w.s`/`mfc1` and float compares. This pass looks at the
+TAC of one function and proves which float temporaries (`f0N#`) and local
+Number variables only ever hold integers small enough for an int and a
+float to agree on them: literals without a fractional part, counters and
+sums and differences of those. Those temporaries are renamed to `i0N#`,
+which live in int registers and get `addu`/`subu`/`slt` code, and those
+variables are stored as words.
+
+A variable is a counter when it's only assigned integral literals and
+steps of a literal in one direction, and every step inside a loop is in a
+loop whose condition compares the variable against a literal, so it can't
+go past the largest literal and the steps added up. Anything else, an
+accumulator or a product, stays a float: it could outgrow an int, or
+round differently. Wherever an integer reaches a float context (a
+parameter, a return, an array element, a property, a float operand) an
+`int_to_float` conversion is inserted.
+"""
+from src.symbols import TYPES
+from src.register_allocation import OPERANDS, NO_OPERANDS, JUMPS, is_temp
+
+ARITHMETIC = ('+', '-', '*', '/')
+INTEGER_ARITHMETIC = ('+', '-')
+COMPARISONS = ('==', '!=', '<', '<=', '>', '>=')
+# comparison -> the same one with its operands swapped
+SWAPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<='}
+
+# every integer up to 2**24 is exact in a float, counters stay under half
+# of it so the sum of two of them is still exact
+LIMIT = 2**24
+COUNTER_LIMIT = 2**23
+
+# instruction -> positions where an integer has to be converted to float
+FLOAT_OPERANDS = {
+    'set_param': (1,),
+    'return': (1,),
+    'set_index': (3,),
+    'set': (3,),
+}
+
+def is_float_temp(value) -> bool:
+    return type(value) is str and value.startswith('f') and value.endswith('#')
+
+def is_integral_literal(value) -> bool:
+    return type(value) is float and value.is_integer() and -2**31 <= value < 2**31
+
+def integer_temp(temp: str) -> str:
+    return 'i' + temp[1:]
+
+def is_integer_temp(value) -> bool:
+    return type(value) is str and value.startswith('i') and value.endswith('#')
+
+
+def integer_uses(tac_code, temps: set[str], variables: set[str]) -> tuple:
+    """The temporaries an instruction would use as integers"""
+    match tac_code:
+        case ('binop', t0, op, a, b) if op in INTEGER_ARITHMETIC and t0 in temps:
+            return a, b
+        case ('binop', _, op, a, b) if op in COMPARISONS and a in temps and b in temps:
+            return a, b
+        case ('unary', t0, _, a) if t0 in temps:
+            return a,
+        case ('assign', target, value) if target in variables:
+            return value,
+        case ('get_index' | 'set_index', _, index, _):
+            return index,
+    return ()
+
+
+def loops(code: list) -> dict[tuple[int, int], bool]:
+    """
+    (label, back jump) of every loop -> whether its body is only entered
+    through the conditional jump at its end
+    """
+    labels = {tac_code[1]: i for i, tac_code in enumerate(code) if tac_code[0] == 'label'}
+    targets = {}
+    for tac_code in code:
+        if tac_code[0] in JUMPS:
+            targets[tac_code[-1]] = targets.get(tac_code[-1], 0) + 1
+
+    found = {}
+    for j, tac_code in enumerate(code):
+        if tac_code[0] in JUMPS and labels.get(tac_code[-1], j) < j:
+            start = labels[tac_code[-1]]
+            found[(start, j)] = tac_code[0] == 'jump_nz' and targets[tac_code[-1]] == 1 and \
+                                start > 0 and code[start - 1][0] == 'jump'
+    return found
+
+
+def innermost_loop(loops: dict, i: int) -> tuple[int, int]|None:
+    around = [loop for loop in loops if loop[0] < i < loop[1]]
+    return min(around, key=lambda loop: loop[1] - loop[0], default=None)
+
+
+def literal_value(value, defs: dict):
+    """The integral literal `value` is or is always assigned, None if it isn't one"""
+    if type(value) is float:
+        return value if is_integral_literal(value) else None
+    match defs.get(value):
+        case [('assign', _, float() as literal)] if is_integral_literal(literal):
+            return literal
+    return None
+
+
+def fresh_load(code: list, defs: dict, temp, variable: str, end: int) -> bool:
+    """Whether `temp` still holds `variable` loaded earlier in the same block"""
+    match defs.get(temp):
+        case [('assign', _, name)] if name == variable:
+            pass
+        case _:
+            return False
+
+    start = next((i for i in range(end - 1, -1, -1) if code[i] == defs[temp][0]), None)
+    if start is None:
+        return False
+
+    return not any(
+        tac_code[0] == 'label' or tac_code[0] in JUMPS or (tac_code[0] == 'assign' and tac_code[1] == variable)
+        for tac_code in code[start + 1:end]
+    )
+
+
+def loop_guard(code: list, defs: dict, loop: tuple[int, int]):
+    """(variable, comparison, literal) the loop is guarded by, None if it isn't like that"""
+    start, end = loop
+    # the condition is a `t` temporary, defined right before its jump
+    match code[end - 1]:
+        case ('binop', t0, op, a, b) if t0 == code[end][1] and op in SWAPPED:
+            pass
+        case _:
+            return None
+
+    for variable, limit, op in ((a, b, op), (b, a, SWAPPED[op])):
+        limit = literal_value(limit, defs)
+        match defs.get(variable):
+            case [('assign', _, name)] if limit is not None and type(name) is str and not is_temp(name):
+                if fresh_load(code, defs, variable, name, end):
+                    return name, op, limit
+    return None
+
+
+def counter_bounds(code: list, defs: dict, variables: set[str]) -> dict[str, float]:
+    """The largest magnitude of every variable that is a counter"""
+    all_loops = loops(code)
+    guards = {loop: loop_guard(code, defs, loop) for loop, guarded in all_loops.items() if guarded}
+
+    literals = {v: [] for v in variables}
+    steps = {v: [] for v in variables}
+    unbounded = set()
+
+    for i, tac_code in enumerate(code):
+        if tac_code[0] != 'assign' or tac_code[1] not in variables:
+            continue
+        variable, value = tac_code[1], tac_code[2]
+
+        literal = literal_value(value, defs)
+        if literal is not None:
+            literals[variable].append(abs(literal))
+            continue
+
+        match defs.get(value):
+            case [('binop', _, '+' | '-' as op, a, b)]:
+                step = literal_value(b, defs)
+                if step is not None and fresh_load(code, defs, a, variable, i):
+                    steps[variable].append((i, step if op == '+' else -step))
+                    continue
+                step = literal_value(a, defs)
+                if op == '+' and step is not None and fresh_load(code, defs, b, variable, i):
+                    steps[variable].append((i, step))
+                    continue
+        unbounded.add(variable)
+
+    bounds = {}
+    for variable in variables - unbounded:
+        directions = {step > 0 for _, step in steps[variable] if step}
+        if len(directions) > 1:
+            continue
+        up = directions == {True}
+
+        # a step out of any loop runs once, one in a loop once between two checks of its condition
+        limits = []
+        for i, step in steps[variable]:
+            loop = innermost_loop(all_loops, i)
+            if step == 0 or loop is None:
+                continue
+            guard = guards.get(loop)
+            if guard is None or guard[0] != variable or (guard[1] in ('<', '<=')) != up:
+                break
+            limits.append(abs(guard[2]))
+        else:
+            bound = max(literals[variable] + limits, default=0) + sum(abs(step) for _, step in steps[variable])
+            if bound <= COUNTER_LIMIT:
+                bounds[variable] = bound
+
+    return bounds
+
+
+def temp_bounds(defs: dict, counters: dict[str, float]) -> dict[str, float]:
+    """The largest magnitude of every temporary only made of literals and counters"""
+    bounds = {}
+
+    def bound(temp):
+        if temp in bounds:
+            return bounds[temp]
+        # a temporary defined in terms of itself isn't bounded
+        bounds[temp] = None
+
+        result = 0
+        for tac_code in defs.get(temp, ()):
+            match tac_code:
+                case ('assign', _, float() as value) if is_integral_literal(value):
+                    value = abs(value)
+                case ('assign', _, name) if name in counters:
+                    value = counters[name]
+                case ('binop', _, '+' | '-', a, b) if bound(a) is not None and bound(b) is not None:
+                    value = bound(a) + bound(b)
+                case ('unary', _, '-', a) if bound(a) is not None:
+                    value = bound(a)
+                case _:
+                    return None
+            result = max(result, value)
+
+        bounds[temp] = result
+        return result
+
+    for temp in defs:
+        bound(temp)
+    return bounds
+
+
+def integral_names(code: list) -> tuple[set[str], set[str]]:
+    """
+    The float temporaries and the variables that only hold integers and are
+    used as integers somewhere, a literal only passed to `print` is better
+    off staying a float than being converted
+    """
+    number = TYPES['number']
+    defs = {}
+    var_assigns = {}
+    var_loads = {}
+    variables = set()
+    # names that can't hold an integer whatever the rest of the code does
+    excluded = set()
+
+    for tac_code in code:
+        op = tac_code[0]
+
+        if op == 'assign':
+            _, target, value = tac_code
+            if is_float_temp(target):
+                defs.setdefault(target, []).append(tac_code)
+                if type(value) is str:
+                    var_loads.setdefault(value, []).append(target)
+                elif not is_integral_literal(value):
+                    excluded.add(target)
+            elif not is_temp(target):
+                var_assigns.setdefault(target, []).append(value)
+
+        elif op == 'binop' or op == 'unary':
+            if is_float_temp(tac_code[1]):
+                defs.setdefault(tac_code[1], []).append(tac_code)
+                if tac_code[2] not in INTEGER_ARITHMETIC:
+                    excluded.add(tac_code[1])
+
+        elif op == 'declare':
+            if tac_code[3] == number:
+                variables.add(tac_code[1])
+            else:
+                excluded.add(tac_code[1])
+
+        elif op == 'get_params':
+            excluded.update(name for name, _ in tac_code[1])
+
+        else:
+            for i in OPERANDS.get(op, NO_OPERANDS)[0]:
+                if is_float_temp(tac_code[i]):
+                    excluded.add(tac_code[i])
+
+    variables -= excluded
+    counters = counter_bounds(code, defs, variables)
+    variables = set(counters)
+
+    bounds = temp_bounds(defs, counters)
+    temps = {t for t in set(defs) - excluded if bounds[t] is not None and bounds[t] <= LIMIT}
+
+    # most literals only ever reach float contexts, those go in bulk
+    # before the finer worklist below
+    used = set()
+    for tac_code in code:
+        used.update(integer_uses(tac_code, temps, variables))
+    loads = {temp for temps_loaded in var_loads.values() for temp in temps_loaded}
+    temps = {t for t in temps if t in used or t in loads}
+
+    mentions = {}
+    for i, tac_code in enumerate(code):
+        for value in tac_code:
+            if value.__class__ is str and (value in temps or value in variables):
+                mentions.setdefault(value, []).append(i)
+
+    def integral_def(tac_code) -> bool:
+        match tac_code:
+            case ('assign', _, value):
+                return is_integral_literal(value) or value in variables
+            case ('binop', _, op, a, b):
+                return op in INTEGER_ARITHMETIC and a in temps and b in temps
+            case ('unary', _, op, a):
+                return op in INTEGER_ARITHMETIC and a in temps
+        return False
+
+    def loaded_variable(temp: str):
+        tac_code = defs[temp][0]
+        return tac_code[2] if tac_code[0] == 'assign' and tac_code[2] in variables else None
+
+    def used_as_integer(temp: str) -> bool:
+        return any(temp in integer_uses(code[i], temps, variables) for i in mentions[temp])
+
+    def keep(name: str) -> bool:
+        if name in temps:
+            # loads of an integer variable must stay integers, the variable goes as a whole
+            return all(integral_def(d) for d in defs[name]) and (loaded_variable(name) or used_as_integer(name))
+
+        return all(value in temps for value in var_assigns.get(name, ())) and \
+               any(used_as_integer(temp) for temp in var_loads.get(name, ()) if temp in temps)
+
+    # Everything starts as an integer and is dropped when it can't be one,
+    # which is rechecked for whatever shares an instruction with it
+    pending = temps | variables
+    while pending:
+        name = pending.pop()
+
+        if name in temps and loaded_variable(name):
+            pending.add(loaded_variable(name))
+
+        if (name not in temps and name not in variables) or keep(name):
+            continue
+
+        temps.discard(name)
+        variables.discard(name)
+
+        for i in mentions.get(name, ()):
+            pending.update(v for v in code[i] if type(v) is str and (v in temps or v in variables))
+
+    return temps, variables
+
+
+def refine_function(code: list) -> list:
+    temps, variables = integral_names(code)
+    if not temps:
+        return code
+
+    refined = []
+
+    def to_float(value):
+        if not is_integer_temp(value):
+            return value
+
+        converted = f'f{value[1:-1]}_{len(refined)}#'
+        refined.append(('int_to_float', converted, value))
+        return converted
+
+    for tac_code in code:
+        # only instructions with an integer can need a conversion
+        if any(v.__class__ is str and v in temps for v in tac_code):
+            tac_code = tuple(integer_temp(v) if v.__class__ is str and v in temps else v for v in tac_code)
+
+            match tac_code:
+                case ('binop', t0, op, a, b) if op in ARITHMETIC and not is_integer_temp(t0):
+                    tac_code = ('binop', t0, op, to_float(a), to_float(b))
+                case ('binop', t0, op, a, b) if op in COMPARISONS and is_integer_temp(a) != is_integer_temp(b):
+                    tac_code = ('binop', t0, op, to_float(a), to_float(b))
+                case ('unary', t0, op, a) if not is_integer_temp(t0):
+                    tac_code = ('unary', t0, op, to_float(a))
+                case ('assign', target, value) if is_integer_temp(value) and target not in variables:
+                    tac_code = ('assign', target, to_float(value))
+                case _ if tac_code[0] in FLOAT_OPERANDS:
+                    tac_code = tuple(to_float(v) if i in FLOAT_OPERANDS[tac_code[0]] else v for i, v in enumerate(tac_code))
+
+        refined.append(tac_code)
+
+    return refined
+
+
+def refine_numbers(tac: dict) -> None:
+    """Refines the code of every function in place"""
+    for function in tac:
+        tac[function] = refine_function(tac[function])
@@ -0,0 +1,50 @@
+"""
+The optimization passes over TAC and MIPS and the `-O` levels that run them.
+
+    -O0  no optimization, the TAC goes to the backend as generated
+    -O1  constant folding and propagation, global value numbering, dead
+         code elimination, bounded counters as integers, comparisons fused
+         with their jumps, and the peephole pass over the MIPS
+    -O2  -O1 with self tail calls turned into jumps and inlining of small
+         functions first, and loop-invariant code motion
+"""
+from src.tail_calls import eliminate_tail_calls
+from src.inlining import inline_functions
+from src.constant_folding import fold_constants
+from src.value_numbering import number_values
+from src.loop_invariants import hoist_loop_invariants
+from src.dead_code import eliminate_dead_code
+from src.number_refinement import refine_numbers
+from src.branch_fusion import fuse_branches
+from src.peephole import PeepholeStats, optimize_functions
+
+OPTIMIZATION_LEVELS = (0, 1, 2)
+DEFAULT_OPTIMIZATION_LEVEL = 1
+
+def check_level(level: int) -> None:
+    if level not in OPTIMIZATION_LEVELS:
+        raise ValueError(f'Unknown optimization level {level}, expected one of {OPTIMIZATION_LEVELS}')
+
+def optimize(tac: dict, level: int = DEFAULT_OPTIMIZATION_LEVEL) -> None:
+    """Optimizes the code of every function in place"""
+    check_level(level)
+
+    if level >= 2:
+        eliminate_tail_calls(tac)
+        inline_functions(tac)
+    if level >= 1:
+        fold_constants(tac)
+        number_values(tac)
+        if level >= 2:
+            hoist_loop_invariants(tac)
+        eliminate_dead_code(tac)
+        refine_numbers(tac)
+        fuse_branches(tac)
+
+def optimize_assembly(code: dict, level: int = DEFAULT_OPTIMIZATION_LEVEL) -> PeepholeStats:
+    """Optimizes the MIPS lines of every function in place, None at -O0"""
+    check_level(level)
+
+    if level >= 1:
+        return optimize_functions(code)
+    return None
@@ -0,0 +1,139 @@
+import os
+import json
+import hashlib
+from os import path
+from functools import cache
+
+from ply import __version__ as PLY_VERSION
+
+# Set HULK_OUTPUT_CACHE to an empty string to always compile
+CACHE_DIR = os.environ.get('HULK_OUTPUT_CACHE', path.join(path.dirname(__file__), '__pycache__', 'outputs'))
+# Bytes the entries can take before the least recently used ones are evicted
+CACHE_SIZE = int(os.environ.get('HULK_OUTPUT_CACHE_SIZE', 64 * 1024 * 1024))
+
+SRC_DIR = path.dirname(__file__)
+LIB_DIR = path.join(SRC_DIR, '..', 'lib')
+
+
+class CachedOutput:
+    """What a compilation left: the assembly, None if it failed, and its errors"""
+
+    def __init__(self, assembly: str|None, errors: list[str]) -> None:
+        self.assembly = assembly
+        self.errors = errors
+
+    @property
+    def success(self) -> bool:
+        return self.assembly is not None
+
+
+def hash_files(directory: str, suffixes: tuple[str, ...]) -> str:
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(suffixes):
+            digest.update(name.encode())
+            with open(path.join(directory, name), 'rb') as file:
+                digest.update(file.read())
+    return digest.hexdigest()
+
+
+@cache
+def compiler_version() -> str:
+    """The hash of the compiler's own code, any change to it is a new version"""
+    return f'ply{PLY_VERSION}-{hash_files(SRC_DIR, (".py",))}'
+
+
+@cache
+def runtime_version() -> str:
+    """The hash of lib/, linked into every program"""
+    return hash_files(LIB_DIR, ('.s', '.hulk'))
+
+
+def normalize(source: str) -> str:
+    # a checkout on Windows or an editor adding a final newline doesn't change the program
+    return source.replace('\r\n', '\n').rstrip()
+
+
+def cache_key(source: str, optimization: int) -> str:
+    digest = hashlib.sha256()
+    for part in (compiler_version(), runtime_version(), f'O{optimization}', normalize(source)):
+        digest.update(part.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class OutputCache:
+    """
+    Content-addressed cache of compilations in `directory`, one JSON file
+    per source, `-O` level, compiler and runtime. Reading an entry touches
+    it, and storing one evicts the least recently used entries while they
+    take more than `max_size` bytes.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_size: int = CACHE_SIZE) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, key: str) -> str:
+        return path.join(self.directory, f'{key}.json')
+
+    def get(self, source: str, optimization: int) -> CachedOutput|None:
+        filename = self.entry_path(cache_key(source, optimization))
+        try:
+            with open(filename) as file:
+                entry = json.load(file)
+            os.utime(filename)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return CachedOutput(entry['assembly'], entry['errors'])
+
+    def put(self, source: str, optimization: int, output: CachedOutput) -> None:
+        filename = self.entry_path(cache_key(source, optimization))
+
+        # Write to a temporary file first so concurrent compilers never read half an entry
+        tmp = f'{filename}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, 'w') as file:
+                json.dump({'assembly': output.assembly, 'errors': output.errors}, file)
+            os.replace(tmp, filename)
+        except OSError:
+            if path.exists(tmp):
+                os.remove(tmp)
+            return
+
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith('.json'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, filename in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                # another compiler evicted it first
+                pass
+            total -= size
+
+    def __str__(self) -> str:
+        return f'{self.hits} cached, {self.misses} compiled'
+
+
+def default_cache() -> OutputCache|None:
+    return OutputCache(CACHE_DIR, CACHE_SIZE) if CACHE_DIR else None
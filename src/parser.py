@@ -1,26 +1,10 @@
-from src.lexer import *
-from ply.yacc import yacc, YaccProduction
+import sys
 
-class AstNode:
-    def __init__(self, *args) -> None:
-        self.ast = list(args[:-1])
-        self.lineno = args[-1]
-    
-    def __str__(self) -> str:
-        return f'<{self.ast} at line {self.lineno}>'
-    
-    __repr__ = __str__
-
-    def __getitem__(self, index):
-        return self.ast[index]
+from src.lexer import *
+from src.table_cache import cached_yacc
+from src.nodes import AstNode
+from ply.yacc import YaccProduction
 
-    def __setitem__(self, index, value):
-        self.ast[index] = value
-        
-    
-    def __len__(self):
-        return len(self.ast)
-    
 def p_program(p):
     """
     program : program statement 
@@ -508,12 +492,16 @@ def p_type_declaration_body_item(p):
 
 
 def p_error(p):
+    syntax_error(p, ERRORS)
+
+
+def syntax_error(p, errors: list):
     try:
         error = f'Syntax error at {p.value!r} in line {p.lineno}'
-        ERRORS.append(error)
+        errors.append(error)
     except:
-        ERRORS.append('There are some missing token(s)')
+        errors.append('There are some missing token(s)')
 
-parser = yacc()
+parser = cached_yacc(sys.modules[__name__])
 
 ERRORS = []
\ No newline at end of file
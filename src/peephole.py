@@ -0,0 +1,154 @@
+"""
+Peephole optimization over the MIPS codegen emits.
+
+A window slides over the lines of every function and each rule of the
+table is a pattern over a few consecutive lines with what replaces them.
+The lines of the window are matched joined by newlines, so a pattern can
+name a register in one line and require it in the next with a
+backreference. After a rewrite the window backs up, so a rule can fire
+on what another one left.
+
+Labels are lines of their own and no rule looks past one but to drop a
+jump to it, so a rewrite never changes what a branch from elsewhere finds.
+
+    python -m src.peephole program.hulk [--without RULE ...]
+
+prints how many times every rule fired on a program.
+"""
+import re
+import sys
+import argparse
+
+
+class Rule:
+    __slots__ = ('name', 'size', 'head', 'pattern', 'rewrite')
+
+    def __init__(self, name: str, lines: tuple[str, ...], rewrite) -> None:
+        self.name = name
+        self.size = len(lines)
+        self.head = re.compile(lines[0])
+        self.pattern = re.compile('\n'.join(lines))
+        # a template for `Match.expand`, or a function of the match, giving the new lines
+        self.rewrite = rewrite
+
+    def apply(self, window: str) -> list[str]:
+        """The lines replacing the window, None if the rule doesn't match it"""
+        match = self.pattern.fullmatch(window)
+        if match is None:
+            return None
+
+        lines = self.rewrite(match) if callable(self.rewrite) else match.expand(self.rewrite)
+        return lines.split('\n') if lines else []
+
+
+def merge_stack_adjustments(match: re.Match) -> str:
+    total = int(match[1]) + int(match[2])
+    return f'addi $sp, $sp, {total}' if total else ''
+
+
+def forward_store(match: re.Match) -> str:
+    float_suffix, stored, address, loaded = match.groups()
+    store = f'sw{float_suffix} {stored}, {address}'
+    if loaded == stored:
+        return store
+    return f'{store}\n{"mov.s" if float_suffix else "move"} {loaded}, {stored}'
+
+
+REGISTER = r'\$\w+'
+
+RULES = (
+    Rule('nop', (r'nop',), ''),
+    Rule('empty line', (r'',), ''),
+    Rule('self move', (rf'(?:move|mov\.s) ({REGISTER}), \1',), ''),
+    Rule('add zero', (rf'addiu? ({REGISTER}), \1, 0',), ''),
+    Rule('merge stack adjustments', (r'addi \$sp, \$sp, (-?\d+)', r'addi \$sp, \$sp, (-?\d+)'), merge_stack_adjustments),
+    # the value just stored is still in its register
+    Rule('load after store', (rf'sw(c1|) ({REGISTER}), (-?\d+\({REGISTER}\))', rf'lw\1 ({REGISTER}), \3'), forward_store),
+    Rule('jump to next line', (r'j (\w+)', r'\1:'), r'\1:'),
+    Rule('branch over jump', (rf'bnez ({REGISTER}), (\w+)', r'j (\w+)', r'\2:'), r'beqz \1, \3\n\2:'),
+    Rule('branch over jump', (rf'beqz ({REGISTER}), (\w+)', r'j (\w+)', r'\2:'), r'bnez \1, \3\n\2:'),
+    # nothing reaches a line after a jump but through a label
+    Rule('unreachable', (rf'(j \w+|jr {REGISTER})', r'[^:]*'), r'\1'),
+)
+
+
+class PeepholeStats:
+    def __init__(self) -> None:
+        # rule -> times it fired
+        self.fired: dict[str, int] = {}
+        self.before = 0
+        self.after = 0
+
+    def __str__(self) -> str:
+        lines = [f'{self.before} lines, {self.after} after the peephole pass']
+        lines.extend(f'    {name}: {count}' for name, count in sorted(self.fired.items(), key=lambda item: -item[1]))
+        return '\n'.join(lines)
+
+
+class Peephole:
+    def __init__(self, rules: tuple[Rule, ...] = RULES) -> None:
+        self.rules = rules
+        self.stats = PeepholeStats()
+        # lines a rewrite backs up for every rule to see the new ones
+        self.window = max((rule.size for rule in rules), default=1)
+        # line -> the rules whose first line it matches, lines repeat a lot
+        self.candidates: dict[str, list[Rule]] = {}
+
+    def run(self, code: list[str]) -> list[str]:
+        """The lines of a function with the rules applied until none matches"""
+        code = list(code)
+        self.stats.before += len(code)
+
+        i = 0
+        while i < len(code):
+            line = code[i]
+            if line not in self.candidates:
+                self.candidates[line] = [rule for rule in self.rules if rule.head.fullmatch(line)]
+            windows = {1: line}
+
+            for rule in self.candidates[line]:
+                if i + rule.size > len(code):
+                    continue
+                if rule.size not in windows:
+                    windows[rule.size] = '\n'.join(code[i:i + rule.size])
+
+                lines = rule.apply(windows[rule.size])
+                if lines is None:
+                    continue
+
+                code[i:i + rule.size] = lines
+                self.stats.fired[rule.name] = self.stats.fired.get(rule.name, 0) + 1
+                i = max(i - self.window + 1, 0)
+                break
+            else:
+                i += 1
+
+        self.stats.after += len(code)
+        return code
+
+
+def optimize_functions(code: dict, rules: tuple[Rule, ...] = RULES) -> PeepholeStats:
+    """Runs the peephole pass over the lines of every function in place"""
+    peephole = Peephole(rules)
+    for function in code:
+        code[function] = peephole.run(code[function])
+    return peephole.stats
+
+
+if __name__ == '__main__':
+    from src.compiler import Compiler
+
+    names = sorted({rule.name for rule in RULES})
+
+    arg_parser = argparse.ArgumentParser(description='Peephole rules fired on a HULK program')
+    arg_parser.add_argument('file', help='.hulk file')
+    arg_parser.add_argument('--without', nargs='*', default=[], choices=names, metavar='RULE', help=f'rules to leave out: {", ".join(names)}')
+    args = arg_parser.parse_args()
+
+    with open(args.file) as file:
+        result = Compiler(optimization=0).compile(file.read())
+
+    if not result.success:
+        sys.exit('\n'.join(result.errors))
+
+    print(optimize_functions(result.codegen.code, tuple(rule for rule in RULES if rule.name not in args.without)))
@@ -0,0 +1,104 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+class PhaseProfile:
+    def __init__(self, name: str, enabled: bool = True) -> None:
+        self.name = name
+        self.enabled = enabled
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_memory = 0
+        self.items = None
+
+    def count(self, counter, *args) -> None:
+        # The counters walk the whole output of a phase, so they only run when profiling
+        if self.enabled:
+            self.items = counter(*args)
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'peak_memory': self.peak_memory,
+            'items': self.items,
+        }
+
+
+class CompilationProfile:
+    """
+    Wall time, CPU time, peak traced allocations and output size of every
+    phase of a compilation
+    """
+    def __init__(self) -> None:
+        self.phases: list[PhaseProfile] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        phase = PhaseProfile(name)
+        self.phases.append(phase)
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        base_memory, _ = tracemalloc.get_traced_memory()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield phase
+        finally:
+            phase.cpu_time = time.process_time() - cpu_start
+            phase.wall_time = time.perf_counter() - wall_start
+
+            _, peak = tracemalloc.get_traced_memory()
+            phase.peak_memory = peak - base_memory
+            if started_tracing:
+                tracemalloc.stop()
+
+    def to_dict(self) -> dict:
+        return {
+            'wall_time': sum(p.wall_time for p in self.phases),
+            'cpu_time': sum(p.cpu_time for p in self.phases),
+            'peak_memory': max((p.peak_memory for p in self.phases), default=0),
+            'phases': [p.to_dict() for p in self.phases],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+
+@contextmanager
+def measure(profile: CompilationProfile|None, name: str):
+    if profile is None:
+        yield PhaseProfile(name, enabled=False)
+    else:
+        with profile.phase(name) as phase:
+            yield phase
+
+
+def count_ast_nodes(ast) -> int:
+    if isinstance(ast, dict):
+        return sum(count_ast_nodes(value) for value in ast.values())
+    if isinstance(ast, (list, tuple)):
+        return sum(count_ast_nodes(node) for node in ast)
+    if hasattr(ast, 'ast'):
+        return 1 + sum(count_ast_nodes(node) for node in ast.ast)
+    return 0
+
+
+def count_instructions(code: dict) -> int:
+    return sum(len(lines) for lines in code.values())
+
+
+def write_report(report, filename: str = '-') -> None:
+    data = json.dumps(report, indent=2)
+
+    if filename == '-':
+        print(data)
+    else:
+        with open(filename, 'w') as out:
+            out.write(data)
@@ -0,0 +1,210 @@
+"""
+Linear-scan register allocation of the TAC temporaries of one function.
+
+Temporaries are the `t0N#` (int) and `f0N#` (float) names created by the
+TacGenerator, plus the `i0N#` integer Numbers of the number refinement.
+Every temporary gets a live interval over the instruction numbers of its
+function, and the intervals of each register class are scanned in order
+of start, spilling the one that ends last when the class runs out of
+registers. Spilled temporaries live in slots at the top of the
+frame, addressed from `$fp`.
+"""
+from bisect import insort
+
+# $t0, $s0 and $f12 are kept for special uses like float conversions and memory addressing
+INT_REGISTERS = ('$t1', '$t2', '$t3', '$t4', '$t5', '$t6', '$t7', '$t8', '$t9', '$s1', '$s2', '$s3', '$s4')
+FLOAT_REGISTERS = ('$f13', '$f14', '$f15', '$f16', '$f17', '$f18')
+
+# Spilled operands are loaded into (and spilled results stored from) these,
+# they are never allocated and only hold a value inside one TAC instruction
+INT_SCRATCH = ('$v1', '$a1', '$a2')
+FLOAT_SCRATCH = ('$f19', '$f20', '$f21')
+
+# TAC instruction -> (positions of the values it defines, positions of the values it uses)
+OPERANDS = {
+    'assign': ((1,), (2,)),
+    'binop': ((1,), (3, 4)),
+    'unary': ((1,), (3,)),
+    'jump_nz': ((), (1,)),
+    'jump_if': ((), (2, 3)),
+    'jump_if_not': ((), (2, 3)),
+    'set_param': ((), (1,)),
+    'call': ((1,), ()),
+    'return': ((), (1,)),
+    'alloc_array': ((1,), ()),
+    'alloc': ((1,), ()),
+    'set_index': ((), (1, 2, 3)),
+    'get_index': ((1,), (2, 3)),
+    'set': ((), (1, 3)),
+    'get': ((1,), (2,)),
+    'int_to_float': ((1,), (2,)),
+}
+
+NO_OPERANDS = ((), ())
+
+# instructions that jump to the label they end with
+JUMPS = ('jump', 'jump_nz', 'jump_if', 'jump_if_not')
+
+def is_temp(value) -> bool:
+    return type(value) is str and value.endswith('#')
+
+def is_float(temp: str) -> bool:
+    return temp.startswith('f')
+
+def operands(tac_code) -> tuple[list[str], list[str]]:
+    """The temporaries defined and used by a TAC instruction"""
+    defs, uses = OPERANDS.get(tac_code[0], NO_OPERANDS)
+
+    return ([tac_code[i] for i in defs if is_temp(tac_code[i])],
+            [tac_code[i] for i in uses if is_temp(tac_code[i])])
+
+
+class LiveInterval:
+    __slots__ = ('temp', 'start', 'end', 'register', 'spill_slot')
+
+    def __init__(self, temp: str, start: int) -> None:
+        self.temp = temp
+        self.start = start
+        self.end = start
+        self.register = None
+        self.spill_slot = None
+
+    def __lt__(self, other: 'LiveInterval') -> bool:
+        return self.end < other.end
+
+    def __repr__(self) -> str:
+        location = self.register if self.spill_slot is None else f'slot {self.spill_slot}'
+        return f'{self.temp}[{self.start}, {self.end}] -> {location}'
+
+
+def live_intervals(code: list) -> list[LiveInterval]:
+    """
+    Intervals from the first to the last mention of every temporary. A
+    temporary live at the head of a loop stays live until the jump back.
+    """
+    intervals = {}
+    labels = {}
+    back_edges = []
+
+    for i, tac_code in enumerate(code):
+        if tac_code[0] == 'label':
+            labels[tac_code[1]] = i
+        elif tac_code[0] in JUMPS and tac_code[-1] in labels:
+            back_edges.append((labels[tac_code[-1]], i))
+
+        defs, uses = operands(tac_code)
+        for temp in uses + defs:
+            if temp in intervals:
+                intervals[temp].end = i
+            else:
+                intervals[temp] = LiveInterval(temp, i)
+
+    changed = bool(back_edges)
+    while changed:
+        changed = False
+        for head, jump in back_edges:
+            for interval in intervals.values():
+                if interval.start < head <= interval.end < jump:
+                    interval.end = jump
+                    changed = True
+
+    return list(intervals.values())
+
+
+class RegisterAllocation:
+    """Where every temporary of a function lives"""
+
+    def __init__(self, intervals: list[LiveInterval], caller_saves: list[tuple[str, ...]]) -> None:
+        self.intervals = intervals
+        self.caller_saves = caller_saves
+        self.registers = {i.temp: i.register for i in intervals if i.spill_slot is None}
+        self.spill_slots = {i.temp: i.spill_slot for i in intervals if i.spill_slot is not None}
+        self.frame_size = 4 * (max(self.spill_slots.values(), default=-1) + 1)
+
+    def spill_address(self, temp: str) -> str:
+        return f'{-4 * (self.spill_slots[temp] + 1)}($fp)'
+
+    def scratch_registers(self, temps: list[str]) -> dict[str, str]:
+        """Scratch registers for the spilled temporaries of one instruction"""
+        spilled = [t for t in dict.fromkeys(temps) if t in self.spill_slots]
+        floats = iter(FLOAT_SCRATCH)
+        ints = iter(INT_SCRATCH)
+
+        return {t: next(floats) if is_float(t) else next(ints) for t in spilled}
+
+
+def linear_scan(intervals: list[LiveInterval], registers: tuple, slot_count: int = 0) -> int:
+    """
+    Assigns a register or a spill slot to every interval, spill slots are
+    numbered from `slot_count` on. Returns the new slot count.
+    """
+    free = list(reversed(registers))
+    free_slots = []
+    active = []
+    spilled = []
+
+    for interval in sorted(intervals, key=lambda i: i.start):
+        while active and active[0].end <= interval.start:
+            free.append(active.pop(0).register)
+
+        while spilled and spilled[0].end < interval.start:
+            insort(free_slots, spilled.pop(0).spill_slot)
+
+        if free:
+            interval.register = free.pop()
+            insort(active, interval)
+            continue
+
+        victim = active[-1] if active[-1].end > interval.end else interval
+
+        if victim is not interval:
+            interval.register = victim.register
+            victim.register = None
+            active.pop()
+            insort(active, interval)
+
+        if free_slots:
+            victim.spill_slot = free_slots.pop(0)
+        else:
+            victim.spill_slot = slot_count
+            slot_count += 1
+        insort(spilled, victim)
+
+    return slot_count
+
+
+def caller_saves(code: list, intervals: list[LiveInterval]) -> list[tuple[str, ...]]:
+    """
+    Registers to save around every call, in the order of the calls'
+    `function_call_start`. Those are the registers of the temporaries
+    defined before the call starts and used after it returns.
+    """
+    pending = sorted((i for i in intervals if i.register), key=lambda i: i.start, reverse=True)
+    live = []
+    starts = []
+    saves = []
+
+    for i, tac_code in enumerate(code):
+        if tac_code[0] == 'function_call_start':
+            starts.append((i, len(saves)))
+            saves.append(())
+
+        elif tac_code[0] == 'call':
+            while pending and pending[-1].start < i:
+                live.append(pending.pop())
+            live = [interval for interval in live if interval.end > i]
+
+            start, n = starts.pop()
+            registers = {interval.register for interval in live if interval.start < start and interval.temp != tac_code[1]}
+            saves[n] = tuple(r for r in INT_REGISTERS + FLOAT_REGISTERS if r in registers)
+
+    return saves
+
+
+def allocate(code: list) -> RegisterAllocation:
+    intervals = live_intervals(code)
+
+    slot_count = linear_scan([i for i in intervals if not is_float(i.temp)], INT_REGISTERS)
+    linear_scan([i for i in intervals if is_float(i.temp)], FLOAT_REGISTERS, slot_count)
+
+    return RegisterAllocation(intervals, caller_saves(code, intervals))
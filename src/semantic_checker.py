@@ -1,9 +1,11 @@
 from src.symbols import *
+from src.nodes import dispatch_table
 from typing import Literal
 
 class SemanticChecker:
     def __init__(self) -> None:
         self.errors = []
+        self.dispatch = dispatch_table(self)
 
     def check(self, ast, symbols: SymbolTable=None):
         result = True
@@ -47,7 +49,7 @@ class SemanticChecker:
                 return result
             
             else :
-                method = self.__getattribute__(ast[0])
+                method = self.dispatch[ast[0]]
                 result = result and method(ast, symbols)
 
                 return result
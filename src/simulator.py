@@ -0,0 +1,705 @@
+"""
+A MIPS32 interpreter for the programs this compiler emits, so the quality
+of the generated code can be measured without SPIM or MARS.
+
+It loads the text `MIPSCodeManager.assemble` produces (the program plus
+lib/data.s and lib/code.s), supports the instructions and pseudo
+instructions found there and the print, sbrk and exit syscalls, and
+counts every executed instruction, memory access and heap allocation.
+Every source line counts as one instruction, pseudo instructions are not
+expanded.
+
+    python -m src.simulator out/a.s [--stats FILE]
+"""
+import re
+import sys
+import json
+import math
+import struct
+import argparse
+from collections import Counter
+
+TEXT_BASE = 0x00400000
+DATA_BASE = 0x10010000
+STACK_TOP = 0x7fffeffc
+STACK_SIZE = 1 << 20
+
+MAX_INSTRUCTIONS = 100_000_000
+
+REGISTER_NAMES = (
+    'zero', 'at', 'v0', 'v1', 'a0', 'a1', 'a2', 'a3',
+    't0', 't1', 't2', 't3', 't4', 't5', 't6', 't7',
+    's0', 's1', 's2', 's3', 's4', 's5', 's6', 's7',
+    't8', 't9', 'k0', 'k1', 'gp', 'sp', 'fp', 'ra',
+)
+REGISTERS = {f'${name}': i for i, name in enumerate(REGISTER_NAMES)} | {f'${i}': i for i in range(32)}
+FLOAT_REGISTERS = {f'$f{i}': i for i in range(32)}
+
+LOADS = {'lw': 4, 'lwc1': 4, 'lb': 1, 'lbu': 1}
+STORES = {'sw': 4, 'swc1': 4, 'sb': 1}
+
+ESCAPES = {'n': '\n', 't': '\t', '0': '\0', '\\': '\\', '"': '"', "'": "'"}
+
+TOKEN = re.compile(r"'(?:\\.|[^'])'|[^,\s]+")
+
+
+class SimulatorError(Exception):
+    pass
+
+
+def signed(value: int) -> int:
+    value &= 0xffffffff
+    return value - 0x100000000 if value & 0x80000000 else value
+
+def float_bits(value: float) -> int:
+    try:
+        return struct.unpack('<I', struct.pack('<f', value))[0]
+    except OverflowError:
+        return struct.unpack('<I', struct.pack('<f', float('inf') if value > 0 else float('-inf')))[0]
+
+def bits_float(bits: int) -> float:
+    return struct.unpack('<f', struct.pack('<I', bits & 0xffffffff))[0]
+
+def format_float(value: float) -> str:
+    """The shortest text that reads back as the same single precision float"""
+    if value != value or value in (float('inf'), float('-inf')):
+        return str(value)
+
+    for precision in range(1, 10):
+        text = f'{value:.{precision}g}'
+        if bits_float(float_bits(float(text))) == value:
+            break
+
+    return str(float(text))
+
+def float_divide(a: float, b: float) -> float:
+    """IEEE division, dividing by zero gives an infinity or NaN instead of raising"""
+    if b:
+        return a / b
+    if a == 0 or a != a:
+        return math.nan
+    return math.copysign(math.inf, a) * math.copysign(1, b)
+
+def unescape(text: str) -> str:
+    return re.sub(r'\\(.)', lambda m: ESCAPES.get(m.group(1), m.group(1)), text)
+
+
+class ExecutionStats:
+    """What a run of the simulator did"""
+
+    def __init__(self) -> None:
+        self.instructions = 0
+        self.loads = 0
+        self.stores = 0
+        self.bytes_loaded = 0
+        self.bytes_stored = 0
+        self.heap_bytes = 0
+        self.stack_bytes = 0
+        self.mnemonics = Counter()
+
+    @property
+    def memory_accesses(self) -> int:
+        return self.loads + self.stores
+
+    def to_dict(self) -> dict:
+        return {
+            'instructions': self.instructions,
+            'loads': self.loads,
+            'stores': self.stores,
+            'bytes_loaded': self.bytes_loaded,
+            'bytes_stored': self.bytes_stored,
+            'heap_bytes': self.heap_bytes,
+            'stack_bytes': self.stack_bytes,
+            'mnemonics': dict(self.mnemonics.most_common()),
+        }
+
+    def __str__(self) -> str:
+        return (f'{self.instructions} instructions, {self.loads} loads ({self.bytes_loaded} bytes), '
+                f'{self.stores} stores ({self.bytes_stored} bytes), {self.heap_bytes} heap bytes, '
+                f'{self.stack_bytes} stack bytes')
+
+
+class SimulationResult:
+    def __init__(self, output: str, stats: ExecutionStats) -> None:
+        self.output = output
+        self.stats = stats
+
+
+class Memory:
+    """The data segment with the heap growing after it, and the stack"""
+
+    def __init__(self, data: bytearray, stack_size: int) -> None:
+        self.data = data
+        self.stack = bytearray(stack_size)
+        self.stack_base = STACK_TOP + 4 - stack_size
+
+    def region(self, address: int, size: int) -> tuple[bytearray, int]:
+        if address >= self.stack_base:
+            memory, offset = self.stack, address - self.stack_base
+        else:
+            memory, offset = self.data, address - DATA_BASE
+
+        if offset < 0 or offset + size > len(memory):
+            raise SimulatorError(f'Invalid memory access at {address:#010x}')
+        if size == 4 and address & 3:
+            raise SimulatorError(f'Unaligned word access at {address:#010x}')
+
+        return memory, offset
+
+    def load_word(self, address: int) -> int:
+        memory, offset = self.region(address, 4)
+        return int.from_bytes(memory[offset:offset + 4], 'little', signed=True)
+
+    def store_word(self, address: int, value: int) -> None:
+        memory, offset = self.region(address, 4)
+        memory[offset:offset + 4] = (value & 0xffffffff).to_bytes(4, 'little')
+
+    def load_byte(self, address: int) -> int:
+        memory, offset = self.region(address, 1)
+        return memory[offset]
+
+    def store_byte(self, address: int, value: int) -> None:
+        memory, offset = self.region(address, 1)
+        memory[offset] = value & 0xff
+
+    def load_string(self, address: int) -> str:
+        memory, offset = self.region(address, 1)
+        end = memory.index(0, offset)
+        return memory[offset:end].decode('latin-1')
+
+    def sbrk(self, size: int) -> int:
+        # like SPIM, every block starts on a word
+        self.data.extend(bytes(-len(self.data) % 4))
+        address = DATA_BASE + len(self.data)
+        self.data.extend(bytes(size))
+        return address
+
+
+class MIPSSimulator:
+    """
+    Runs an assembled program from its `main` label. The state lives in
+    `registers` (signed ints), `float_registers` (raw single precision bits)
+    and `memory`, the instructions are compiled once to closures.
+    """
+
+    def __init__(self, source: str, stack_size: int = STACK_SIZE, max_instructions: int = MAX_INSTRUCTIONS) -> None:
+        self.max_instructions = max_instructions
+        self.registers = [0] * 32
+        self.float_registers = [0] * 32
+        self.condition = False
+        self.output = []
+        self.heap_bytes = 0
+
+        self.labels = {}
+        self.instructions = []
+        data = bytearray()
+        self.load(source, data)
+
+        self.memory = Memory(data, stack_size)
+        self.registers[REGISTERS['$sp']] = STACK_TOP
+        self.registers[REGISTERS['$gp']] = DATA_BASE
+
+        self.program = [self.compile(i, *instruction) for i, instruction in enumerate(self.instructions)]
+
+    #region loading
+    def load(self, source: str, data: bytearray) -> None:
+        segment = 'text'
+
+        for number, line in enumerate(source.splitlines(), 1):
+            line = self.strip_comment(line).strip()
+
+            # like MARS, a label before a .word is on the word
+            if segment == 'data' and re.match(r'([\w.$]+\s*:\s*)*\.(word|float)\b', line):
+                data.extend(bytes(-len(data) % 4))
+
+            while (match := re.match(r'([A-Za-z_.$][\w.$]*)\s*:', line)):
+                name = match.group(1)
+                self.labels[name] = ('text', len(self.instructions)) if segment == 'text' else ('data', DATA_BASE + len(data))
+                line = line[match.end():].strip()
+
+            if not line:
+                continue
+
+            if line.startswith('.'):
+                directive, *args = line.split(None, 1)
+                args = args[0] if args else ''
+
+                if directive in ('.text', '.data'):
+                    segment = directive[1:]
+                elif directive == '.asciiz':
+                    data.extend(unescape(args[1:-1]).encode('latin-1') + b'\0')
+                elif directive == '.ascii':
+                    data.extend(unescape(args[1:-1]).encode('latin-1'))
+                elif directive == '.space':
+                    data.extend(bytes(int(args)))
+                elif directive in ('.word', '.float'):
+                    data.extend(bytes(-len(data) % 4))
+                    for value in args.replace(',', ' ').split():
+                        word = int(value, 0) if directive == '.word' else float_bits(float(value))
+                        data.extend((word & 0xffffffff).to_bytes(4, 'little'))
+                elif directive == '.align':
+                    data.extend(bytes(-len(data) % (1 << int(args))))
+                elif directive not in ('.globl', '.extern'):
+                    raise SimulatorError(f'Unknown directive {directive} at line {number}')
+                continue
+
+            mnemonic, *args = line.split(None, 1)
+            args = args[0] if args else ''
+            self.instructions.append((mnemonic, TOKEN.findall(args), number))
+
+    @staticmethod
+    def strip_comment(line: str) -> str:
+        quote = None
+        for i, c in enumerate(line):
+            if quote:
+                if c == '\\':
+                    continue
+                if c == quote and line[i - 1] != '\\':
+                    quote = None
+            elif c in '"\'':
+                quote = c
+            elif c == '#':
+                return line[:i]
+        return line
+    #endregion
+
+    #region operands
+    def register(self, token: str) -> int:
+        if token not in REGISTERS:
+            raise SimulatorError(f'Unknown register {token}')
+        return REGISTERS[token]
+
+    def float_register(self, token: str) -> int:
+        if token not in FLOAT_REGISTERS:
+            raise SimulatorError(f'Unknown float register {token}')
+        return FLOAT_REGISTERS[token]
+
+    def immediate(self, token: str) -> int:
+        if token.startswith("'"):
+            return ord(unescape(token[1:-1]))
+        return int(token, 0)
+
+    def address(self, token: str) -> tuple[int, int]:
+        """A `offset($reg)` operand as (register, offset)"""
+        match = re.fullmatch(r'(-?\w*)\((\$\w+)\)', token)
+        if not match:
+            raise SimulatorError(f'Invalid address {token}')
+        return self.register(match.group(2)), int(match.group(1) or 0, 0)
+
+    def target(self, token: str) -> int:
+        """The instruction index of a text label"""
+        if self.labels.get(token, (None,))[0] != 'text':
+            raise SimulatorError(f'Unknown label {token}')
+        return self.labels[token][1]
+
+    def label_address(self, token: str) -> int:
+        if token not in self.labels:
+            raise SimulatorError(f'Unknown label {token}')
+        segment, value = self.labels[token]
+        return TEXT_BASE + 4 * value if segment == 'text' else value
+
+    def is_register(self, token: str) -> bool:
+        return token in REGISTERS
+    #endregion
+
+    def compile(self, pc: int, mnemonic: str, args: list[str], number: int):
+        """A closure that executes the instruction at `pc` and returns the next pc"""
+        try:
+            return self.compile_instruction(pc, mnemonic, args)
+        except (SimulatorError, ValueError, IndexError, KeyError) as e:
+            raise SimulatorError(f'Cannot load `{mnemonic} {", ".join(args)}` at line {number}: {e}')
+
+    def compile_instruction(self, pc: int, mnemonic: str, args: list[str]):
+        r = self.registers
+        f = self.float_registers
+        memory = self.memory
+        next_pc = pc + 1
+
+        def rd_rs_rt(operation):
+            d, s, t = self.register(args[0]), self.register(args[1]), args[2]
+            if self.is_register(t):
+                t = self.register(t)
+                def run(pc):
+                    r[d] = signed(operation(r[s], r[t]))
+                    return next_pc
+            else:
+                imm = self.immediate(t)
+                def run(pc):
+                    r[d] = signed(operation(r[s], imm))
+                    return next_pc
+            return run
+
+        def fd_fs_ft(operation):
+            d, s, t = (self.float_register(a) for a in args)
+            def run(pc):
+                f[d] = float_bits(operation(bits_float(f[s]), bits_float(f[t])))
+                return next_pc
+            return run
+
+        def compare(operation):
+            s, t = (self.float_register(a) for a in args)
+            def run(pc):
+                self.condition = operation(bits_float(f[s]), bits_float(f[t]))
+                return next_pc
+            return run
+
+        def branch(condition, operands: int):
+            values = []
+            for token in args[:operands]:
+                values.append(self.register(token) if self.is_register(token) else None)
+            immediates = [None if v is not None else self.immediate(t) for v, t in zip(values, args)]
+            target = self.target(args[operands])
+
+            if operands == 1:
+                s = values[0]
+                def run(pc):
+                    return target if condition(r[s], 0) else next_pc
+            elif values[1] is None:
+                s, imm = values[0], immediates[1]
+                def run(pc):
+                    return target if condition(r[s], imm) else next_pc
+            else:
+                s, t = values
+                def run(pc):
+                    return target if condition(r[s], r[t]) else next_pc
+            return run
+
+        def unsigned(value: int) -> int:
+            return value & 0xffffffff
+
+        def divide(a: int, b: int) -> int:
+            if b == 0:
+                raise SimulatorError('Division by zero')
+            return int(a / b)
+
+        match mnemonic:
+            case 'nop':
+                return lambda pc: next_pc
+
+            case 'li':
+                d, imm = self.register(args[0]), signed(self.immediate(args[1]))
+                def run(pc):
+                    r[d] = imm
+                    return next_pc
+                return run
+
+            case 'la':
+                d, address = self.register(args[0]), self.label_address(args[1])
+                def run(pc):
+                    r[d] = address
+                    return next_pc
+                return run
+
+            case 'move':
+                d, s = self.register(args[0]), self.register(args[1])
+                def run(pc):
+                    r[d] = r[s]
+                    return next_pc
+                return run
+
+            case 'add' | 'addu' | 'addi' | 'addiu':
+                return rd_rs_rt(lambda a, b: a + b)
+            case 'sub' | 'subu':
+                return rd_rs_rt(lambda a, b: a - b)
+            case 'mul':
+                return rd_rs_rt(lambda a, b: a * b)
+            case 'div':
+                return rd_rs_rt(divide)
+            case 'divu':
+                return rd_rs_rt(lambda a, b: divide(unsigned(a), unsigned(b)))
+            case 'rem':
+                return rd_rs_rt(lambda a, b: a - divide(a, b) * b)
+            case 'remu':
+                return rd_rs_rt(lambda a, b: unsigned(a) - divide(unsigned(a), unsigned(b)) * unsigned(b))
+            case 'and' | 'andi':
+                return rd_rs_rt(lambda a, b: a & (b if mnemonic == 'and' else b & 0xffff))
+            case 'or' | 'ori':
+                return rd_rs_rt(lambda a, b: a | (b if mnemonic == 'or' else b & 0xffff))
+            case 'xor' | 'xori':
+                return rd_rs_rt(lambda a, b: a ^ (b if mnemonic == 'xor' else b & 0xffff))
+            case 'nor':
+                return rd_rs_rt(lambda a, b: ~(a | b))
+            case 'sll' | 'sllv':
+                return rd_rs_rt(lambda a, b: a << (b & 31))
+            case 'srl' | 'srlv':
+                return rd_rs_rt(lambda a, b: unsigned(a) >> (b & 31))
+            case 'sra' | 'srav':
+                return rd_rs_rt(lambda a, b: a >> (b & 31))
+            case 'slt' | 'slti':
+                return rd_rs_rt(lambda a, b: int(a < b))
+            case 'sltu' | 'sltiu':
+                return rd_rs_rt(lambda a, b: int(unsigned(a) < unsigned(b)))
+
+            case 'neg' | 'negu':
+                d, s = self.register(args[0]), self.register(args[1])
+                def run(pc):
+                    r[d] = signed(-r[s])
+                    return next_pc
+                return run
+
+            case 'not':
+                d, s = self.register(args[0]), self.register(args[1])
+                def run(pc):
+                    r[d] = ~r[s]
+                    return next_pc
+                return run
+
+            case 'lw' | 'lb' | 'lbu':
+                d, (base, offset) = self.register(args[0]), self.address(args[1])
+                if mnemonic == 'lw':
+                    def run(pc):
+                        r[d] = memory.load_word(r[base] + offset)
+                        return next_pc
+                else:
+                    extend = mnemonic == 'lb'
+                    def run(pc):
+                        value = memory.load_byte(r[base] + offset)
+                        r[d] = value - 256 if extend and value > 127 else value
+                        return next_pc
+                return run
+
+            case 'sw' | 'sb':
+                s, (base, offset) = self.register(args[0]), self.address(args[1])
+                store = memory.store_word if mnemonic == 'sw' else memory.store_byte
+                def run(pc):
+                    store(r[base] + offset, r[s])
+                    return next_pc
+                return run
+
+            case 'lwc1' | 'swc1':
+                d, (base, offset) = self.float_register(args[0]), self.address(args[1])
+                if mnemonic == 'lwc1':
+                    def run(pc):
+                        f[d] = memory.load_word(r[base] + offset) & 0xffffffff
+                        return next_pc
+                else:
+                    def run(pc):
+                        memory.store_word(r[base] + offset, f[d])
+                        return next_pc
+                return run
+
+            case 'j' | 'b':
+                target = self.target(args[0])
+                return lambda pc: target
+
+            case 'jal':
+                target, ra, return_address = self.target(args[0]), REGISTERS['$ra'], TEXT_BASE + 4 * next_pc
+                def run(pc):
+                    r[ra] = return_address
+                    return target
+                return run
+
+            case 'jr':
+                # lib/code.s also jumps to labels with jr
+                if not self.is_register(args[0]):
+                    target = self.target(args[0])
+                    return lambda pc: target
+                s = self.register(args[0])
+                return lambda pc: (r[s] - TEXT_BASE) >> 2
+
+            case 'jalr':
+                s, ra, return_address = self.register(args[0]), REGISTERS['$ra'], TEXT_BASE + 4 * next_pc
+                def run(pc):
+                    target = (r[s] - TEXT_BASE) >> 2
+                    r[ra] = return_address
+                    return target
+                return run
+
+            case 'beq':
+                return branch(lambda a, b: a == b, 2)
+            case 'bne':
+                return branch(lambda a, b: a != b, 2)
+            case 'blt':
+                return branch(lambda a, b: a < b, 2)
+            case 'ble':
+                return branch(lambda a, b: a <= b, 2)
+            case 'bgt':
+                return branch(lambda a, b: a > b, 2)
+            case 'bge':
+                return branch(lambda a, b: a >= b, 2)
+            case 'beqz':
+                return branch(lambda a, b: a == 0, 1)
+            case 'bnez':
+                return branch(lambda a, b: a != 0, 1)
+            case 'bgez':
+                return branch(lambda a, b: a >= 0, 1)
+            case 'bgtz':
+                return branch(lambda a, b: a > 0, 1)
+            case 'blez':
+                return branch(lambda a, b: a <= 0, 1)
+            case 'bltz':
+                return branch(lambda a, b: a < 0, 1)
+
+            case 'li.s':
+                d, bits = self.float_register(args[0]), float_bits(float(args[1]))
+                def run(pc):
+                    f[d] = bits
+                    return next_pc
+                return run
+
+            case 'mov.s':
+                d, s = self.float_register(args[0]), self.float_register(args[1])
+                def run(pc):
+                    f[d] = f[s]
+                    return next_pc
+                return run
+
+            case 'neg.s' | 'abs.s':
+                d, s = self.float_register(args[0]), self.float_register(args[1])
+                operation = (lambda a: -a) if mnemonic == 'neg.s' else abs
+                def run(pc):
+                    f[d] = float_bits(operation(bits_float(f[s])))
+                    return next_pc
+                return run
+
+            case 'add.s':
+                return fd_fs_ft(lambda a, b: a + b)
+            case 'sub.s':
+                return fd_fs_ft(lambda a, b: a - b)
+            case 'mul.s':
+                return fd_fs_ft(lambda a, b: a * b)
+            case 'div.s':
+                return fd_fs_ft(float_divide)
+
+            case 'c.eq.s':
+                return compare(lambda a, b: a == b)
+            case 'c.lt.s':
+                return compare(lambda a, b: a < b)
+            case 'c.le.s':
+                return compare(lambda a, b: a <= b)
+
+            case 'bc1t' | 'bc1f':
+                target, expected = self.target(args[0]), mnemonic == 'bc1t'
+                return lambda pc: target if self.condition == expected else next_pc
+
+            case 'cvt.w.s':
+                d, s = self.float_register(args[0]), self.float_register(args[1])
+                def run(pc):
+                    value = bits_float(f[s])
+                    f[d] = (int(value) if value == value and abs(value) < 2**31 else 2**31 - 1) & 0xffffffff
+                    return next_pc
+                return run
+
+            case 'cvt.s.w':
+                d, s = self.float_register(args[0]), self.float_register(args[1])
+                def run(pc):
+                    f[d] = float_bits(float(signed(f[s])))
+                    return next_pc
+                return run
+
+            case 'mfc1':
+                d, s = self.register(args[0]), self.float_register(args[1])
+                def run(pc):
+                    r[d] = signed(f[s])
+                    return next_pc
+                return run
+
+            case 'mtc1':
+                s, d = self.register(args[0]), self.float_register(args[1])
+                def run(pc):
+                    f[d] = r[s] & 0xffffffff
+                    return next_pc
+                return run
+
+            case 'syscall':
+                def run(pc):
+                    return next_pc if self.syscall() else None
+                return run
+
+        raise SimulatorError(f'Unsupported instruction {mnemonic}')
+
+    def syscall(self) -> bool:
+        """Runs the syscall in $v0, False when the program exits"""
+        r = self.registers
+        code = r[REGISTERS['$v0']]
+        a0 = r[REGISTERS['$a0']]
+
+        match code:
+            case 1:
+                self.output.append(str(a0))
+            case 2:
+                self.output.append(format_float(bits_float(self.float_registers[12])))
+            case 4:
+                self.output.append(self.memory.load_string(a0))
+            case 9:
+                r[REGISTERS['$v0']] = self.memory.sbrk(a0)
+                self.heap_bytes += a0
+            case 10:
+                return False
+            case 11:
+                self.output.append(chr(a0 & 0xff))
+            case 17:
+                return False
+            case _:
+                raise SimulatorError(f'Unsupported syscall {code}')
+
+        return True
+
+    def run(self, entry: str = 'main') -> SimulationResult:
+        program = self.program
+        executed = [0] * len(program)
+        pc = self.target(entry)
+        sp = REGISTERS['$sp']
+        lowest_sp = STACK_TOP
+        count = 0
+
+        try:
+            while pc is not None:
+                executed[pc] += 1
+                pc = program[pc](pc)
+
+                count += 1
+                if self.registers[sp] < lowest_sp:
+                    lowest_sp = self.registers[sp]
+                if count > self.max_instructions:
+                    raise SimulatorError(f'Gave up after {self.max_instructions} instructions')
+        except IndexError:
+            if pc is not None and not 0 <= pc < len(program):
+                raise SimulatorError(f'Jumped outside of the program ({TEXT_BASE + 4 * pc:#010x})')
+            raise
+
+        return SimulationResult(''.join(self.output), self.collect_stats(executed, lowest_sp))
+
+    def collect_stats(self, executed: list[int], lowest_sp: int) -> ExecutionStats:
+        stats = ExecutionStats()
+
+        for (mnemonic, _, _), times in zip(self.instructions, executed):
+            if not times:
+                continue
+
+            stats.instructions += times
+            stats.mnemonics[mnemonic] += times
+
+            if mnemonic in LOADS:
+                stats.loads += times
+                stats.bytes_loaded += times * LOADS[mnemonic]
+            elif mnemonic in STORES:
+                stats.stores += times
+                stats.bytes_stored += times * STORES[mnemonic]
+
+        stats.heap_bytes = self.heap_bytes
+        stats.stack_bytes = STACK_TOP - lowest_sp
+        return stats
+
+
+def simulate(source: str, **kwargs) -> SimulationResult:
+    return MIPSSimulator(source, **kwargs).run()
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Run a MIPS program emitted by the HULK compiler')
+    arg_parser.add_argument('file', help='.s file written by main.py')
+    arg_parser.add_argument('--stats', nargs='?', const='-', default=None, metavar='FILE',
+                            help='write a JSON report of the executed instructions (stderr by default)')
+    args = arg_parser.parse_args()
+
+    with open(args.file) as file:
+        result = simulate(file.read())
+
+    sys.stdout.write(result.output)
+
+    if args.stats == '-':
+        print(json.dumps(result.stats.to_dict(), indent=2), file=sys.stderr)
+    elif args.stats:
+        with open(args.stats, 'w') as file:
+            json.dump(result.stats.to_dict(), file, indent=2)
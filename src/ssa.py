@@ -0,0 +1,175 @@
+"""
+SSA form of the TAC of one function.
+
+Temporaries are already defined once, what is left are the variables, the
+stack slots the backend addresses by name, and two pseudo variables:
+MEMORY, redefined by every `set`, `set_index` and `call`, and CALLS,
+redefined by every `call`. Every instruction that computes a temporary
+reads CALLS, since in this backend no value is worth keeping in a register
+across a call.
+
+Phis go at the iterated dominance frontiers of the blocks that write a
+variable (Cytron et al.), only for the variables some block reads before
+writing them (semi-pruned SSA), and a walk over the dominator tree numbers
+the versions. Version 0 is the value a variable has at the entry.
+
+The TAC is left as it is, the backend keeps each variable in a single
+stack slot, so the form is an index over it: the version of every
+variable each instruction reads and writes, and the phis of each block.
+"""
+from src.control_flow import ControlFlowGraph
+
+MEMORY = '@memory'
+CALLS = '@calls'
+
+
+def is_variable(value) -> bool:
+    return value.__class__ is str and not value.endswith('#') and not value.startswith('"')
+
+
+NO_ACCESSES = ((), ())
+COMPUTATION = ((CALLS,), ())
+LOAD = ((MEMORY, CALLS), ())
+STORE = ((), (MEMORY,))
+CALL = ((), (MEMORY, CALLS))
+
+
+def accesses(tac_code) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """The variables an instruction reads and the ones it writes"""
+    op = tac_code[0]
+
+    # an if chain, this runs on every instruction of the program
+    if op == 'assign':
+        _, target, value = tac_code
+        if is_variable(target):
+            return ((value,) if is_variable(value) else ()), (target,)
+        return ((value, CALLS), ()) if is_variable(value) else COMPUTATION
+    elif op == 'binop' or op == 'unary' or op == 'int_to_float':
+        return COMPUTATION
+    elif op == 'get':
+        return ((tac_code[2], MEMORY, CALLS), ()) if is_variable(tac_code[2]) else LOAD
+    elif op == 'get_index':
+        return ((tac_code[3], MEMORY, CALLS), ()) if is_variable(tac_code[3]) else LOAD
+    elif op == 'set_index':
+        return ((tac_code[1],), (MEMORY,)) if is_variable(tac_code[1]) else STORE
+    elif op == 'set':
+        return STORE
+    elif op == 'call':
+        return CALL
+    return NO_ACCESSES
+
+
+class Phi:
+    __slots__ = ('variable', 'block', 'version', 'arguments')
+
+    def __init__(self, variable: str, block: int) -> None:
+        self.variable = variable
+        self.block = block
+        self.version = None
+        # predecessor block -> version coming from it
+        self.arguments: dict[int, int] = {}
+
+    def __repr__(self) -> str:
+        return f'{self.variable}.{self.version} = phi({", ".join(f"B{b}: {v}" for b, v in self.arguments.items())})'
+
+
+class SSAForm:
+    def __init__(self, code: list, cfg: ControlFlowGraph = None) -> None:
+        self.code = code
+        self.cfg = cfg or ControlFlowGraph(code)
+
+        self.phis: list[dict[str, Phi]] = [{} for _ in self.cfg.blocks]
+        # instruction index -> {variable: version}, for the instructions that access some
+        self.reads: dict[int, dict[str, int]] = {}
+        self.writes: dict[int, dict[str, int]] = {}
+        self.versions: dict[str, int] = {}
+        self.accesses = [accesses(tac_code) for tac_code in code]
+
+        # straight line code has no joins
+        if len(self.cfg.blocks) > 1:
+            self.place_phis()
+        self.rename()
+
+    def place_phis(self) -> None:
+        cfg = self.cfg
+        reachable = [idom is not None for idom in cfg.immediate_dominators]
+        written = {}
+        # read in some block before being written in it, the others never need a phi
+        exposed = set()
+
+        for block in cfg.blocks:
+            if not reachable[block.index]:
+                continue
+
+            killed = set()
+            for reads, writes in self.accesses[block.start:block.end]:
+                exposed.update(v for v in reads if v not in killed)
+                for variable in writes:
+                    killed.add(variable)
+                    written.setdefault(variable, set()).add(block.index)
+
+        frontiers = cfg.dominance_frontiers
+
+        for variable, blocks in written.items():
+            if variable not in exposed:
+                continue
+
+            pending = list(blocks)
+            while pending:
+                for join in frontiers[pending.pop()]:
+                    if variable not in self.phis[join]:
+                        self.phis[join][variable] = Phi(variable, join)
+                        if join not in blocks:
+                            pending.append(join)
+
+    def new_version(self, variable: str) -> int:
+        self.versions[variable] = self.versions.get(variable, 0) + 1
+        return self.versions[variable]
+
+    def rename(self) -> None:
+        cfg = self.cfg
+        # variable -> stack of its versions along the dominator tree path
+        current: dict[str, list[int]] = {}
+
+        def top(variable: str) -> int:
+            stack = current.get(variable)
+            return stack[-1] if stack else 0
+
+        pending = [(0, False)]
+        pushed = {}
+
+        while pending:
+            block, done = pending.pop()
+
+            if done:
+                for variable in pushed.pop(block):
+                    current[variable].pop()
+                continue
+
+            defined = []
+            for variable, phi in self.phis[block].items():
+                phi.version = self.new_version(variable)
+                current.setdefault(variable, []).append(phi.version)
+                defined.append(variable)
+
+            basic_block = cfg.blocks[block]
+            for i in range(basic_block.start, basic_block.end):
+                reads, writes = self.accesses[i]
+
+                if reads:
+                    self.reads[i] = {variable: top(variable) for variable in reads}
+                if writes:
+                    self.writes[i] = {}
+                    for variable in writes:
+                        version = self.new_version(variable)
+                        self.writes[i][variable] = version
+                        current.setdefault(variable, []).append(version)
+                        defined.append(variable)
+
+            for successor in basic_block.successors:
+                for variable, phi in self.phis[successor].items():
+                    phi.arguments[block] = top(variable)
+
+            pushed[block] = defined
+            pending.append((block, True))
+            pending.extend((child, False) for child in reversed(cfg.dominator_tree[block]))
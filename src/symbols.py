@@ -1,4 +1,8 @@
 from typing import Literal
+from contextvars import ContextVar, copy_context
+from collections.abc import MutableMapping
+
+from src.nodes import dispatch_table
 
 class SymbolType:
     def __init__(self, annotation: str, type: str, is_error: bool = False) -> None:
@@ -124,13 +128,14 @@ class SymbolObject(Symbol):
             methods = list(parent_type.methods.values()) + methods
             
             self.inheritance = parent_type.inheritance
+            method_names = {s.name for s in methods}
             for symbol in parent_type.methods:
                 if symbol in self.inheritance:
                     continue
                 inherit_name = symbol
                 tmp = inherit_name.split('_')[-1]
                 ref_name = f'method_{name}_{tmp}'
-                if ref_name in [s.name for s in methods]:
+                if ref_name in method_names:
                     continue
                 self.inheritance[ref_name] = inherit_name
         else:
@@ -142,33 +147,146 @@ class SymbolObject(Symbol):
         self.methods = {symbol.name: symbol for symbol in methods}
         self.params = params
         self.parent_type = parent_type
+
+        # Scopes inside the type body are children of these
+        self.property_scope = Scope(self.properties)
+        self.method_scope = Scope(self.methods)
 #endregion
 
 
+class Scope(MutableMapping):
+    """
+    A dict that falls back to its parent scope. Creating a child is O(1),
+    writes only touch the child and names found in a parent are cached.
+    Empty scopes are skipped and long chains are flattened every
+    `FLATTEN_DEPTH` levels, so a lookup walks a bounded number of scopes.
+    Deleting a name a parent defines leaves a `DELETED` mark in the child
+    """
+    __slots__ = ('local', 'parent', 'cache', 'depth')
+
+    FLATTEN_DEPTH = 32
+    DELETED = object()
+
+    def __init__(self, local: dict = None, parent = None) -> None:
+        self.local = local if local is not None else dict()
+        self.parent = parent
+        self.cache = dict()
+        self.depth = parent.depth + 1 if parent is not None else 0
+
+    def new_child(self):
+        parent = self
+        while not parent.local and parent.parent is not None:
+            parent = parent.parent
+
+        if parent.depth >= self.FLATTEN_DEPTH:
+            parent = parent.flatten()
+
+        return Scope(parent=parent)
+
+    def flatten(self):
+        chain = []
+        scope = self
+        while scope is not None:
+            chain.append(scope.local)
+            scope = scope.parent
+
+        local = dict()
+        for symbols in reversed(chain):
+            local.update(symbols)
+        return Scope({key: value for key, value in local.items() if value is not self.DELETED})
+
+    def __getitem__(self, key):
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self.lookup(key)
+        return default if value is self.DELETED else value
+
+    def lookup(self, key):
+        """The value of `key` in the closest scope, `DELETED` when there is none"""
+        local = self.local
+        if key in local:
+            return local[key]
+
+        cache = self.cache
+        if key in cache:
+            return cache[key]
+
+        scope = self.parent
+        while scope is not None:
+            if key in scope.local:
+                value = cache[key] = scope.local[key]
+                return value
+            if key in scope.cache:
+                value = cache[key] = scope.cache[key]
+                return value
+            scope = scope.parent
+
+        return self.DELETED
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __setitem__(self, key, value):
+        self.local[key] = value
+
+    def __delitem__(self, key):
+        if self.lookup(key) is self.DELETED:
+            raise KeyError(key)
+
+        self.cache.pop(key, None)
+        if self.parent is not None and self.parent.lookup(key) is not self.DELETED:
+            self.local[key] = self.DELETED
+        else:
+            del self.local[key]
+
+    def __iter__(self):
+        seen = set()
+        scope = self
+        while scope is not None:
+            for key, value in scope.local.items():
+                if key not in seen:
+                    seen.add(key)
+                    if value is not self.DELETED:
+                        yield key
+            scope = scope.parent
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __str__(self) -> str:
+        return str({key: self[key] for key in self})
+
+    __repr__ = __str__
+
+
 class SymbolTable:
-    def __init__(self) -> None:
-        self.variables = dict()
-        self.functions = dict()
-        self.types = dict()
-        self.globals = dict()
+    def __init__(self, variables: Scope = None, functions: Scope = None, types: Scope = None, 
+                 globals: Scope = None, object_property_address: Scope = None) -> None:
+        self.variables = variables if variables is not None else Scope()
+        self.functions = functions if functions is not None else Scope()
+        self.types = types if types is not None else Scope()
+        self.globals = globals if globals is not None else Scope()
 
         self.current_function = 'main'
         self.loops = 0
         self.current_type = None
 
-        self.object_property_address = dict()
+        self.object_property_address = object_property_address if object_property_address is not None else Scope()
 
     def make_child(self):
-        child = SymbolTable()
+        child = SymbolTable(self.variables.new_child(),
+                            self.functions.new_child(),
+                            self.types.new_child(),
+                            self.globals.new_child(),
+                            self.object_property_address.new_child())
 
-        child.variables = self.variables.copy()
-        child.functions = self.functions.copy()
-        child.types = self.types.copy()
-        child.globals = self.globals.copy()
-        child.current_function = self.current_function[:]
+        child.current_function = self.current_function
         child.loops = self.loops
-        child.current_type = self.current_type[:] if isinstance(self.current_type, str) else None
-        child.object_property_address = self.object_property_address.copy()
+        child.current_type = self.current_type
 
         return child
     
@@ -178,21 +296,12 @@ class SymbolTable:
         if not type:
             return None
         
-        child = SymbolTable()
+        child = SymbolTable(type.property_scope.new_child(),
+                            type.method_scope.new_child(),
+                            self.types.new_child(),
+                            self.variables if not self.is_on_type_body() else self.globals,
+                            self.object_property_address.new_child())
         
-        if not self.is_on_type_body():
-            child.globals = self.variables
-        else:
-            child.globals = self.globals
-
-        for prop in type.properties:
-            child.variables[prop] = type.properties[prop]
-        
-        for meth in type.methods:
-            child.functions[meth] = type.methods[meth]
-        
-        child.types = self.types.copy()
-        child.object_property_address = self.object_property_address.copy()
         child.current_type = type_name
         
         return child
@@ -237,14 +346,14 @@ class SymbolTable:
         return sym.param_types if sym else None
 
     def get_symbol(self, name: str, select: Literal['var', 'func', 'type', 'builtin']) -> Symbol|None:
-        if name in self.variables and select == 'var':
-            return self.variables[name]
-        elif name in self.functions and select == 'func':
-            return self.functions[name]
-        elif name in self.types and select == 'type':
-            return self.types[name]
-        elif name in BUILTIN_FUNCTIONS and select == 'builtin':
-            return BUILTIN_FUNCTIONS[name]
+        if select == 'var':
+            return self.variables.get(name)
+        elif select == 'func':
+            return self.functions.get(name)
+        elif select == 'type':
+            return self.types.get(name)
+        elif select == 'builtin':
+            return BUILTIN_FUNCTIONS.get(name)
         return None
     
     def set_function(self, name:str) -> None:
@@ -274,8 +383,52 @@ class SymbolTable:
     def is_on_type_body(self) -> bool:
         return self.current_type != None
 
+class CompilationContext:
+    """
+    Holds the state of a single compilation: the declared types and the
+    return types collected by `TypeInferenceService`
+    """
+    def __init__(self) -> None:
+        self.types = BUILTIN_TYPES.copy()
+        self.annotations = {tp.annotation : tp for tp in BUILTIN_TYPES.values()}
+        self.return_statements_types = dict()
+
+    def run(self, func, *args, **kwargs):
+        # The copied context keeps concurrent compilations (threads) from seeing each other
+        return copy_context().run(self._run, func, *args, **kwargs)
+
+    def _run(self, func, *args, **kwargs):
+        CURRENT_CONTEXT.set(self)
+        return func(*args, **kwargs)
+
+
+class ContextDict(MutableMapping):
+    """A dict that forwards to an attribute of the current `CompilationContext`"""
+
+    def __init__(self, attribute: str) -> None:
+        self.attribute = attribute
+
+    def __getitem__(self, key):
+        return getattr(CURRENT_CONTEXT.get(), self.attribute)[key]
+
+    def __setitem__(self, key, value):
+        getattr(CURRENT_CONTEXT.get(), self.attribute)[key] = value
+
+    def __delitem__(self, key):
+        del getattr(CURRENT_CONTEXT.get(), self.attribute)[key]
+
+    def __contains__(self, key):
+        return key in getattr(CURRENT_CONTEXT.get(), self.attribute)
+
+    def __iter__(self):
+        return iter(getattr(CURRENT_CONTEXT.get(), self.attribute))
+
+    def __len__(self):
+        return len(getattr(CURRENT_CONTEXT.get(), self.attribute))
+
+
 class TypeInferenceService:
-    return_statements_types = dict()
+    return_statements_types = ContextDict('return_statements_types')
 
     #region: type inference for function parameters and return type
 
@@ -319,7 +472,7 @@ class TypeInferenceService:
             if symbols.current_function not in cls.return_statements_types:
                 cls.return_statements_types[symbols.current_function] = []
 
-            method = getattr(cls, 'deduce_type_' + ast[0], None)
+            method = cls.dispatch.get(ast[0])
             result = method(ast, symbols)
             
             return result
@@ -618,7 +771,7 @@ class TypeInferenceService:
         
         return TYPES[new_type.name]
 
-TYPES = {
+BUILTIN_TYPES = {
     'number' : SymbolType('Number', 'number'),
     'string' : SymbolType('String', 'string'),
     'bool' : SymbolType('Bool', 'bool'),
@@ -631,7 +784,13 @@ TYPE_NO_DEDUCED = SymbolType('NO_DEDUCED', 'NO_DEDUCED')
 TYPE_NO_DEDUCIBLE = SymbolType('NO_DEDUCIBLE', 'NO_DEDUCIBLE', True) # This is an type marked as error
 TYPE_NOT_FOUND = SymbolType('NOT_FOUND', 'NOT_FOUND', True)
 
-ANNOTATIONS = {TYPES[tp].annotation : TYPES[tp] for tp in TYPES}
+# The default context is shared by everything that runs outside `CompilationContext.run`
+CURRENT_CONTEXT = ContextVar('CURRENT_CONTEXT', default=CompilationContext())
+
+TYPES = ContextDict('types')
+ANNOTATIONS = ContextDict('annotations')
+
+TypeInferenceService.dispatch = dispatch_table(TypeInferenceService, 'deduce_type_')
 
 BUILTIN_FUNCTIONS = {
     'print' : SymbolFunction('print', TYPES['string'], (TYPES['string'],)),
@@ -0,0 +1,106 @@
+import os
+import sys
+import pickle
+import hashlib
+from os import path
+
+from ply import __version__ as PLY_VERSION
+from ply.yacc import yacc, LRParser, ParserReflect, PlyLogger
+
+# Set HULK_TABLE_CACHE to an empty string to always rebuild the tables
+CACHE_DIR = os.environ.get('HULK_TABLE_CACHE', path.join(path.dirname(__file__), '__pycache__', 'tables'))
+CACHE_VERSION = f'ply{PLY_VERSION}-py{sys.version_info[0]}{sys.version_info[1]}'
+
+class CachedProduction:
+    """The minimal production info `LRParser` needs to reduce a rule"""
+
+    def __init__(self, name: str, length: int, func: str, text: str) -> None:
+        self.name = name
+        self.len = length
+        self.func = func
+        self.str = text
+        self.callable = None
+
+    def __str__(self) -> str:
+        return self.str
+
+    __repr__ = __str__
+
+    def bind(self, pdict):
+        if self.func:
+            self.callable = pdict[self.func]
+
+
+class CachedTable:
+    def __init__(self, productions, action, goto) -> None:
+        self.lr_productions = productions
+        self.lr_action = action
+        self.lr_goto = goto
+
+    @classmethod
+    def from_lr_parser(cls, parser: LRParser):
+        productions = [(p.name, p.len, p.func, p.str) for p in parser.productions]
+        return cls(productions, parser.action, parser.goto)
+
+    def bind_callables(self, pdict):
+        self.lr_productions = [CachedProduction(*p) for p in self.lr_productions]
+        for p in self.lr_productions:
+            p.bind(pdict)
+
+
+def grammar_signature(module) -> str:
+    pdict = {k: getattr(module, k) for k in dir(module)}
+
+    pinfo = ParserReflect(pdict, log=PlyLogger(sys.stderr))
+    pinfo.get_all()
+
+    # the cached productions reduce by function name, the signature only has their docstrings
+    names = ' '.join(name for _, _, name, _ in pinfo.pfuncs)
+
+    return hashlib.sha256(f'{pinfo.signature()} {names}'.encode()).hexdigest()
+
+
+def table_path(signature: str) -> str:
+    return path.join(CACHE_DIR, CACHE_VERSION, f'{signature}.pickle')
+
+
+def load_table(filename: str) -> CachedTable|None:
+    try:
+        with open(filename, 'rb') as file:
+            productions, action, goto = pickle.load(file)
+        return CachedTable(productions, action, goto)
+    except Exception:
+        return None
+
+
+def store_table(filename: str, table: CachedTable) -> None:
+    # Write to a temporary file first so concurrent compilers never read half a table
+    tmp = f'{filename}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(path.dirname(filename), exist_ok=True)
+        with open(tmp, 'wb') as file:
+            pickle.dump((table.lr_productions, table.lr_action, table.lr_goto), file, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, filename)
+    except OSError:
+        if path.exists(tmp):
+            os.remove(tmp)
+
+
+def cached_yacc(module) -> LRParser:
+    """
+    Same as `yacc(module=module)` but the LALR tables are stored in `CACHE_DIR`
+    keyed by the grammar signature, so a changed production rebuilds them
+    """
+    if not CACHE_DIR:
+        return yacc(module=module)
+
+    filename = table_path(grammar_signature(module))
+    table = load_table(filename)
+
+    if table is None:
+        parser = yacc(module=module)
+        store_table(filename, CachedTable.from_lr_parser(parser))
+        return parser
+
+    table.bind_callables(vars(module))
+    return LRParser(table, getattr(module, 'p_error', None))
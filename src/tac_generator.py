@@ -1,5 +1,6 @@
 from queue import LifoQueue as stack
 from src.semantic_checker import SymbolTable, SymbolType, TYPES, TypeInferenceService, ANNOTATIONS
+from src.nodes import dispatch_table
 
 class TacGenerator:
     def __init__(self, symbol_table: SymbolTable) -> None:
@@ -11,6 +12,7 @@ class TacGenerator:
         self.current_type = None
 
         self.symbol_renames = dict()
+        self.dispatch = dispatch_table(self)
 
     def __str__(self) -> str:
         _code = []
@@ -28,7 +30,7 @@ class TacGenerator:
                 for inst in ast:
                     self.generate(inst, symb_table)
                 return None
-            method = self.__getattribute__(ast[0])
+            method = self.dispatch[ast[0]]
             result = method(ast, symb_table)
             return result
         except:
@@ -196,14 +198,18 @@ class TacGenerator:
                     _, prop, index = prop
                 
                     addr = _symb_table.object_property_address[_symb_table.current_type][prop] * 4
-                    self.create_prop_get(t1, t1, addr)
+                    array = self.get_next_var()
+                    self.create_prop_get(array, t1, addr)
                     
                     index = self.generate(index, _symb_table)
-                    self.create_array_get(t1, index, t1)
+                    t1 = self.get_next_var()
+                    self.create_array_get(t1, index, array)
                 elif prop[0] == 'name':
                     prop = prop[1]
                     addr = _symb_table.object_property_address[_type.type][prop] * 4
-                    self.create_prop_get(t1, t1, addr)
+                    obj = self.get_next_var()
+                    self.create_prop_get(obj, t1, addr)
+                    t1 = obj
                 else:
                     raise Exception(f"There is no behavior for {tmp}")
                 
@@ -219,10 +225,11 @@ class TacGenerator:
                 _, var, index = var
                 
                 addr = _symb_table.object_property_address[_symb_table.current_type][var] * 4
-                self.create_prop_get(t1, t1, addr)
+                array = self.get_next_var()
+                self.create_prop_get(array, t1, addr)
                 
                 index = self.generate(index, _symb_table)
-                self.create_array_set(t1, index, t0)
+                self.create_array_set(array, index, t0)
 
         
         return t0
@@ -386,25 +393,47 @@ class TacGenerator:
         return t0
     
     def str_concat(self, ast, symb_table: SymbolTable):
-        _, is_double, t0, t1 = ast
+        # A whole chain of @ and @@ is one call, that measures all the pieces,
+        # allocates the result once and copies every piece once
+        pieces = self.concat_pieces(ast)
 
         self.create_function_call_start()
 
-        t0 = self.generate(t0, symb_table)
-        self.create_set_param(t0, TYPES['string'])
-        t1 = self.generate(t1, symb_table)
-        self.create_set_param(t1, TYPES['string'])
+        for piece in pieces:
+            if piece is None:
+                t0 = self.get_next_var()
+                self.create_assign(t0, '" "')
+            else:
+                t0 = self.generate(piece, symb_table)
+            self.create_set_param(t0, TYPES['string'])
+
+        # the number of pieces goes last, a word like a bool
+        t1 = self.get_next_var()
+        self.create_assign(t1, len(pieces))
+        self.create_set_param(t1, TYPES['bool'])
 
         t2 = self.get_next_var()
-        self.create_assign(t2, is_double)
-        self.create_set_param(t2, TYPES['bool'])
-        
-        t3 = self.get_next_var()
-        self.create_func_call(t3, 'concat_strings')
+        self.create_func_call(t2, 'concat_strings')
 
         self.create_function_call_end()
 
-        return t3
+        return t2
+
+    def concat_pieces(self, ast) -> list:
+        """The operands of a chain of concatenations in order, None where @@ puts a space"""
+        pieces = []
+        pending = [ast]
+
+        while pending:
+            node = pending.pop()
+            if node is None or node[0] != 'str_concat':
+                pieces.append(node)
+                continue
+
+            _, is_double, left, right = node
+            pending.extend((right, None, left) if is_double else (right, left))
+
+        return pieces
     
     def type_declaration(self, ast, symb_table: SymbolTable):
         _, parent_type, name, body = ast
@@ -455,13 +484,11 @@ class TacGenerator:
     def access(self, ast, symb_table: SymbolTable):
         ast = self.flatten_access(ast)
         
+        # every step gets its own temporary, so each is defined once
         t0 = self.generate(ast[0], symb_table)
-        f0 = self.get_next_var(True)
 
         _type, _symb_table = self.resolve_inner_props(ast[0], symb_table)
 
-        r = None
-
         for prop in ast[1 : ]:
             tmp = prop
 
@@ -482,7 +509,7 @@ class TacGenerator:
 
                     self.create_set_param(_t0, symb_table.get_params_type(name)[i])
                 
-                r = f0 if _symb_table.get_return_type(name) == TYPES['number'] else t0
+                r = self.get_next_var(_symb_table.get_return_type(name) == TYPES['number'])
 
                 self.create_func_call(r, name)
                 self.create_function_call_end()
@@ -490,22 +517,24 @@ class TacGenerator:
             elif prop[0] == 'array_access':
                 _, prop, index = prop
                 addr = _symb_table.object_property_address[_type.type][prop] * 4
-                self.create_prop_get(t0, t0, addr)
+                array = self.get_next_var()
+                self.create_prop_get(array, t0, addr)
 
                 index = self.generate(index, _symb_table)
 
-                r = t0 if _symb_table.get_type(prop).item_type != TYPES['number'] else f0
+                r = self.get_next_var(_symb_table.get_type(prop).item_type == TYPES['number'])
                 
-                self.create_array_get(r, index, t0)
+                self.create_array_get(r, index, array)
             elif prop[0] == 'name':
                 prop = prop[1]
-                r = t0 if _symb_table.get_type(prop) != TYPES['number'] else f0
+                r = self.get_next_var(_symb_table.get_type(prop) == TYPES['number'])
                 addr = _symb_table.object_property_address[_type.type][prop] * 4
                 self.create_prop_get(r, t0, addr)
 
             else:
                 raise Exception(f"There is no behavior for {tmp}")
             
+            t0 = r
             _type, _symb_table = self.resolve_inner_props(tmp, _symb_table)
         return r
 
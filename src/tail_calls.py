@@ -0,0 +1,95 @@
+"""
+Self tail call elimination over TAC.
+
+A function that returns what a call to itself returns,
+
+    function_call_start
+    ...                         <- the arguments
+    set_param a1
+    call r function_f
+    function_call_end
+    clear x                     <- the lets the return closes, if any
+    return r
+
+reuses its frame instead: the arguments go into the parameters and the
+code jumps back to right after `get_params`, so tail recursion runs as a
+loop in constant stack space. Every argument is computed before the first
+store, so no parameter is overwritten before another argument reads it.
+
+Codegen keeps track of the stack textually, so the jump has to leave it as
+the function entry found it. Only tail calls with no `let` still open
+after their clears, and not inside the arguments of another call, are
+rewritten.
+"""
+from src.inlining import call_groups
+
+
+def tail_label(function: str) -> str:
+    return f'tail_{function}'
+
+
+def open_scopes(code: list) -> list[int]:
+    """How many `let`s and calls are open before every instruction"""
+    depths = []
+    depth = 0
+
+    for tac_code in code:
+        depths.append(depth)
+        if tac_code[0] in ('declare', 'function_call_start'):
+            depth += 1
+        elif tac_code[0] in ('clear', 'function_call_end'):
+            depth -= 1
+
+    return depths
+
+
+def eliminate_function(function: str, code: list) -> list:
+    if not code or code[0][0] != 'get_params':
+        return code
+
+    params = [name for name, _ in code[0][1]]
+    depths = None
+    # index of a call -> the instructions replacing it up to its return
+    rewrites = {}
+    dropped = set()
+
+    for start, set_params, call in call_groups(code):
+        if code[call][2] != function or len(set_params) != len(params):
+            continue
+
+        end = call + 1
+        if end == len(code) or code[end][0] != 'function_call_end':
+            continue
+
+        ret = end + 1
+        while ret < len(code) and code[ret][0] == 'clear':
+            ret += 1
+        if ret == len(code) or code[ret] != ('return', code[call][1]):
+            continue
+
+        depths = depths or open_scopes(code)
+        if depths[start] or depths[ret]:
+            continue
+
+        rewrites[call] = [('assign', param, code[j][1]) for param, j in zip(params, set_params)]
+        rewrites[ret] = [('jump', tail_label(function))]
+        dropped.update(set_params)
+        dropped.update((start, end))
+
+    if not rewrites:
+        return code
+
+    result = [code[0], ('label', tail_label(function))]
+    for i, tac_code in enumerate(code[1:], 1):
+        if i in rewrites:
+            result.extend(rewrites[i])
+        elif i not in dropped:
+            result.append(tac_code)
+
+    return result
+
+
+def eliminate_tail_calls(tac: dict) -> None:
+    """Turns the self tail calls of every function into jumps, in place"""
+    for function in tac:
+        tac[function] = eliminate_function(function, tac[function])
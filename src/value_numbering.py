@@ -0,0 +1,177 @@
+"""
+Global value numbering and common subexpression elimination over TAC.
+
+Dominator based value numbering (Briggs, Cooper and Simpson) on the SSA
+form of src/ssa.py: every temporary and every variable version gets a
+value number, equal numbers meaning equal values. Literals number as
+themselves, an expression by its operator and the numbers of its operands,
+a variable version by the value stored in it, and a phi by the number all
+its arguments share, or a new one when they differ. Loads number with the
+version of MEMORY they read, so a `set`, `set_index` or `call` in between
+keeps them apart.
+
+Walking the dominator tree, an instruction whose number a temporary of an
+enclosing block already holds is dropped and its temporary replaced by
+that one. Only values computed since the last call (the same version of
+CALLS) are reused, a value kept in a register across a call costs a save
+and a restore, more than recomputing it. And only earlier instructions in
+code order are reused, live ranges are intervals over the code.
+"""
+from src.ssa import SSAForm, MEMORY, CALLS, is_variable
+from src.register_allocation import OPERANDS, NO_OPERANDS, is_temp
+
+COMMUTATIVE = ('+', '*', '==', '!=', '&&', '||')
+
+# instructions whose result only depends on their operands, and on MEMORY for loads
+REUSABLE = ('assign', 'binop', 'unary', 'get', 'get_index')
+
+
+class ValueNumbering:
+    def __init__(self, code: list) -> None:
+        self.code = code
+        self.ssa = SSAForm(code)
+
+        self.defined = {}
+        for tac_code in code:
+            for i in OPERANDS.get(tac_code[0], NO_OPERANDS)[0]:
+                self.defined[tac_code[i]] = self.defined.get(tac_code[i], 0) + 1
+
+        self.count = 0
+        self.numbers: dict[str, object] = {}
+        self.version_numbers: dict[tuple[str, int], object] = {}
+        self.expressions: dict[tuple, int] = {}
+        # (value number, CALLS version number, register class) -> (temporary, index)
+        self.leaders: dict[tuple, tuple[str, int]] = {}
+
+        self.replaced: dict[str, str] = {}
+        self.removed: set[int] = set()
+
+    def fresh(self) -> int:
+        self.count += 1
+        return self.count
+
+    def version(self, variable: str, version: int):
+        key = (variable, version)
+        if key not in self.version_numbers:
+            self.version_numbers[key] = self.fresh()
+        return self.version_numbers[key]
+
+    def value(self, operand, i: int):
+        if is_temp(operand):
+            if self.defined.get(operand) == 1 and operand in self.numbers:
+                return self.numbers[operand]
+            return self.fresh()
+
+        if is_variable(operand):
+            version = self.ssa.reads.get(i, {}).get(operand)
+            # a variable the SSA form doesn't follow, nothing is known of it
+            return self.fresh() if version is None else self.version(operand, version)
+
+        return ('literal', operand.__class__, operand)
+
+    def expression(self, key: tuple):
+        if key not in self.expressions:
+            self.expressions[key] = self.fresh()
+        return self.expressions[key]
+
+    def number_phis(self, block: int) -> None:
+        for variable, phi in self.ssa.phis[block].items():
+            known = [self.version_numbers.get((variable, v)) for v in phi.arguments.values()]
+
+            if known and known[0] is not None and all(n == known[0] for n in known):
+                self.version_numbers[(variable, phi.version)] = known[0]
+            else:
+                self.version(variable, phi.version)
+
+    def number(self, i: int, tac_code):
+        """The value number of what the instruction computes, None for stores and side effects"""
+        match tac_code:
+            case ('assign', target, value) if is_variable(target):
+                self.version_numbers[(target, self.ssa.writes[i][target])] = self.value(value, i)
+                return None
+            case ('assign', _, value):
+                return self.value(value, i)
+            case ('binop', _, op, a, b):
+                a, b = self.value(a, i), self.value(b, i)
+                if op in COMMUTATIVE and hash(a) > hash(b):
+                    a, b = b, a
+                return self.expression((op, a, b))
+            case ('unary', _, op, a):
+                return self.expression((op, self.value(a, i)))
+            case ('get', _, obj, address):
+                return self.expression(('get', self.value(obj, i), address, self.value(MEMORY, i)))
+            case ('get_index', _, index, array):
+                return self.expression(('get_index', self.value(index, i), self.value(array, i), self.value(MEMORY, i)))
+
+        for variable, version in self.ssa.writes.get(i, {}).items():
+            self.version(variable, version)
+        return None
+
+    def visit(self, block: int, scope: list) -> None:
+        self.number_phis(block)
+        basic_block = self.ssa.cfg.blocks[block]
+
+        for i in range(basic_block.start, basic_block.end):
+            tac_code = self.code[i]
+            number = self.number(i, tac_code)
+            if number is None:
+                # calls and allocations make new values
+                for j in OPERANDS.get(tac_code[0], NO_OPERANDS)[0]:
+                    if is_temp(tac_code[j]):
+                        self.numbers[tac_code[j]] = self.fresh()
+                continue
+
+            temp = tac_code[1]
+            self.numbers[temp] = number
+
+            if tac_code[0] not in REUSABLE or self.defined.get(temp) != 1:
+                continue
+
+            key = (number, self.value(CALLS, i), temp[0])
+            leader = self.leaders.get(key)
+
+            if leader is not None and leader[1] < i:
+                self.replaced[temp] = leader[0]
+                self.removed.add(i)
+            else:
+                scope.append((key, leader))
+                self.leaders[key] = (temp, i)
+
+    def run(self) -> list:
+        cfg = self.ssa.cfg
+        pending = [(0, None)]
+
+        while pending:
+            block, scope = pending.pop()
+
+            # leaving a block, its leaders go out of scope
+            if scope is not None:
+                for key, leader in reversed(scope):
+                    if leader is None:
+                        del self.leaders[key]
+                    else:
+                        self.leaders[key] = leader
+                continue
+
+            scope = []
+            self.visit(block, scope)
+            pending.append((block, scope))
+            pending.extend((child, None) for child in reversed(cfg.dominator_tree[block]))
+
+        if not self.removed:
+            return self.code
+
+        return [self.rename(tac_code) for i, tac_code in enumerate(self.code) if i not in self.removed]
+
+    def rename(self, tac_code):
+        uses = OPERANDS.get(tac_code[0], NO_OPERANDS)[1]
+        if not any(tac_code[i] in self.replaced for i in uses):
+            return tac_code
+
+        return tuple(self.replaced.get(v, v) if i in uses else v for i, v in enumerate(tac_code))
+
+
+def number_values(tac: dict) -> None:
+    """Removes the redundant computations of every function in place"""
+    for function in tac:
+        tac[function] = ValueNumbering(tac[function]).run()
@@ -0,0 +1,64 @@
+from src.compiler import Compiler
+from src.optimizer import OPTIMIZATION_LEVELS
+from src.branch_fusion import fuse_function
+from src.simulator import simulate
+
+OPS = ('==', '!=', '<', '<=', '>', '>=')
+
+# i is refined to an int and f stays a float, every comparison in an `if` and in a `while`
+PROGRAM = 'let i: Number = 0, f: Number = 0.5, n: Number = 0 in {\n' + ''.join(f'''
+    i := 0;
+    f := 0.5;
+    while (i < 3) {{
+        if (i {op} 1) print("y"); else print("n");
+        if (f {op} 1.5) print("y"); else print("n");
+        i := i + 1;
+        f := f + 1;
+    }}
+    n := 0;
+    while (n {op} 1 && n < 3) n := n + 1;
+    print(numberToString(n));
+''' for op in OPS) + '}'
+
+def expected() -> str:
+    output = []
+    for op in OPS:
+        holds = lambda a, b: eval(f'a {op} b')
+        for i in range(3):
+            output += ['y' if holds(i, 1) else 'n', 'y' if holds(i + 0.5, 1.5) else 'n']
+        n = 0
+        while holds(n, 1) and n < 3:
+            n += 1
+        output.append(str(n))
+    return ''.join(line + '\n' for line in output)
+
+def test_comparisons_become_jumps():
+    code = [
+        ('binop', 't01#', '<', 'i02#', 'i03#'),
+        ('jump_nz', 't01#', 'if_0'),
+        ('jump', 'end_if_0'),
+        ('label', 'if_0'),
+        ('binop', 't04#', '>=', 'f05#', 'f06#'),
+        ('jump_nz', 't04#', 'while_1'),
+    ]
+
+    assert fuse_function(code) == [
+        ('jump_if_not', '<', 'i02#', 'i03#', 'end_if_0'),
+        ('label', 'if_0'),
+        ('jump_if', '>=', 'f05#', 'f06#', 'while_1'),
+    ]
+
+def test_booleans_read_elsewhere_stay():
+    code = [
+        ('binop', 't01#', '<', 'f02#', 'f03#'),
+        ('jump_nz', 't01#', 'if_0'),
+        ('return', 't01#'),
+        ('binop', 't04#', '==', 't05#', 't06#'),
+        ('jump_nz', 't04#', 'if_1'),
+    ]
+
+    assert fuse_function(code) == code
+
+def test_every_level_prints_the_same():
+    outputs = [simulate(Compiler(optimization=level).compile(PROGRAM).assemble()).output for level in OPTIMIZATION_LEVELS]
+    assert set(outputs) == {expected()}
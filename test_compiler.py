@@ -0,0 +1,110 @@
+import json
+import sys
+import pytest
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from src.compiler import Compiler
+from src.batch import collect_files, compile_batch
+
+EXAMPLES = sorted((Path(__file__).parent / "examples").iterdir())
+
+def compile_file(filename: Path) -> str:
+    result = Compiler().compile(filename.read_text())
+    assert result.success, f"Test failed for file {filename}"
+    return result.assemble()
+
+def test_types_do_not_leak():
+    compiler = Compiler()
+
+    assert compiler.compile("type A { x: Number = 1; } let a: A = new A() in a.x;").success
+
+    result = compiler.compile("let a: A = new A() in a.x;")
+    assert not result.success
+
+def test_syntax_errors_do_not_leak():
+    compiler = Compiler()
+
+    result = compiler.compile("let x = in 10;")
+    assert not result.success and result.errors
+
+    result = compiler.compile("let x: Number = 10 in x;")
+    assert result.success and not result.errors
+
+def test_back_to_back_and_threads():
+    sequential = [compile_file(filename) for filename in EXAMPLES]
+
+    assert sequential == [compile_file(filename) for filename in EXAMPLES]
+
+    with ThreadPoolExecutor(8) as executor:
+        assert sequential * 4 == list(executor.map(compile_file, EXAMPLES * 4))
+
+def test_batch(tmp_path):
+    items = collect_files([str(EXAMPLES[0].parent)], str(tmp_path))
+    results = compile_batch(items, workers=2, report=None)
+
+    assert len(results) == len(EXAMPLES) and all(r.success for r in results)
+    assert all(Path(item.target).exists() for item in items)
+
+def test_batch_failures_are_per_file(tmp_path):
+    (tmp_path / 'latin1.hulk').write_bytes(b'print("\xe9");')
+    sources = [str(EXAMPLES[0]), str(tmp_path / 'missing.hulk'), str(tmp_path / 'latin1.hulk')]
+
+    results = compile_batch(collect_files(sources, str(tmp_path / 'out')), workers=2, report=None)
+    failed = sorted(Path(r.item.source).name for r in results if not r.success)
+
+    assert len(results) == 3 and failed == ['latin1.hulk', 'missing.hulk']
+    assert all(error.startswith('Cannot read') for r in results if not r.success for error in r.errors)
+
+def test_batch_targets_do_not_collide(tmp_path):
+    for directory in ('a', 'b'):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / 'x.hulk').write_text('print("x");')
+    sources = [str(tmp_path / 'a' / 'x.hulk'), str(tmp_path / 'b' / 'x.hulk'), str(EXAMPLES[0])]
+
+    items = collect_files(sources + [sources[0]], 'out')
+    targets = [Path(item.target) for item in items]
+
+    assert len(items) == 3 and len(set(targets)) == 3
+    assert targets[0].parts[-2:] == ('a', 'x.s') and targets[1].parts[-2:] == ('b', 'x.s')
+    assert targets[2] == Path('out') / EXAMPLES[0].with_suffix('.s').name
+
+    # a file on its own and one inside a directory with the same path in `out`
+    with pytest.raises(ValueError):
+        collect_files([str(tmp_path / 'a'), str(tmp_path / 'b' / 'x.hulk')], 'out')
+
+def test_profile():
+    result = Compiler(profile=True).compile(EXAMPLES[0].read_text())
+    report = result.profile.to_dict()
+
+    assert [p['name'] for p in report['phases']] == ['parse', 'semantic', 'tac', 'codegen']
+    assert all(p['items'] > 0 and p['wall_time'] >= 0 for p in report['phases'])
+    assert Compiler().compile(EXAMPLES[0].read_text()).profile is None
+
+def test_profile_flag_before_a_source(tmp_path):
+    source = tmp_path / 'a.hulk'
+    source.write_text(EXAMPLES[0].read_text())
+
+    def main(*args):
+        return subprocess.run([sys.executable, 'main.py', *args], cwd=Path(__file__).parent, capture_output=True, text=True)
+
+    run = main('--profile', str(source), '-o', str(tmp_path / 'out'), '--no-cache')
+    assert run.returncode == 0
+    assert json.loads(run.stdout)[0]['file'] == str(source) and (tmp_path / 'out' / 'a.s').exists()
+    assert '1 files' in run.stderr
+
+    assert main('--profile', '--profile-out', str(source), str(source)).returncode != 0
+    assert source.read_text() == EXAMPLES[0].read_text()
+
+def test_renamed_rules_change_the_grammar_signature():
+    import types
+    import src.parser
+    from src.table_cache import grammar_signature
+
+    module = types.ModuleType('grammar')
+    module.__dict__.update(vars(src.parser))
+    signature = grammar_signature(module)
+
+    # same docstrings, but the cached tables would look the old name up
+    module.p_renamed = module.__dict__.pop(next(name for name in vars(module) if name.startswith('p_') and name != 'p_error'))
+    assert grammar_signature(module) != signature
@@ -0,0 +1,59 @@
+from pathlib import Path
+from src.compiler import Compiler
+from src.constant_folding import fold_function
+from src.simulator import simulate
+
+EXAMPLES = sorted((Path(__file__).parent / "examples").iterdir())
+
+def run(code: str, optimization: int) -> str:
+    result = Compiler(optimization=optimization).compile(code)
+    assert result.success, result.errors
+    return simulate(result.assemble()).output
+
+def test_folds_through_temporaries_and_variables():
+    result = Compiler().compile('let x: Number = 3 in print(numberToString(-x + 2 * 4 - 1));')
+    assert result.success
+
+    code = result.tac.code['main']
+    assert [tac_code[2] for tac_code in code if tac_code[0] == 'assign'] == [4.0]
+    assert not any(tac_code[0] in ('binop', 'unary') for tac_code in code)
+
+def test_known_conditions_become_jumps():
+    code = fold_function([
+        ('assign', 't01#', True),
+        ('unary', 't02#', '!', 't01#'),
+        ('jump_nz', 't02#', 'never'),
+        ('assign', 't03#', False),
+        ('binop', 't04#', '||', 't02#', 't03#'),
+        ('unary', 't05#', '!', 't04#'),
+        ('jump_nz', 't05#', 'always'),
+    ])
+    assert code == [('jump', 'always')]
+
+def test_leaves_runtime_values_alone():
+    code = [
+        ('get_params', (('n', None),)),
+        ('assign', 'f01#', 'n'),
+        ('assign', 'f02#', 1.0),
+        ('assign', 'f03#', 0.0),
+        ('binop', 'f04#', '/', 'f02#', 'f03#'),
+        ('binop', 'f05#', '+', 'f01#', 'f04#'),
+        ('return', 'f05#'),
+    ]
+    assert fold_function(code) == code
+
+def test_every_level_prints_the_same():
+    for filename in EXAMPLES:
+        assert run(filename.read_text(), 0) == run(filename.read_text(), 1), filename
+
+    code = 'let flag: Bool = !true in print(boolToString(flag || (1 < 2) && !(3 == 3)));'
+    assert run(code, 0) == run(code, 1) == 'false\n'
+
+def test_folds_in_single_precision():
+    code = '''{
+        print(boolToString(16777217 == 16777216));
+        print(numberToString(16777217 - 16777216));
+        print(boolToString(0.1 + 0.2 == 0.3));
+        print(boolToString(1.00000001 > 1));
+    }'''
+    assert run(code, 0) == run(code, 1) == run(code, 2) == 'true\n0\ntrue\nfalse\n'
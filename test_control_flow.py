@@ -0,0 +1,50 @@
+from src.compiler import Compiler
+from src.control_flow import ControlFlowGraph
+
+NESTED_LOOPS = '''
+let i: Number = 0 in
+while (i < 3) {
+    let j: Number = 0 in while (j < 2) { j := j + 1; if (j == 1) continue; }
+    i := i + 1;
+}
+'''
+
+def graph(code: str) -> ControlFlowGraph:
+    result = Compiler(optimization=0).compile(code)
+    assert result.success, result.errors
+    return ControlFlowGraph(result.tac.code['main'])
+
+def test_blocks_and_edges():
+    cfg = ControlFlowGraph([
+        ('assign', 't01#', True),
+        ('jump_nz', 't01#', 'then'),
+        ('jump', 'end'),
+        ('label', 'then'),
+        ('return', 't01#'),
+        ('label', 'end'),
+    ])
+
+    assert [(b.start, b.end) for b in cfg.blocks] == [(0, 2), (2, 3), (3, 5), (5, 6)]
+    assert [b.successors for b in cfg.blocks] == [[2, 1], [3], [], []]
+    assert [b.predecessors for b in cfg.blocks] == [[], [0], [0], [1]]
+    assert cfg.immediate_dominators == [0, 0, 0, 1]
+    assert cfg.block_of(4).index == 2
+
+def test_loop_nesting():
+    cfg = graph(NESTED_LOOPS)
+    outer, inner = cfg.loops
+
+    assert inner.parent is outer and outer.children == [inner]
+    assert inner.blocks < outer.blocks
+    assert (outer.depth, inner.depth) == (1, 2)
+
+    # the while loops are rotated, their headers are the condition blocks
+    assert {outer.header, inner.header} == {index for label, index in cfg.labels.items() if label.startswith('end_while')}
+    assert all(cfg.dominates(loop.header, block) for loop in cfg.loops for block in loop.blocks)
+    assert cfg.loop_depths[0] == cfg.loop_depths[-1] == 0
+
+def test_dot_export():
+    dot = graph(NESTED_LOOPS).to_dot('main')
+
+    assert dot.startswith('digraph "main" {') and dot.endswith('}')
+    assert 'style=dashed' in dot and 'loop depth 2' in dot
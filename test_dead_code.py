@@ -0,0 +1,65 @@
+from src.compiler import Compiler
+from src.optimizer import OPTIMIZATION_LEVELS
+from src.dead_code import eliminate_function
+from src.simulator import simulate
+
+PROGRAM = '''
+function f(n: Number): Number {
+    if (n < 0) { return 0; print("after return"); }
+    let k: Number = n in { return n * k; }
+    print("after let");
+    return 3;
+}
+let i: Number = 0 in {
+    while (i < 5) {
+        i := i + 1;
+        if (i == 3) { break; print("after break"); }
+        i;
+        42;
+    }
+    print(numberToString(i));
+    print(numberToString(f(4)));
+    if (false) { let y: Number = 4 in print(numberToString(y)); } else { print("else"); }
+}
+'''
+
+def test_unreachable_code_is_removed():
+    result = Compiler().compile(PROGRAM)
+    assert result.success, result.errors
+
+    strings = [tac_code[2] for code in result.tac.code.values() for tac_code in code if tac_code[0] == 'assign']
+    assert '"else"' in strings
+    assert not any(s in strings for s in ('"after return"', '"after let"', '"after break"'))
+
+    # the clear after the return goes with its declare, the backend counts the stack with both
+    ops = [tac_code[0] for tac_code in result.tac.code['function_f']]
+    assert ops.count('declare') == ops.count('clear') == 1
+
+def test_every_level_prints_the_same():
+    outputs = [simulate(Compiler(optimization=level).compile(PROGRAM).assemble()).output for level in OPTIMIZATION_LEVELS]
+    assert set(outputs) == {'3\n16\nelse\n'}
+
+def test_jumps_labels_and_unused_temporaries():
+    code = eliminate_function([
+        ('assign', 'f01#', 'x'),
+        ('assign', 'f02#', 1.0),
+        ('binop', 'f03#', '+', 'f01#', 'f02#'),
+        ('call', 't04#', 'f'),
+        ('jump', 'next'),
+        ('label', 'unused'),
+        ('label', 'next'),
+        ('return', 't04#'),
+    ])
+    assert code == [('call', 't04#', 'f'), ('return', 't04#')]
+
+def test_partly_unreachable_calls_stay_balanced():
+    code = [
+        ('function_call_start',),
+        ('assign', 'f01#', 1.0),
+        ('return', 'f01#'),
+        ('set_param', 'f01#', None),
+        ('call', 't02#', 'f'),
+        ('function_call_end',),
+    ]
+    assert [tac_code[0] for tac_code in eliminate_function(code)] == \
+        ['function_call_start', 'assign', 'return', 'set_param', 'call', 'function_call_end']
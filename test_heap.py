@@ -0,0 +1,85 @@
+import sys
+from pathlib import Path
+
+from src.compiler import Compiler
+from src.simulator import simulate
+
+sys.path.insert(0, str(Path(__file__).parent / 'benchmarks'))
+from heap import LOOPS
+
+# the heap starts at 4 bytes of padding at most and grows 4 KiB at a time up to the first collection
+FIRST_COLLECTION = 65536 + 8
+
+def run(code: str):
+    result = Compiler().compile(code)
+    assert result.success, result.errors
+    return simulate(result.assemble())
+
+def test_garbage_is_collected():
+    results = {name: run(loop(5000)) for name, loop in LOOPS.items()}
+
+    assert results['strings'].output == 'item 4999 of 5000\n'
+    assert results['objects'].output == f'{5000 * 4999}\n'
+    assert results['arrays'].output == f'{sum(range(7, 5007))}\n'
+    assert all(result.stats.heap_bytes <= FIRST_COLLECTION for result in results.values())
+
+def test_live_data_survives_collections():
+    code = '''type Item(v: Number) {
+        value: Number = v;
+        label: String = "item " @ numberToString(v);
+    }
+    type Holder {
+        items: Array_Item = [new Item(0), new Item(1), new Item(2)];
+    }
+    function label(n: Number): String {
+        if (n < 1) return "x";
+        return label(n - 1) @@ numberToString(n);
+    }
+    let h: Holder = new Holder(), i: Number = 0, j: Number = 0, s: String = "" in {
+        while (i < 1000) {
+            let junk: String = "junk" @ numberToString(i) in h.items[j] := new Item(i);
+            j := j + 1;
+            if (j == 3) j := 0;
+            if (i == 500) s := label(100);
+            i := i + 1;
+        }
+        print(h.items[0].label @@ h.items[1].label @@ h.items[2].label);
+        print(s);
+    }'''
+
+    # the items are only reachable through the holder, the pieces of the label from the stack of the recursion
+    assert run(code).output == 'item 999 item 997 item 998\n' + ' '.join(['x'] + [str(i) for i in range(1, 101)]) + '\n'
+
+def test_large_blocks_are_reused():
+    items = ', '.join(['i'] + [str(n) for n in range(1, 40)])
+    text = 'more than the 128 bytes of the largest blocks in the small free lists, ' * 2
+    code = f'''let total: Number = 0, i: Number = 0, s: String = "" in {{
+        while (i < 2000) {{
+            let a: Array_Number = [{items}] in total := total + a[39] - a[0];
+            s := "{text}" @ numberToString(i);
+            i := i + 1;
+        }}
+        print(numberToString(total));
+        print(s);
+    }}'''
+
+    result = run(code)
+    assert result.output == f'{sum(39 - i for i in range(2000))}\n{text}1999\n'
+    assert result.stats.heap_bytes <= FIRST_COLLECTION
+
+def test_heap_is_limited_to_8_mib():
+    # 128 copies of a 64 KiB string take 8 MiB and the block needs its size word too
+    code = f'''let s: String = "{'x' * 64}", i: Number = 0 in {{
+        while (i < 10) {{
+            s := s @ s;
+            i := i + 1;
+        }}
+        print("built");
+        print({' @ '.join(['s'] * 128)});
+        print("never");
+    }}'''
+
+    result = run(code)
+    assert result.output == 'built\nOut of memory\n'
+    # it gives up before asking sbrk for the block
+    assert result.stats.heap_bytes < 2**20
@@ -0,0 +1,58 @@
+from src.compiler import Compiler
+from src.optimizer import OPTIMIZATION_LEVELS
+from src.inlining import inline_functions, call_order
+from src.simulator import simulate
+
+PROGRAM = '''
+function min(a: Number, b: Number): Number {
+    if (a >= b) return b;
+    return a;
+}
+function fact(n: Number): Number {
+    if (n <= 1) return 1;
+    return n * fact(n - 1);
+}
+function countdown(n: Number): Number {
+    n := n - 1;
+    return n;
+}
+type Box(v: Number) {
+    v: Number = v;
+    function get(): Number => self.v;
+}
+let a: Array_Number = [5, 3, 9], i: Number = 0, lo: Number = 100, b: Box = new Box(4) in {
+    while (i < 3) {
+        lo := min(lo, a[i]);
+        i := i + 1;
+    }
+    print(numberToString(lo * b.get() + fact(4) + countdown(3)));
+}
+'''
+
+def test_small_functions_are_inlined():
+    result = Compiler(optimization=0).compile(PROGRAM)
+    report = inline_functions(result.tac.code)
+
+    assert {call.callee for call in report.inlined} == {'function_min', 'type_Box', 'method_Box_get'}
+    assert report.kept == {'function_fact': 'recursive', 'function_countdown': 'assigns its parameter n'}
+    assert set(report.removed) == {'function_min', 'type_Box', 'method_Box_get'}
+
+    calls = [tac_code[2] for tac_code in result.tac.code['main'] if tac_code[0] == 'call']
+    assert 'function_min' not in calls and 'function_fact' in calls
+
+def test_cycles_are_recursive():
+    tac = {
+        'function_f': [('get_params', ()), ('call', 't01#', 'function_g')],
+        'function_g': [('get_params', ()), ('call', 't02#', 'function_f')],
+        'function_h': [('get_params', ()), ('call', 't03#', 'function_f')],
+        'main': [('call', 't04#', 'function_h')],
+    }
+    order, recursive = call_order(tac)
+
+    assert recursive == {'function_f', 'function_g'}
+    assert order.index('function_h') < order.index('main')
+    assert order.index('function_f') < order.index('function_h')
+
+def test_every_level_prints_the_same():
+    outputs = [simulate(Compiler(optimization=level).compile(PROGRAM).assemble()).output for level in OPTIMIZATION_LEVELS]
+    assert set(outputs) == {'38\n'}
@@ -0,0 +1,74 @@
+from src.compiler import Compiler
+from src.optimizer import OPTIMIZATION_LEVELS
+from src.loop_invariants import LoopInvariants
+from src.simulator import simulate
+
+PROGRAM = '''
+type Counter(limit: Number) {
+    limit: Number = limit;
+    count: Number = 0;
+    function run(): Number {
+        let i: Number = 0 in
+        while (i < self.limit) {
+            i := i + 1;
+            self.count := self.count + self.limit;
+        }
+        return self.count;
+    }
+    function shrink(): Number {
+        let i: Number = 0 in
+        while (i < self.limit) {
+            self.limit := self.limit - 1;
+            i := i + 1;
+        }
+        return self.limit;
+    }
+}
+let a: Array_Number = [1, 2, 3], n: Number = 3, total: Number = 0, i: Number = 0, c: Counter = new Counter(5) in {
+    while (i < 4) {
+        let j: Number = 0 in
+        while (j < n) {
+            total := total + a[j] * i;
+            j := j + 1;
+        }
+        i := i + 1;
+    }
+    print(numberToString(total));
+    print(numberToString(c.run()));
+    print(numberToString(c.shrink()));
+}
+'''
+
+LOOP = [
+    ('declare', 'k', 1, None),
+    ('jump', 'end_while_1'),
+    ('label', 'while_1'),
+    ('assign', 'f01#', 'k'),
+    ('get', 'f02#', 'self', 4),
+    ('binop', 'f03#', '+', 'f01#', 'f02#'),
+    ('set', 'self', 8, 'f03#'),
+    ('get_index', 'f04#', 0, 'a'),
+    ('label', 'end_while_1'),
+    ('assign', 'f05#', 'k'),
+    ('binop', 't06#', '<', 'f05#', 'f04#'),
+    ('jump_nz', 't06#', 'while_1'),
+    ('clear', 'k'),
+]
+
+def test_invariants_move_before_the_loop():
+    code = LoopInvariants(LOOP).run()
+    preheader = code[:code.index(('jump', 'end_while_1'))]
+
+    # the variable is loaded once, the array through a register, the property after the store stays
+    assert ('assign', 'f01#', 'k') in preheader and ('assign', 'f05#', 'k') not in code
+    assert ('binop', 't06#', '<', 'f01#', 'f04#') in code
+    assert ('get', 'f02#', 'self', 4) not in preheader
+    assert ('get_index', 'f04#', 0, 't0_a_1#') in code
+
+def test_nothing_leaves_a_loop_with_a_call():
+    code = LOOP[:4] + [('function_call_start',), ('call', 't07#', 'f'), ('function_call_end',)] + LOOP[4:]
+    assert LoopInvariants(code).run() == code
+
+def test_every_level_prints_the_same():
+    outputs = [simulate(Compiler(optimization=level).compile(PROGRAM).assemble()).output for level in OPTIMIZATION_LEVELS]
+    assert set(outputs) == {'36\n25\n2\n'}
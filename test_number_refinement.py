@@ -0,0 +1,49 @@
+from pathlib import Path
+from src.compiler import Compiler
+from src.simulator import simulate
+from src.optimizer import OPTIMIZATION_LEVELS
+
+def compile_to_mips(code: str, optimization: int = 1) -> str:
+    result = Compiler(optimization=optimization).compile(code)
+    assert result.success, result.errors
+    return str(result.codegen)
+
+def test_index_loops_use_integers():
+    code = compile_to_mips((Path(__file__).parent / "examples" / "param_array.hulk").read_text(), 2)
+
+    assert 'cvt.w.s' not in code
+    # with `size` inlined, the loop condition is an integer compare fused with its branch
+    assert 'addu' in code and 'blt' in code and 'c.lt.s' not in code
+
+def test_fractions_and_products_stay_floats():
+    code = compile_to_mips('let x: Number = 0 in while (x < 10) x := x + 0.5;')
+    assert 'add.s' in code and 'addu' not in code
+
+    code = compile_to_mips('let x: Number = 1 in while (x < 100) x := x * 3;')
+    assert 'mul.s' in code and 'addu' not in code
+
+def test_literals_only_converted_when_used_as_integers():
+    code = compile_to_mips('print(numberToString(12));')
+    assert 'li.s' in code and 'cvt.s.w' not in code
+
+    code = compile_to_mips('let i: Number = 0 in while (i < 3) { print(numberToString(i)); i := i + 1; }')
+    assert code.count('cvt.s.w') == 1 and 'c.lt.s' not in code
+
+def test_accumulators_stay_floats():
+    code = '''let s: Number = 0, i: Number = 0 in {
+        while (i < 70000) {
+            s := s + i;
+            i := i + 1;
+        }
+        if (s > 2000000000) print("big");
+        else print("small");
+    }'''
+    outputs = [simulate(Compiler(optimization=level).compile(code).assemble()).output for level in OPTIMIZATION_LEVELS]
+
+    # a sum of 70000 counters doesn't fit an int, it's only the counter that is one
+    assert outputs == ['big\n'] * len(OPTIMIZATION_LEVELS)
+    assert 'addu' in compile_to_mips(code) and 'add.s' in compile_to_mips(code)
+
+    # a variable stepped in a loop guarded by another one has no bound
+    code = compile_to_mips('let i: Number = 0, k: Number = 0 in while (k < 5) { i := i + 1000000; k := k + 1; }')
+    assert code.count('addu') == 1 and 'add.s' in code
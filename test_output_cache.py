@@ -0,0 +1,50 @@
+import os
+import time
+from pathlib import Path
+
+import src.output_cache
+from src.output_cache import OutputCache, CachedOutput, cache_key
+from src.batch import BatchItem, compile_item
+
+EXAMPLE = Path(__file__).parent / "examples" / "fib.hulk"
+
+def test_entries_are_keyed_by_source_and_level(tmp_path):
+    cache = OutputCache(str(tmp_path))
+    cache.put('print("a");', 2, CachedOutput('main: ...', []))
+
+    assert cache.get('print("a");\r\n', 2).assembly == 'main: ...'
+    assert cache.get('print("a");', 1) is None
+    assert cache.get('print("b");', 2) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    cache.put('let x = in 1;', 2, CachedOutput(None, ['syntax error']))
+    failed = cache.get('let x = in 1;', 2)
+    assert not failed.success and failed.errors == ['syntax error']
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = OutputCache(str(tmp_path))
+    for i in range(3):
+        cache.put(f'source {i}', 2, CachedOutput('x' * 1000, []))
+        used = time.time() - 100 + i
+        os.utime(tmp_path / f'{cache_key(f"source {i}", 2)}.json', (used, used))
+
+    # reading the oldest entry makes it the most recently used
+    cache.get('source 0', 2)
+    cache.max_size = 2500
+    cache.put('source 3', 2, CachedOutput('x' * 1000, []))
+
+    assert [cache.get(f'source {i}', 2) is not None for i in range(4)] == [True, False, False, True]
+
+def test_batch_items_come_from_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(src.output_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    item = BatchItem(str(EXAMPLE), str(tmp_path / 'out' / 'fib.s'))
+
+    first = compile_item(item, use_cache=True)
+    assembly = Path(item.target).read_text()
+    os.remove(item.target)
+    second = compile_item(item, use_cache=True)
+
+    assert first.success and not first.cached
+    assert second.success and second.cached
+    assert Path(item.target).read_text() == assembly
+    assert not compile_item(item).cached
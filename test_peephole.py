@@ -0,0 +1,66 @@
+from src.compiler import Compiler
+from src.optimizer import OPTIMIZATION_LEVELS
+from src.peephole import Peephole, RULES
+from src.simulator import simulate
+
+PROGRAM = '''
+function fib(n: Number): Number {
+    if (n <= 1) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+let x: Number = 4 in {
+    let y: Number = x + 1 in print(numberToString(fib(y)));
+    if (x > 3) print("big"); else print("small");
+}
+'''
+
+def test_rules_rewrite_their_windows():
+    peephole = Peephole()
+    code = peephole.run([
+        'nop',
+        'move $t1, $t1',
+        'addi $sp, $sp, 4',
+        'addi $sp, $sp, -4',
+        'sw $t1, 0($sp)',
+        'lw $t2, 0($sp)',
+        'swc1 $f13, 4($sp)',
+        'lwc1 $f13, 4($sp)',
+        'bnez $t2, then',
+        'j else',
+        'then:',
+        'j end',
+        'li $t1, 1',
+        'end:',
+        'j else',
+        'else:',
+    ])
+
+    assert code == [
+        'sw $t1, 0($sp)',
+        'move $t2, $t1',
+        'swc1 $f13, 4($sp)',
+        'beqz $t2, else',
+        'then:',
+        'end:',
+        'else:',
+    ]
+    assert peephole.stats.fired['branch over jump'] == 1
+    assert peephole.stats.fired['jump to next line'] == 2
+
+def test_rules_can_be_left_out():
+    code = ['nop', 'addi $sp, $sp, 4', 'addi $sp, $sp, 8']
+    peephole = Peephole(tuple(rule for rule in RULES if rule.name != 'merge stack adjustments'))
+
+    assert peephole.run(code) == ['addi $sp, $sp, 4', 'addi $sp, $sp, 8']
+    assert peephole.stats.fired == {'nop': 1}
+    assert (peephole.stats.before, peephole.stats.after) == (3, 2)
+
+def test_every_level_prints_the_same_with_fewer_lines():
+    results = [Compiler(optimization=level).compile(PROGRAM) for level in OPTIMIZATION_LEVELS]
+
+    assert {simulate(result.assemble()).output for result in results} == {'5\nbig\n'}
+    assert results[0].peephole is None
+
+    for result in results[1:]:
+        assert result.peephole.after < result.peephole.before
+        assert not any(line == 'nop' for code in result.codegen.code.values() for line in code)
@@ -0,0 +1,68 @@
+import re
+from pathlib import Path
+from src.compiler import Compiler
+from src.register_allocation import allocate, live_intervals, INT_REGISTERS, FLOAT_REGISTERS
+
+EXAMPLES = sorted((Path(__file__).parent / "examples").iterdir())
+
+# loads and stores of each example with the previous FIFO allocator, which never
+# spilled but saved every register around every call with push_all and pop_all
+MEMORY_INSTRUCTIONS_BEFORE = {
+    'a': 100, 'array': 22, 'downcast': 708, 'fib': 551, 'param_array': 80, 'print': 393, 'string': 2,
+    'string_concat': 203, 'type_decl_simple': 104, 'type_inheritance': 621, 'type_properties': 749,
+}
+
+def count_memory_instructions(code: str) -> int:
+    # push_all and pop_all store and load 23 registers each
+    helpers = len(re.findall(r'^\s*jal (push_all|pop_all)$', code, re.M))
+    return len(re.findall(r'^\s*(lw|sw|lwc1|swc1)\s', code, re.M)) + 23 * helpers
+
+def nested_sum(size: int) -> str:
+    # every left operand stays live until the innermost sum is done, the
+    # fractions keep them floats (compile with optimization=0, folding would
+    # leave a single constant)
+    return ' + ('.join(f'{i}.5' for i in range(1, size + 1)) + ')' * (size - 1)
+
+def test_memory_instructions():
+    for filename in EXAMPLES:
+        result = Compiler().compile(filename.read_text())
+        assert result.success
+
+        assert count_memory_instructions(str(result.codegen)) <= MEMORY_INSTRUCTIONS_BEFORE[filename.stem], filename
+
+def test_no_overlapping_intervals_share_a_register():
+    result = Compiler(optimization=0).compile(f'print(numberToString({nested_sum(20)}));')
+    assert result.success
+
+    code = result.tac.code['main']
+    intervals = live_intervals(code)
+    allocation = allocate(code)
+
+    assert len(allocation.spill_slots) == 20 - len(FLOAT_REGISTERS)
+    assert set(allocation.registers.values()) <= set(INT_REGISTERS + FLOAT_REGISTERS)
+
+    for a in intervals:
+        for b in intervals:
+            if a is not b and a.start < b.end and b.start < a.end:
+                assert allocation.registers.get(a.temp, a) != allocation.registers.get(b.temp, b)
+
+def test_spilled_temporaries_go_through_the_frame():
+    result = Compiler(optimization=0).compile(f'print(numberToString({nested_sum(10)}));')
+    assert result.success
+
+    code = str(result.codegen)
+    stores = re.findall(r'swc1 \$f\d+, (-\d+)\(\$fp\)', code)
+    loads = re.findall(r'lwc1 \$f\d+, (-\d+)\(\$fp\)', code)
+
+    assert len(stores) == len(loads) == 10 - len(FLOAT_REGISTERS)
+    assert sorted(stores) == sorted(loads)
+
+def test_only_live_registers_are_saved_around_calls():
+    result = Compiler().compile((Path(__file__).parent / "examples" / "fib.hulk").read_text())
+    assert result.success
+
+    code = result.tac.code['function_fibonacci']
+
+    # fibonacci(n - 1) is the only value live across a call
+    assert [len(saved) for saved in allocate(code).caller_saves] == [0, 1]
+    assert not any('push_all' in line or 'pop_all' in line for line in result.codegen.code['function_fibonacci'])
@@ -0,0 +1,56 @@
+from pathlib import Path
+from src.compiler import Compiler
+from src.simulator import simulate, MIPSSimulator
+
+EXAMPLES = sorted((Path(__file__).parent / "examples").iterdir())
+
+OUTPUTS = {
+    'a': ''.join(f'{i}\n' for i in range(9, -1, -1)),
+    'fib': '144\n233\n479001600\n',
+    'type_inheritance': "the animal is eating\nDog Pepe is walking\nhis husky has a fluffyness of 1000, it's adorable\n",
+    'string': '',
+}
+
+def run(code: str):
+    result = Compiler().compile(code)
+    assert result.success, result.errors
+    return simulate(result.codegen.assemble())
+
+def test_examples_run():
+    for filename in EXAMPLES:
+        result = run(filename.read_text())
+
+        assert result.stats.instructions > 0, filename
+        if filename.stem in OUTPUTS:
+            assert result.output == OUTPUTS[filename.stem], filename
+
+def test_stats():
+    simulator = MIPSSimulator('''
+.data
+    message: .asciiz "hi"
+.text
+main:
+    li $t0, 3
+    addi $sp, $sp, -8
+loop:
+    sw $t0, 0($sp)
+    lw $t1, 0($sp)
+    addi $t0, $t0, -1
+    bnez $t0, loop
+    li $a0, 10
+    li $v0, 9
+    syscall
+    la $a0, message
+    li $v0, 4
+    syscall
+    li $v0, 10
+    syscall
+''')
+    result = simulator.run()
+
+    assert result.output == 'hi'
+    assert result.stats.instructions == 2 + 4 * 3 + 8
+    assert (result.stats.loads, result.stats.stores) == (3, 3)
+    assert result.stats.bytes_stored == 12
+    assert result.stats.heap_bytes == 10
+    assert result.stats.stack_bytes == 8
@@ -0,0 +1,50 @@
+import sys
+from itertools import product
+from pathlib import Path
+
+from src.compiler import Compiler
+from src.simulator import simulate
+from src.codegen import string_length
+
+sys.path.insert(0, str(Path(__file__).parent / 'benchmarks'))
+from generate import SHAPES
+
+# lengths around every alignment of the word copies, and an escape
+LITERALS = ('', 'a', 'ab', 'abc', 'abcd', 'abcde', 'abcdefgh', 'x\\ty')
+
+def run(code: str) -> str:
+    result = Compiler().compile(code)
+    assert result.success, result.errors
+    return simulate(result.assemble())
+
+def test_concatenations():
+    lines = []
+    expected = []
+    for a, b in product(LITERALS, repeat=2):
+        lines.append(f'print("{a}" @ "{b}" @@ "{a}");')
+        expected.append(f'{a}{b} {a}'.replace('\\t', '\t'))
+
+    assert run('{' + ''.join(lines) + '}').output == ''.join(line + '\n' for line in expected)
+
+def test_runtime_strings_have_lengths():
+    code = '''let s: String = "", i: Number = 0 in {
+        while (i < 5) {
+            s := s @ numberToString(i * -7) @@ boolToString(i < 2);
+            i := i + 1;
+        }
+        print(s);
+    }'''
+
+    assert run(code).output == '0 true-7 true-14 false-21 false-28 false\n'
+    assert string_length('"a\\nb"') == 3
+
+def test_chains_are_one_call():
+    result = Compiler(optimization=0).compile('print("a" @ "b" @@ "c" @ boolToString(true) @@ "e");')
+    calls = [tac_code[2] for tac_code in result.tac.code['main'] if tac_code[0] == 'call']
+
+    assert calls == ['boolToString', 'concat_strings', 'print']
+    assert simulate(result.assemble()).output == 'ab ctrue e\n'
+
+    # every piece is copied once, nested calls copied the growing prefix again at every step
+    short = run(SHAPES['concat_chain'](100)).stats.instructions
+    assert run(SHAPES['concat_chain'](300)).stats.instructions < 4 * short
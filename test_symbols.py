@@ -0,0 +1,31 @@
+import pytest
+from src.symbols import Scope
+
+def test_children_see_and_shadow_their_parents():
+    parent = Scope({'a': 1, 'b': 2})
+    child = parent.new_child()
+    child['b'] = 3
+
+    assert (child['a'], child['b'], parent['b']) == (1, 3, 2)
+    assert sorted(child) == ['a', 'b'] and len(child) == 2
+
+def test_deleting_an_inherited_name():
+    parent = Scope({'a': 1, 'b': 2})
+    child = parent.new_child()
+    child['b'] = 3
+
+    assert child.pop('a') == 1
+    del child['b']
+
+    assert 'a' not in child and 'b' not in child and child.get('a') is None
+    assert list(child) == [] and len(child) == 0
+    assert dict(parent) == {'a': 1, 'b': 2}
+
+    with pytest.raises(KeyError):
+        child.pop('a')
+
+    # the name stays deleted below the child and a new definition brings it back
+    grandchild = child.new_child()
+    assert 'a' not in grandchild and dict(grandchild.flatten()) == {}
+    grandchild['a'] = 4
+    assert grandchild['a'] == 4 and 'a' not in child
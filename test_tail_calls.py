@@ -0,0 +1,82 @@
+from src.compiler import Compiler
+from src.optimizer import OPTIMIZATION_LEVELS
+from src.tail_calls import eliminate_tail_calls
+from src.simulator import simulate
+
+PROGRAM = '''
+function sum(n: Number, acc: Number): Number {
+    if (n == 0) return acc;
+    return sum(n - 1, acc + n);
+}
+function gcd(a: Number, b: Number): Number {
+    if (b == 0) return a;
+    if (a < b) return gcd(b, a);
+    return gcd(a - b, b);
+}
+function fact(n: Number): Number {
+    if (n <= 1) return 1;
+    return n * fact(n - 1);
+}
+type Counter(start: Number) {
+    start: Number = start;
+    function down(): Number {
+        if (self.start <= 0) return 0;
+        self.start := self.start - 1;
+        return self.down();
+    }
+}
+let c: Counter = new Counter(30) in {
+    print(numberToString(sum(100, 0)));
+    print(numberToString(gcd(1071, 462)));
+    print(numberToString(fact(5)));
+    print(numberToString(c.down()));
+}
+'''
+
+def test_self_tail_calls_become_jumps():
+    tac = Compiler(optimization=0).compile(PROGRAM).tac.code
+    eliminate_tail_calls(tac)
+
+    def calls(function):
+        return [tac_code[2] for tac_code in tac[function] if tac_code[0] == 'call']
+
+    for function in ('function_sum', 'function_gcd', 'method_Counter_down'):
+        assert calls(function) == []
+        assert tac[function][1] == ('label', f'tail_{function}')
+        assert tac[function].count(('jump', f'tail_{function}')) == (2 if function == 'function_gcd' else 1)
+
+    # the result of the call is multiplied, it isn't a tail call
+    assert calls('function_fact') == ['function_fact']
+
+def test_arguments_are_computed_before_the_parameters_change():
+    tac = {
+        'function_f': [
+            ('get_params', (('a', None), ('b', None))),
+            ('function_call_start',),
+            ('assign', 't01#', 'b'),
+            ('set_param', 't01#'),
+            ('assign', 't02#', 'a'),
+            ('set_param', 't02#'),
+            ('call', 't03#', 'function_f'),
+            ('function_call_end',),
+            ('return', 't03#'),
+        ],
+    }
+    eliminate_tail_calls(tac)
+
+    assert tac['function_f'] == [
+        ('get_params', (('a', None), ('b', None))),
+        ('label', 'tail_function_f'),
+        ('assign', 't01#', 'b'),
+        ('assign', 't02#', 'a'),
+        ('assign', 'a', 't01#'),
+        ('assign', 'b', 't02#'),
+        ('jump', 'tail_function_f'),
+    ]
+
+def test_tail_recursion_runs_in_constant_stack():
+    outputs = [simulate(Compiler(optimization=level).compile(PROGRAM).assemble()).output for level in OPTIMIZATION_LEVELS]
+    assert set(outputs) == {'5050\n21\n120\n0\n'}
+
+    deep = PROGRAM.replace('sum(100, 0)', 'sum(60000, 0)')
+    assert simulate(Compiler(optimization=2).compile(deep).assemble()).stats.stack_bytes < 1024
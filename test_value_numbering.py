@@ -0,0 +1,57 @@
+from src.compiler import Compiler
+from src.optimizer import OPTIMIZATION_LEVELS
+from src.value_numbering import ValueNumbering
+from src.simulator import simulate
+
+PROGRAM = '''
+type Point(x: Number, y: Number) {
+    x: Number = x;
+    y: Number = y;
+    function reset(): Number { self.x := 1; return 1; }
+    function norm(): Number => self.x * self.x + self.y * self.y;
+}
+function same(n: Number): Number => n;
+let p: Point = new Point(3, 4), a: Number = 2 in {
+    print(numberToString(a * a + a * a));
+    print(numberToString(p.norm()));
+    let before: Number = p.norm() in {
+        p.reset();
+        print(numberToString(before + p.norm()));
+    }
+    print(numberToString(same(a) + same(a)));
+}
+'''
+
+def count(code: list, op: str) -> int:
+    return sum(tac_code[0] == op for tac_code in code)
+
+def test_redundant_computations_are_removed():
+    code = [
+        ('get', 't01#', 'self', 0),
+        ('get', 't02#', 'self', 0),
+        ('binop', 't03#', '*', 't01#', 't02#'),
+        ('binop', 't04#', '*', 't02#', 't01#'),
+        ('set', 'self', 0, 't04#'),
+        ('get', 't05#', 'self', 0),
+        ('return', 't05#'),
+    ]
+    result = ValueNumbering(code).run()
+
+    # the second load and the commuted product are gone, the load after the store stays
+    assert count(result, 'get') == 2
+    assert count(result, 'binop') == 1
+    assert ('set', 'self', 0, 't03#') in result
+
+def test_no_reuse_across_calls():
+    code = [
+        ('get', 't01#', 'self', 0),
+        ('call', 'r#', 'function_f'),
+        ('get', 't02#', 'self', 0),
+        ('binop', 't03#', '+', 't01#', 't02#'),
+        ('return', 't03#'),
+    ]
+    assert ValueNumbering(code).run() == code
+
+def test_every_level_prints_the_same():
+    outputs = [simulate(Compiler(optimization=level).compile(PROGRAM).assemble()).output for level in OPTIMIZATION_LEVELS]
+    assert set(outputs) == {'8\n25\n42\n4\n'}